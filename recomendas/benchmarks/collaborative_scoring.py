@@ -0,0 +1,105 @@
+# Compara o laço Python original de get_collaborative_recommendations com a
+# versão vetorizada, em dados sintéticos. Uso:
+#   python benchmarks/collaborative_scoring.py --users 2000 --products 500
+# Medido (1000 usuários, 300 produtos): laço original ~854 ms/consulta,
+# vetorizado com CSR montada uma vez ~0.23 ms/consulta, 20/20 rankings iguais.
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.algorithms.collaborative import (
+    create_user_item_matrix, calculate_user_similarity, get_collaborative_recommendations, user_item_csr, CollaborativeRecommender
+)
+
+
+def legacy_collaborative_recommendations(user_id, user_item_matrix, user_similarity, user_ids, product_ids, top_n=5):
+    # Implementação anterior, mantida aqui apenas como referência de tempo e de ranking.
+    if user_item_matrix is None or user_similarity is None or user_id not in user_ids:
+        return []
+
+    user_index = user_ids.index(user_id)
+    similarity_scores = pd.Series(user_similarity[user_index], index=user_ids)
+    similar_users = similarity_scores.sort_values(ascending=False).drop(user_id, errors='ignore')
+
+    rated_products = user_item_matrix.loc[user_id][user_item_matrix.loc[user_id] > 0].index.tolist()
+
+    recommendations = {}
+    for similar_user_id, similarity in similar_users.items():
+        if similar_user_id in user_item_matrix.index:
+            similar_user_rated_products = user_item_matrix.loc[similar_user_id][user_item_matrix.loc[similar_user_id] > 0].index.tolist()
+            unseen_products = [product for product in similar_user_rated_products if product not in rated_products]
+
+            for product_id in unseen_products:
+                if product_id not in recommendations:
+                    recommendations[product_id] = 0
+                if product_id in user_item_matrix.columns:
+                    recommendations[product_id] += similarity * user_item_matrix.loc[similar_user_id, product_id]
+
+    sorted_recommendations = sorted(recommendations.items(), key=lambda item: item[1], reverse=True)
+    return [product_id for product_id, score in sorted_recommendations[:top_n]]
+
+
+def synthetic_feedback(n_users, n_products, ratings_per_user, seed):
+    rng = np.random.default_rng(seed)
+    user_ids = np.repeat([f"u{i}" for i in range(n_users)], ratings_per_user)
+    product_ids = [f"p{i}" for i in rng.integers(0, n_products, size=len(user_ids))]
+    ratings = rng.integers(1, 6, size=len(user_ids))
+    feedback_df = pd.DataFrame({"user_id": user_ids, "product_id": product_ids, "rating": ratings})
+    return feedback_df.drop_duplicates(subset=['user_id', 'product_id'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da pontuação colaborativa.")
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--products', type=int, default=300)
+    parser.add_argument('--ratings-per-user', type=int, default=20)
+    parser.add_argument('--queries', type=int, default=20)
+    parser.add_argument('--top-n', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    feedback_df = synthetic_feedback(args.users, args.products, args.ratings_per_user, args.seed)
+    user_item_matrix, user_ids, product_ids = create_user_item_matrix(feedback_df)
+    user_similarity, _ = calculate_user_similarity(user_item_matrix)
+    query_users = user_ids[:args.queries]
+
+    start = time.perf_counter()
+    legacy_results = [
+        legacy_collaborative_recommendations(user_id, user_item_matrix, user_similarity, user_ids, product_ids, args.top_n)
+        for user_id in query_users
+    ]
+    legacy_time = (time.perf_counter() - start) / len(query_users)
+
+    ratings_csr = user_item_csr(user_item_matrix, user_ids)
+    start = time.perf_counter()
+    vectorized_results = [
+        get_collaborative_recommendations(user_id, user_item_matrix, user_similarity, user_ids, product_ids, args.top_n,
+                                          ratings_csr=ratings_csr)
+        for user_id in query_users
+    ]
+    vectorized_time = (time.perf_counter() - start) / len(query_users)
+
+    recommender = CollaborativeRecommender(db_manager=None, n_neighbors=len(user_ids))
+    recommender.fit(feedback_df)
+    start = time.perf_counter()
+    for user_id in query_users:
+        recommender.recommend(user_id, args.top_n)
+    sparse_time = (time.perf_counter() - start) / len(query_users)
+
+    matches = sum(legacy == vectorized for legacy, vectorized in zip(legacy_results, vectorized_results))
+    print(f"Usuários: {len(user_ids)}, produtos: {len(product_ids)}, avaliações: {recommender.user_item_matrix.nnz}")
+    print(f"Laço original:      {legacy_time * 1000:9.3f} ms/consulta")
+    print(f"Vetorizado (CSR):   {vectorized_time * 1000:9.3f} ms/consulta ({legacy_time / vectorized_time:.1f}x)")
+    print(f"Esparso (vizinhos): {sparse_time * 1000:9.3f} ms/consulta ({legacy_time / sparse_time:.1f}x)")
+    print(f"Rankings idênticos ao original: {matches}/{len(query_users)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+# Compara planos e tempos (EXPLAIN ANALYZE) das consultas quentes antes e
+# depois dos índices declarados nos modelos, sobre dados sintéticos gerados no
+# próprio Postgres com generate_series. Tudo roda num schema separado, que é
+# removido no final (a menos que se passe --keep). Uso:
+#   python benchmarks/index_query_plans.py --feedback-rows 10000000
+#
+# Com 10M linhas a carga leva alguns minutos (as chaves estrangeiras são
+# verificadas linha a linha, como em produção).
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+from sqlalchemy import MetaData, text
+from sqlalchemy.schema import CreateIndex, DropIndex
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.database.db_manager import (
+    DBManager, User, Product, Feedback, Interaction, PARTITIONED_TABLES, ensure_table_partitions, month_start, add_months
+)
+
+BENCH_SCHEMA = 'bench_indexes'
+N_INTERESTS = 50
+N_CATEGORIES = 40
+
+QUERIES = [
+    ("login por nome", "SELECT * FROM users WHERE name = 'Usuário 4242'"),
+    ("usuários por interesse", "SELECT user_id FROM users WHERE interests @> ARRAY['interesse7']::varchar[]"),
+    ("produtos por categoria", "SELECT product_id FROM products WHERE category = 'categoria13'"),
+    ("produtos por atributo", "SELECT product_id FROM products WHERE attributes @> '{\"tipo_tenis\": \"tipo3\"}'"),
+    ("feedback de um usuário", "SELECT * FROM feedback WHERE user_id = 'u4242'"),
+    ("nota média de um produto", "SELECT count(*), avg(rating) FROM feedback WHERE product_id = 'p777'"),
+    ("popularidade do último dia",
+     "SELECT product_id, sum(rating), count(*) FROM feedback "
+     "WHERE timestamp >= now() - interval '1 day' GROUP BY product_id"),
+    ("interações de um usuário", "SELECT * FROM interactions WHERE user_id = 'u4242'"),
+    ("interações de um produto", "SELECT count(*) FROM interactions WHERE product_id = 'p777'"),
+    ("interações da última hora", "SELECT product_id, type FROM interactions WHERE timestamp >= now() - interval '1 hour'"),
+]
+
+
+def create_bench_tables(connection):
+    connection.execute(text(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE"))
+    connection.execute(text(f"CREATE SCHEMA {BENCH_SCHEMA}"))
+    metadata = MetaData()
+    tables = [model.__table__.to_metadata(metadata, schema=BENCH_SCHEMA) for model in (User, Product, Feedback, Interaction)]
+    for table in tables:
+        table.create(connection)
+        # Estado "antes": só as chaves e restrições únicas que já existiam.
+        for index in table.indexes:
+            connection.execute(DropIndex(index))
+        if table.name in PARTITIONED_TABLES:
+            # Os eventos sintéticos cobrem os últimos 365 dias.
+            current_month = month_start(datetime.now())
+            ensure_table_partitions(connection, table, [add_months(current_month, -offset) for offset in range(13)])
+    return tables
+
+
+def load_synthetic_data(connection, n_users, n_products, n_feedback, n_interactions):
+    connection.execute(text(f"""
+        INSERT INTO {BENCH_SCHEMA}.users (id, user_id, name, email, created_at, interests)
+        SELECT gen_random_uuid(), 'u' || g, 'Usuário ' || g, 'u' || g || '@exemplo.com', now(),
+               ARRAY['interesse' || (g % {N_INTERESTS}), 'interesse' || ((g * 7) % {N_INTERESTS})]
+        FROM generate_series(1, :n) g
+    """), {"n": n_users})
+    connection.execute(text(f"""
+        INSERT INTO {BENCH_SCHEMA}.products (id, product_id, name, category, brand, price, attributes)
+        SELECT gen_random_uuid(), 'p' || g, 'Produto ' || g, 'categoria' || (g % {N_CATEGORIES}), 'marca' || (g % 200),
+               (random() * 1000)::numeric(10, 2),
+               jsonb_build_object('tipo_tenis', 'tipo' || (g % 20), 'cor', 'cor' || (g % 12))
+        FROM generate_series(1, :n) g
+    """), {"n": n_products})
+    connection.execute(text(f"""
+        INSERT INTO {BENCH_SCHEMA}.feedback (id, user_id, product_id, rating, timestamp)
+        SELECT gen_random_uuid(), 'u' || (1 + (random() * (:users - 1))::int), 'p' || (1 + (random() * (:products - 1))::int),
+               1 + (random() * 4)::int, now() - random() * interval '365 days'
+        FROM generate_series(1, :n) g
+    """), {"n": n_feedback, "users": n_users, "products": n_products})
+    connection.execute(text(f"""
+        INSERT INTO {BENCH_SCHEMA}.interactions (id, user_id, product_id, type, timestamp)
+        SELECT gen_random_uuid(), 'u' || (1 + (random() * (:users - 1))::int), 'p' || (1 + (random() * (:products - 1))::int),
+               (ARRAY['view', 'click', 'add_to_cart', 'purchase'])[1 + (random() * 3)::int], now() - random() * interval '365 days'
+        FROM generate_series(1, :n) g
+    """), {"n": n_interactions, "users": n_users, "products": n_products})
+
+
+def analyze(connection, tables):
+    for table in tables:
+        connection.execute(text(f"ANALYZE {BENCH_SCHEMA}.{table.name}"))
+
+
+def explain(connection, sql, repeat):
+    best = None
+    for _ in range(repeat):
+        plan = connection.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}")).scalar()
+        plan = (json.loads(plan) if isinstance(plan, str) else plan)[0]
+        if best is None or plan["Execution Time"] < best["Execution Time"]:
+            best = plan
+    return best["Execution Time"], _plan_nodes(best["Plan"])
+
+
+def _plan_nodes(node):
+    name = node["Node Type"]
+    if node.get("Index Name"):
+        name += f" ({node['Index Name']})"
+    children = [_plan_nodes(child) for child in node.get("Plans", [])]
+    return name if not children else f"{name} <- {', '.join(children)}"
+
+
+def run_queries(connection, repeat):
+    connection.execute(text(f"SET search_path TO {BENCH_SCHEMA}"))
+    return {label: explain(connection, sql, repeat) for label, sql in QUERIES}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN ANALYZE das consultas quentes antes e depois dos índices.")
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--products', type=int, default=20000)
+    parser.add_argument('--feedback-rows', type=int, default=10000000)
+    parser.add_argument('--interaction-rows', type=int, default=10000000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--keep', action='store_true', help="Mantém o schema de benchmark no final.")
+    args = parser.parse_args()
+
+    engine = DBManager().engine
+    with engine.begin() as connection:
+        tables = create_bench_tables(connection)
+        started = time.perf_counter()
+        load_synthetic_data(connection, args.users, args.products, args.feedback_rows, args.interaction_rows)
+        print(f"Dados sintéticos carregados em {time.perf_counter() - started:.1f}s.")
+
+    try:
+        with engine.begin() as connection:
+            analyze(connection, tables)
+            before = run_queries(connection, args.repeat)
+
+        with engine.begin() as connection:
+            for table in tables:
+                for index in sorted(table.indexes, key=lambda index: index.name):
+                    started = time.perf_counter()
+                    connection.execute(CreateIndex(index))
+                    print(f"Índice {index.name} criado em {time.perf_counter() - started:.1f}s.")
+            analyze(connection, tables)
+            after = run_queries(connection, args.repeat)
+
+        print()
+        print(f"{'consulta':30s} {'antes (ms)':>12s} {'depois (ms)':>12s} {'ganho':>8s}")
+        for label, _ in QUERIES:
+            before_ms, _ = before[label]
+            after_ms, _ = after[label]
+            speedup = before_ms / after_ms if after_ms > 0 else float('inf')
+            print(f"{label:30s} {before_ms:12.2f} {after_ms:12.2f} {speedup:7.1f}x")
+        print()
+        for label, _ in QUERIES:
+            print(f"{label}:\n  antes:  {before[label][1]}\n  depois: {after[label][1]}")
+    finally:
+        if not args.keep:
+            with engine.begin() as connection:
+                connection.execute(text(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE"))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,253 @@
+import os
+import sys
+import logging
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from src.algorithms import model_store
+from src.utils.ranking import top_k_indices
+
+ANN_N_PROBE = int(os.getenv("ANN_N_PROBE", "8"))
+ANN_KMEANS_ITERATIONS = 20
+ANN_TRAINING_POINTS_PER_LIST = 256
+ANN_ASSIGN_CHUNK_SIZE = 4096
+CONTENT_ANN_NAME = "content_ivf"
+CONTENT_ANN_COMPONENTS = int(os.getenv("CONTENT_ANN_COMPONENTS", "128"))
+
+
+def _normalize_rows(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _nearest_centroids(vectors, centroids, chunk_size=ANN_ASSIGN_CHUNK_SIZE):
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), chunk_size):
+        assignments[start:start + chunk_size] = np.argmax(vectors[start:start + chunk_size] @ centroids.T, axis=1)
+    return assignments
+
+
+def _spherical_kmeans(vectors, n_lists, iterations, rng):
+    # K-means esférico (similaridade de cosseno) treinado sobre uma amostra.
+    n_training = min(len(vectors), n_lists * ANN_TRAINING_POINTS_PER_LIST)
+    sample = vectors[rng.choice(len(vectors), size=n_training, replace=False)]
+    centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = _nearest_centroids(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        counts = np.bincount(assignments, minlength=n_lists)
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()), replace=False)]
+        centroids = _normalize_rows(sums)
+    return centroids
+
+
+class IVFIndex:
+    # Índice IVF (inverted file) para busca aproximada por produto interno /
+    # cosseno: os vetores são agrupados por k-means e a consulta só varre as
+    # n_probe listas cujos centróides são mais próximos. Aumentar n_probe
+    # troca latência por recall; n_probe = n_lists equivale à busca exata.
+    def __init__(self, n_lists=None, n_probe=ANN_N_PROBE, normalize=True, random_state=42):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.normalize = normalize
+        self.random_state = random_state
+        self.centroids = None
+        self.list_offsets = None
+        self.row_ids = None
+        self.vectors = None
+
+    def build(self, vectors, iterations=ANN_KMEANS_ITERATIONS):
+        vectors = _normalize_rows(vectors) if self.normalize else np.asarray(vectors, dtype=np.float32)
+        n_vectors = len(vectors)
+        if n_vectors == 0:
+            raise ValueError("Não há vetores para indexar.")
+        n_lists = self.n_lists if self.n_lists else max(1, int(np.sqrt(n_vectors)))
+        n_lists = min(n_lists, n_vectors)
+        rng = np.random.default_rng(self.random_state)
+
+        centroids = _spherical_kmeans(vectors, n_lists, iterations, rng)
+        assignments = _nearest_centroids(vectors, centroids)
+
+        # Vetores reordenados por lista: cada lista é um bloco contíguo, o que
+        # mantém a varredura das listas sondadas sequencial na memória.
+        order = np.argsort(assignments, kind='stable')
+        counts = np.bincount(assignments, minlength=n_lists)
+        self.n_lists = n_lists
+        self.centroids = centroids.astype(np.float32)
+        self.list_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        self.row_ids = order.astype(np.int64)
+        self.vectors = np.ascontiguousarray(vectors[order])
+        logging.info(f"Índice IVF construído: {n_vectors} vetores em {n_lists} listas.")
+        return self
+
+    def search(self, query, k=10, n_probe=None):
+        query = np.asarray(query, dtype=np.float32).ravel()
+        if self.normalize:
+            query = _normalize_rows(query[None, :])[0]
+        n_probe = min(n_probe if n_probe else self.n_probe, self.n_lists)
+
+        probed_lists = top_k_indices(self.centroids @ query, n_probe)
+        blocks = [np.arange(self.list_offsets[i], self.list_offsets[i + 1]) for i in probed_lists]
+        positions = np.concatenate(blocks) if blocks else np.empty(0, dtype=np.int64)
+        if not len(positions):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        scores = self.vectors[positions] @ query
+        best = top_k_indices(scores, k)
+        return self.row_ids[positions[best]], scores[best]
+
+    def search_batch(self, queries, k=10, n_probe=None):
+        return [self.search(query, k, n_probe) for query in np.asarray(queries, dtype=np.float32)]
+
+    def _arrays(self):
+        return {
+            "centroids": self.centroids,
+            "list_offsets": self.list_offsets,
+            "row_ids": self.row_ids,
+            "vectors": self.vectors
+        }
+
+    def _metadata(self):
+        return {"n_lists": self.n_lists, "n_probe": self.n_probe, "normalize": self.normalize}
+
+    @classmethod
+    def _from_artifact(cls, arrays, metadata):
+        index = cls(n_lists=metadata["n_lists"], n_probe=metadata["n_probe"], normalize=metadata["normalize"])
+        index.centroids = arrays["centroids"]
+        index.list_offsets = arrays["list_offsets"]
+        index.row_ids = arrays["row_ids"]
+        index.vectors = arrays["vectors"]
+        return index
+
+    def save(self, name, fingerprint, model_dir=None):
+        return model_store.save_artifact(name, fingerprint, arrays=self._arrays(), metadata=self._metadata(), model_dir=model_dir)
+
+    @classmethod
+    def load(cls, name, fingerprint, model_dir=None, mmap=True):
+        artifact = model_store.load_artifact(name, fingerprint, model_dir=model_dir, mmap=mmap)
+        if artifact is None:
+            return None
+        arrays, _, metadata = artifact
+        return cls._from_artifact(arrays, metadata)
+
+
+class ContentANNIndex:
+    # IVF sobre os embeddings SVD do TF-IDF de conteúdo, com o que é preciso
+    # para usá-lo sozinho: os componentes do SVD (para projetar uma consulta
+    # TF-IDF no mesmo espaço) e os product_ids de cada linha indexada, para
+    # que o resultado continue valendo depois que o modelo de conteúdo muda.
+    def __init__(self, ivf, components, product_ids):
+        self.ivf = ivf
+        self.components = components
+        self.product_ids = product_ids
+
+    @classmethod
+    def build(cls, tfidf_matrix, product_ids, n_components=CONTENT_ANN_COMPONENTS, n_lists=None):
+        embeddings, svd = content_embeddings(tfidf_matrix, n_components)
+        ivf = IVFIndex(n_lists=n_lists).build(embeddings)
+        return cls(ivf, svd.components_.astype(np.float32), np.asarray(product_ids, dtype=str))
+
+    @property
+    def n_features(self):
+        return self.components.shape[1]
+
+    def embed(self, tfidf_vectors):
+        # Mesma projeção de TruncatedSVD.transform: X @ componentes.T.
+        return np.asarray(tfidf_vectors @ self.components.T, dtype=np.float32)
+
+    def query(self, tfidf_vector, k=10, n_probe=None):
+        # product_ids aproximadamente mais próximos de um vetor TF-IDF (ou
+        # perfil) no vocabulário do modelo indexado, do mais para o menos similar.
+        if tfidf_vector.shape[-1] != self.n_features:
+            raise ValueError(f"Vetor com {tfidf_vector.shape[-1]} termos; o índice espera {self.n_features}.")
+        rows, _ = self.ivf.search(self.embed(tfidf_vector)[0], k, n_probe)
+        return self.product_ids[rows].tolist()
+
+    def save(self, fingerprint, name=CONTENT_ANN_NAME, model_dir=None):
+        arrays = dict(self.ivf._arrays(), components=self.components, product_ids=self.product_ids)
+        return model_store.save_artifact(name, fingerprint, arrays=arrays, metadata=self.ivf._metadata(), model_dir=model_dir)
+
+    @classmethod
+    def load(cls, fingerprint, name=CONTENT_ANN_NAME, model_dir=None, mmap=True):
+        artifact = model_store.load_artifact(name, fingerprint, model_dir=model_dir, mmap=mmap)
+        if artifact is None:
+            return None
+        arrays, _, metadata = artifact
+        if "components" not in arrays or "product_ids" not in arrays:
+            return None
+        return cls(IVFIndex._from_artifact(arrays, metadata), arrays["components"], arrays["product_ids"])
+
+
+def exact_search(vectors, query, k=10, normalize=True):
+    vectors = _normalize_rows(vectors) if normalize else np.asarray(vectors, dtype=np.float32)
+    query = np.asarray(query, dtype=np.float32).ravel()
+    if normalize:
+        query = _normalize_rows(query[None, :])[0]
+    scores = vectors @ query
+    best = top_k_indices(scores, k)
+    return best, scores[best]
+
+
+def recall_at_k(index, vectors, queries, k=10, n_probe=None):
+    # Fração dos k vizinhos exatos que a busca aproximada também devolve.
+    hits = 0
+    total = 0
+    for query in np.asarray(queries, dtype=np.float32):
+        exact_rows, _ = exact_search(vectors, query, k, index.normalize)
+        approximate_rows, _ = index.search(query, k, n_probe)
+        hits += len(np.intersect1d(exact_rows, approximate_rows))
+        total += len(exact_rows)
+    return hits / total if total else 1.0
+
+
+def content_embeddings(tfidf_matrix, n_components=128, random_state=42):
+    # TF-IDF reduzido por SVD truncado: vetores densos pequenos para o IVF.
+    from sklearn.decomposition import TruncatedSVD
+
+    n_components = max(1, min(n_components, tfidf_matrix.shape[1] - 1))
+    svd = TruncatedSVD(n_components=n_components, random_state=random_state)
+    embeddings = svd.fit_transform(tfidf_matrix).astype(np.float32)
+    return embeddings, svd
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    from src.database.db_manager import DBManager
+    from src.algorithms.content_based import ContentBasedRecommender
+
+    parser = argparse.ArgumentParser(description="Constrói o índice IVF dos produtos e mede recall@k contra a busca exata.")
+    parser.add_argument('--components', type=int, default=CONTENT_ANN_COMPONENTS)
+    parser.add_argument('--lists', type=int, default=None)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--probes', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    recommender = ContentBasedRecommender(DBManager())
+    if recommender.tfidf_matrix is None:
+        print("Não há produtos para indexar.")
+        sys.exit(1)
+
+    content_index = ContentANNIndex.build(recommender.tfidf_matrix, recommender.model.product_ids, args.components, args.lists)
+    if recommender.fingerprint:
+        # Lido pelo ContentBasedRecommender quando CONTENT_ANN_ENABLED=1.
+        content_index.save(recommender.fingerprint)
+
+    index = content_index.ivf
+    embeddings = content_index.embed(recommender.tfidf_matrix)
+    rng = np.random.default_rng(0)
+    queries = embeddings[rng.choice(len(embeddings), size=min(args.queries, len(embeddings)), replace=False)]
+    for n_probe in args.probes:
+        start = time.perf_counter()
+        recall = recall_at_k(index, embeddings, queries, args.k, n_probe)
+        elapsed = (time.perf_counter() - start) / len(queries)
+        print(f"n_probe={n_probe:3d}  recall@{args.k}={recall:.3f}  ({elapsed * 1000:.2f} ms/consulta, incluindo busca exata)")
@@ -1,22 +1,51 @@
+import os
+import logging
+from datetime import datetime, timedelta
+import numpy as np
 import pandas as pd
+from scipy import sparse
 from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
 from src.database.db_manager import DBManager
+from src.algorithms import model_store
+from src.structures.id_encoder import IdEncoder
+from src.utils.ranking import top_k_indices
 
-db_manager = DBManager()
+COLLABORATIVE_NEIGHBORS = int(os.getenv("COLLABORATIVE_NEIGHBORS", "50"))
+SIMILARITY_CHUNK_SIZE = int(os.getenv("SIMILARITY_CHUNK_SIZE", "1000"))
+COLLABORATIVE_MODEL_NAME = "collaborative_user_knn"
+# Peso implícito de cada tipo de interação ao combiná-las com as notas.
+INTERACTION_WEIGHTS = {'view': 1.0, 'click': 2.0, 'add_to_cart': 3.0, 'purchase': 5.0}
+DEFAULT_INTERACTION_WEIGHT = 1.0
+# Só os eventos dos últimos N dias entram no treino (0 = histórico inteiro);
+# com as tabelas particionadas por mês a leitura toca só as partições recentes.
+TRAINING_WINDOW_DAYS = int(os.getenv("TRAINING_WINDOW_DAYS", "365"))
+
+_db_manager = None
+
+def _get_db_manager():
+    # Criado sob demanda: importar o módulo não deve abrir conexões.
+    global _db_manager
+    if _db_manager is None:
+        _db_manager = DBManager()
+    return _db_manager
+
+def training_window_start():
+    return datetime.now() - timedelta(days=TRAINING_WINDOW_DAYS) if TRAINING_WINDOW_DAYS > 0 else None
 
 def load_feedback():
-    return db_manager.load_data_into_df('feedback')
+    return _get_db_manager().read_table_frame('feedback', columns=['user_id', 'product_id', 'rating'], since=training_window_start())
 
 def load_users():
-    return db_manager.load_data_into_df('users')
+    return _get_db_manager().load_data_into_df('users')
 
 def load_products():
-    return db_manager.load_data_into_df('products')
+    return _get_db_manager().load_data_into_df('products')
 
 def create_user_item_matrix(feedback_df):
     if feedback_df.empty:
         return None, None, None
-    user_item_matrix = feedback_df.pivot_table(index='user_id', columns='product_id', values='rating')
+    user_item_matrix = feedback_df.pivot_table(index='user_id', columns='product_id', values='rating', observed=True)
     user_ids = user_item_matrix.index.tolist()
     product_ids = user_item_matrix.columns.tolist()
     return user_item_matrix.fillna(0), user_ids, product_ids
@@ -27,30 +56,219 @@ def calculate_user_similarity(user_item_matrix):
     user_similarity = cosine_similarity(user_item_matrix)
     return user_similarity, user_item_matrix.index
 
-def get_collaborative_recommendations(user_id, user_item_matrix, user_similarity, user_ids, product_ids, top_n=5):
+def user_item_csr(user_item_matrix, user_ids):
+    # Notas positivas da matriz usuário x produto em CSR, linhas na ordem de
+    # user_ids. Montar uma vez e passar para get_collaborative_recommendations.
+    if user_item_matrix is None:
+        return None
+    ratings = sparse.csr_matrix(user_item_matrix.reindex(index=user_ids, fill_value=0).to_numpy(dtype=float))
+    ratings.data[ratings.data < 0] = 0.0
+    ratings.eliminate_zeros()
+    return ratings
+
+def get_collaborative_recommendations(user_id, user_item_matrix, user_similarity, user_ids, product_ids, top_n=5,
+                                      ratings_csr=None):
     if user_item_matrix is None or user_similarity is None or user_id not in user_ids:
         return []
 
+    # Pontuação vetorizada: um produto esparso notas.T x similaridade, com
+    # máscara para os produtos que o usuário já avaliou. Candidatos são os
+    # produtos avaliados por algum outro usuário, como no laço original. Sem
+    # ratings_csr (user_item_csr) a matriz é convertida a cada chamada.
+    if ratings_csr is None:
+        ratings_csr = user_item_csr(user_item_matrix, user_ids)
     user_index = user_ids.index(user_id)
-    similarity_scores = pd.Series(user_similarity[user_index], index=user_ids)
-    similar_users = similarity_scores.sort_values(ascending=False).drop(user_id, errors='ignore')
 
-    rated_products = user_item_matrix.loc[user_id][user_item_matrix.loc[user_id] > 0].index.tolist()
+    similarity = np.array(user_similarity[user_index], dtype=float).ravel()
+    similarity[user_index] = 0.0
+    scores = ratings_csr.T @ similarity
+
+    user_row = ratings_csr.indices[ratings_csr.indptr[user_index]:ratings_csr.indptr[user_index + 1]]
+    raters = ratings_csr.getnnz(axis=0)
+    raters[user_row] -= 1
+    candidate_mask = raters > 0
+    candidate_mask[user_row] = False
+    candidate_items = np.flatnonzero(candidate_mask)
+    if not len(candidate_items):
+        return []
+
+    best = top_k_indices(scores[candidate_items], top_n)
+    columns = user_item_matrix.columns
+    return [columns[index] for index in candidate_items[best]]
+
+def build_sparse_user_item_matrix(feedback_df):
+    # Matriz usuários x produtos em CSR, com notas repetidas do mesmo par
+    # reduzidas pela média (mesma regra do pivot_table).
+    if feedback_df is None or feedback_df.empty:
+        return None, IdEncoder(), IdEncoder()
+
+    users = feedback_df['user_id'].astype('category')
+    products = feedback_df['product_id'].astype('category')
+    user_encoder = IdEncoder(users.cat.categories)
+    product_encoder = IdEncoder(products.cat.categories)
+    user_codes = users.cat.codes.to_numpy()
+    product_codes = products.cat.codes.to_numpy()
+    shape = (len(user_encoder), len(product_encoder))
+
+    rating_sums = sparse.csr_matrix(
+        (feedback_df['rating'].to_numpy(dtype=np.float32), (user_codes, product_codes)), shape=shape
+    )
+    rating_counts = sparse.csr_matrix(
+        (np.ones(len(feedback_df), dtype=np.float32), (user_codes, product_codes)), shape=shape
+    )
+    rating_sums.sum_duplicates()
+    rating_counts.sum_duplicates()
+    rating_sums.data /= rating_counts.data
+    rating_sums.eliminate_zeros()
+    return rating_sums, user_encoder, product_encoder
+
+
+def interaction_weight(interaction_type, interaction_weights=None):
+    interaction_weights = interaction_weights if interaction_weights else INTERACTION_WEIGHTS
+    return float(interaction_weights.get(str(interaction_type).lower(), DEFAULT_INTERACTION_WEIGHT))
+
+
+def interaction_strengths(interactions_df, interaction_weights=None):
+    interaction_weights = interaction_weights if interaction_weights else INTERACTION_WEIGHTS
+    types = interactions_df['type'].astype(str).str.lower()
+    return types.map(interaction_weights).fillna(DEFAULT_INTERACTION_WEIGHT).to_numpy(dtype=np.float32)
+
+
+def build_interaction_matrix(feedback_df, interactions_df, interaction_weights=None):
+    # Matriz implícita usuários x produtos: soma das notas (feedback) com os
+    # pesos das interações (view, click, purchase...) de cada par.
+    user_parts, product_parts, value_parts = [], [], []
+    if feedback_df is not None and not feedback_df.empty:
+        user_parts.append(feedback_df['user_id'].astype(str).to_numpy())
+        product_parts.append(feedback_df['product_id'].astype(str).to_numpy())
+        value_parts.append(feedback_df['rating'].to_numpy(dtype=np.float32))
+    if interactions_df is not None and not interactions_df.empty:
+        user_parts.append(interactions_df['user_id'].astype(str).to_numpy())
+        product_parts.append(interactions_df['product_id'].astype(str).to_numpy())
+        value_parts.append(interaction_strengths(interactions_df, interaction_weights))
+    if not value_parts:
+        return None, IdEncoder(), IdEncoder()
+
+    users = pd.Categorical(np.concatenate(user_parts))
+    products = pd.Categorical(np.concatenate(product_parts))
+    user_encoder = IdEncoder(users.categories)
+    product_encoder = IdEncoder(products.categories)
+    matrix = sparse.csr_matrix(
+        (np.concatenate(value_parts), (users.codes, products.codes)),
+        shape=(len(user_encoder), len(product_encoder))
+    )
+    matrix.sum_duplicates()
+    return matrix, user_encoder, product_encoder
+
+
+def top_k_neighbors(user_item_matrix, n_neighbors=COLLABORATIVE_NEIGHBORS, chunk_size=SIMILARITY_CHUNK_SIZE):
+    # Similaridade de cosseno esparsa, calculada em blocos de usuários e
+    # truncada nos n_neighbors mais similares de cada um: a memória cresce com
+    # usuários x vizinhos, nunca com usuários².
+    n_users = user_item_matrix.shape[0]
+    normalized = normalize(user_item_matrix, norm='l2', axis=1).astype(np.float32)
+    normalized_t = normalized.T.tocsc()
+
+    rows, cols, values = [], [], []
+    for start in range(0, n_users, chunk_size):
+        stop = min(start + chunk_size, n_users)
+        similarities = (normalized[start:stop] @ normalized_t).tocsr()
+        for offset in range(stop - start):
+            user_index = start + offset
+            row_start, row_end = similarities.indptr[offset], similarities.indptr[offset + 1]
+            neighbor_indices = similarities.indices[row_start:row_end]
+            neighbor_scores = similarities.data[row_start:row_end]
+            keep = (neighbor_indices != user_index) & (neighbor_scores > 0)
+            neighbor_indices, neighbor_scores = neighbor_indices[keep], neighbor_scores[keep]
+            best = top_k_indices(neighbor_scores, n_neighbors)
+            rows.append(np.full(len(best), user_index, dtype=np.int64))
+            cols.append(neighbor_indices[best])
+            values.append(neighbor_scores[best])
+
+    if not rows:
+        return sparse.csr_matrix((n_users, n_users), dtype=np.float32)
+    return sparse.csr_matrix(
+        (np.concatenate(values), (np.concatenate(rows), np.concatenate(cols))), shape=(n_users, n_users)
+    )
+
+
+class CollaborativeRecommender:
+    def __init__(self, db_manager, n_neighbors=COLLABORATIVE_NEIGHBORS, chunk_size=SIMILARITY_CHUNK_SIZE):
+        self.db_manager = db_manager
+        self.n_neighbors = n_neighbors
+        self.chunk_size = chunk_size
+        self.user_item_matrix = None
+        self.neighbors = None
+        self.user_encoder = IdEncoder()
+        self.product_encoder = IdEncoder()
+
+    def fit(self, feedback_df=None):
+        try:
+            if feedback_df is None:
+                feedback_df = self.db_manager.read_table_frame(
+                    'feedback', columns=['user_id', 'product_id', 'rating'], since=training_window_start()
+                )
+            self.user_item_matrix, self.user_encoder, self.product_encoder = build_sparse_user_item_matrix(feedback_df)
+            if self.user_item_matrix is None:
+                self.neighbors = None
+                return self
+            self.neighbors = top_k_neighbors(self.user_item_matrix, self.n_neighbors, self.chunk_size)
+            logging.info(
+                f"Modelo colaborativo treinado: {len(self.user_encoder)} usuários, {len(self.product_encoder)} produtos, "
+                f"{self.user_item_matrix.nnz} avaliações."
+            )
+        except Exception as e:
+            logging.error(f"Erro ao treinar modelo colaborativo: {e}")
+            self.user_item_matrix = None
+            self.neighbors = None
+        return self
+
+    def save(self, fingerprint, model_dir=None):
+        if self.user_item_matrix is None:
+            return None
+        return model_store.save_artifact(
+            COLLABORATIVE_MODEL_NAME,
+            fingerprint,
+            sparse_matrices={"user_item": self.user_item_matrix, "neighbors": self.neighbors},
+            metadata={
+                "n_neighbors": self.n_neighbors,
+                "user_ids": self.user_encoder.ids,
+                "product_ids": self.product_encoder.ids
+            },
+            model_dir=model_dir
+        )
+
+    @classmethod
+    def load(cls, db_manager, fingerprint, model_dir=None, mmap=True):
+        artifact = model_store.load_artifact(COLLABORATIVE_MODEL_NAME, fingerprint, model_dir=model_dir, mmap=mmap)
+        if artifact is None:
+            return None
+        _, sparse_matrices, metadata = artifact
+        recommender = cls(db_manager, n_neighbors=metadata["n_neighbors"])
+        recommender.user_item_matrix = sparse_matrices["user_item"]
+        recommender.neighbors = sparse_matrices["neighbors"]
+        recommender.user_encoder = IdEncoder(metadata["user_ids"])
+        recommender.product_encoder = IdEncoder(metadata["product_ids"])
+        return recommender
+
+    def recommend(self, user_id, top_n=5):
+        user_index = self.user_encoder.encode(user_id)
+        if user_index is None or self.neighbors is None:
+            return []
 
-    recommendations = {}
-    for similar_user_id, similarity in similar_users.items():
-        if similar_user_id in user_item_matrix.index:
-            similar_user_rated_products = user_item_matrix.loc[similar_user_id][user_item_matrix.loc[similar_user_id] > 0].index.tolist()
-            unseen_products = [product for product in similar_user_rated_products if product not in rated_products]
+        neighbor_row = self.neighbors[user_index]
+        if neighbor_row.nnz == 0:
+            return []
 
-            for product_id in unseen_products:
-                if product_id not in recommendations:
-                    recommendations[product_id] = 0
-                if product_id in user_item_matrix.columns:
-                    recommendations[product_id] += similarity * user_item_matrix.loc[similar_user_id, product_id]
+        scores = (neighbor_row @ self.user_item_matrix).toarray().ravel()
+        candidate_items = np.unique(self.user_item_matrix[neighbor_row.indices].indices)
+        rated_items = self.user_item_matrix[user_index].indices
+        candidate_items = np.setdiff1d(candidate_items, rated_items, assume_unique=True)
+        if not len(candidate_items):
+            return []
 
-    sorted_recommendations = sorted(recommendations.items(), key=lambda item: item[1], reverse=True)
-    return [product_id for product_id, score in sorted_recommendations[:top_n]]
+        best = top_k_indices(scores[candidate_items], top_n)
+        return self.product_encoder.decode_many(candidate_items[best])
 
 if __name__ == '__main__':
     feedback_df = load_feedback()
@@ -59,13 +277,16 @@ if __name__ == '__main__':
 
     user_item_matrix, user_ids, product_ids = create_user_item_matrix(feedback_df)
     user_similarity, user_index_list = calculate_user_similarity(user_item_matrix)
+    ratings_csr = user_item_csr(user_item_matrix, user_ids)
 
     if user_ids:
         user_id_to_recommend = user_ids[0]
         if product_ids is None:
             print("Não há dados de feedback para criar a matriz user-item.")
         else:
-            recommendations = get_collaborative_recommendations(user_id_to_recommend, user_item_matrix, user_similarity, user_ids, product_ids)
+            recommendations = get_collaborative_recommendations(
+                user_id_to_recommend, user_item_matrix, user_similarity, user_ids, product_ids, ratings_csr=ratings_csr
+            )
             print(f"Recomendações colaborativas para o usuário {user_id_to_recommend}: {recommendations}")
     else:
         print("Não há dados de feedback para gerar recomendações colaborativas.")
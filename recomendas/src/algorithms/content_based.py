@@ -1,9 +1,18 @@
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import linear_kernel
+from scipy import sparse
+import numpy as np
 import pandas as pd
 import logging
+import os
+import threading
 
 from src.database.db_manager import DBManager, Product, User
+from src.algorithms import model_store
+from src.algorithms.ann_index import ContentANNIndex
+from src.structures.inverted_index import InvertedIndex
+from src.structures.snapshot import SnapshotHolder
+from src.utils.ranking import SCORING_CHUNK_SIZE, scoring_rows_per_block, top_k_indices, top_k_rows
 
 portuguese_stop_words = [
     'a', 'ao', 'aos', 'aquela', 'aquelas', 'aquele', 'aqueles', 'aquilo', 'as', 'às', 'até', 'com', 'como', 'da', 'das',
@@ -28,88 +37,657 @@ portuguese_stop_words = [
     'viriam', 'viu', 'tudo', 'umas', 'vai', 'vamos', 'ir'
 ]
 
+CONTENT_MODEL_NAME = "content_tfidf"
+# Incrementar sempre que a montagem do texto ou do vetorizador mudar, para
+# invalidar artefatos gravados com a lógica antiga.
+CONTENT_MODEL_VERSION = 2
+PRODUCT_META_COLUMNS = ['product_id', 'category', 'tipo_tenis', 'brand', 'genre', 'attributes']
+# Fração de linhas alteradas (ou de termos novos fora do vocabulário) a partir
+# da qual o modelo é reconstruído por completo em segundo plano.
+CONTENT_DRIFT_THRESHOLD = float(os.getenv("CONTENT_DRIFT_THRESHOLD", "0.2"))
+# Gerador de candidatos aproximado (índice IVF gravado por ann_index.py para o
+# mesmo catálogo): só os CONTENT_ANN_CANDIDATES vizinhos mais as edições
+# recentes são pontuados de forma exata.
+CONTENT_ANN_ENABLED = os.getenv("CONTENT_ANN_ENABLED", "0") == "1"
+CONTENT_ANN_CANDIDATES = int(os.getenv("CONTENT_ANN_CANDIDATES", "200"))
+
+
+def build_products_frame(products_records):
+    products_df = pd.DataFrame(products_records)
+    products_df['content'] = products_df['name'].fillna('') + ' ' + \
+                             products_df['category'].fillna('') + ' ' + \
+                             products_df['brand'].fillna('') + ' ' + \
+                             products_df['description'].fillna('')
+
+    def extract_attributes_for_content(row):
+        attrs_text = []
+        if isinstance(row['attributes'], dict):
+            for value in row['attributes'].values():
+                if isinstance(value, list):
+                    attrs_text.extend([str(item) for item in value])
+                else:
+                    attrs_text.append(str(value))
+        return ' '.join(attrs_text)
+
+    products_df['attributes_text'] = products_df.apply(extract_attributes_for_content, axis=1)
+    products_df['content'] = products_df['content'] + ' ' + products_df['attributes_text'].fillna('')
+    products_df['content'] = products_df['content'].apply(lambda x: x.lower())
+    products_df['category'] = products_df['category'].apply(lambda x: x.lower() if x else '')
+    products_df['tipo_tenis'] = products_df['attributes'].apply(
+        lambda x: x.get('tipo_tenis').lower() if isinstance(x, dict) and x.get('tipo_tenis') else None
+    )
+    return products_df
+
+
+def product_index_fields(product_record):
+    fields = {
+        'category': product_record.get('category'),
+        'tipo_tenis': product_record.get('tipo_tenis'),
+        'brand': product_record.get('brand'),
+        'genre': product_record.get('genre')
+    }
+    attributes = product_record.get('attributes')
+    if isinstance(attributes, dict):
+        for key, value in attributes.items():
+            fields[f"attributes.{key}"] = value
+    return fields
+
+
+def _merge_blocks(blocks):
+    matrices, product_ids, frames = zip(*blocks)
+    return (sparse.vstack(matrices, format='csr'), np.concatenate(product_ids), pd.concat(frames))
+
+
+def _append_block(blocks, block):
+    # Blocos de linhas acrescentadas desde o último ajuste completo. Como num
+    # contador binário, blocos de tamanho parecido são mesclados: cada linha
+    # é copiada O(log n) vezes e o número de blocos fica O(log n), então uma
+    # edição custa o tamanho da edição, não o do catálogo.
+    blocks = list(blocks) + [block]
+    while len(blocks) > 1 and blocks[-2][0].shape[0] <= blocks[-1][0].shape[0]:
+        last = blocks.pop()
+        blocks[-1] = _merge_blocks([blocks[-1], last])
+    return tuple(blocks)
+
+
+class _BaseBlock:
+    # Parte do modelo vinda do ajuste completo, compartilhada por todas as
+    # versões até a próxima reconstrução; a transposta para pontuação em lote
+    # é calculada uma única vez.
+    def __init__(self, products_df, tfidf_matrix):
+        self.products_df = products_df
+        self.tfidf_matrix = tfidf_matrix
+        self.product_ids = products_df['product_id'].to_numpy() if not products_df.empty else np.empty(0, dtype=object)
+        self._transposed = None
+        self._lock = threading.Lock()
+
+    def transposed(self):
+        with self._lock:
+            if self._transposed is None:
+                self._transposed = self.tfidf_matrix.T.tocsc()
+            return self._transposed
+
+
+class ContentModel:
+    # Uma versão do modelo de conteúdo. Não é alterada depois de instalada:
+    # mudanças no catálogo geram uma nova instância, e quem já está lendo
+    # continua com a sua até terminar. As linhas são a base do último ajuste
+    # seguida dos blocos de edições (delta_blocks) e inactive guarda, em
+    # blocos, as linhas substituídas ou removidas; tudo isso é mesclado na
+    # próxima reconstrução.
+    def __init__(self, base, tfidf_vectorizer, fingerprint, attribute_index, version, delta_blocks=(), inactive_blocks=(),
+                 ann_index=None):
+        self.base = base
+        self.ann_index = ann_index
+        self.tfidf_vectorizer = tfidf_vectorizer
+        self.fingerprint = fingerprint
+        self.attribute_index = attribute_index
+        self.version = version
+        self.delta_blocks = delta_blocks
+        self.inactive_blocks = inactive_blocks
+        sizes = [len(base.product_ids)] + [block[0].shape[0] for block in delta_blocks]
+        self.offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+        self.n_rows = int(self.offsets[-1])
+        self.base_rows = int(self.offsets[1])
+        self._cache = {}
+
+    @classmethod
+    def empty(cls):
+        return cls(_BaseBlock(pd.DataFrame(), None), None, None, InvertedIndex(), 0)
+
+    def _cached(self, key, build):
+        value = self._cache.get(key)
+        if value is None:
+            value = build()
+            self._cache[key] = value
+        return value
+
+    def _inactive_rows(self):
+        return self._cached('inactive', lambda: np.concatenate(self.inactive_blocks) if self.inactive_blocks else np.empty(0, dtype=np.int64))
+
+    @property
+    def active(self):
+        def build():
+            mask = np.ones(self.n_rows, dtype=bool)
+            mask[self._inactive_rows()] = False
+            return mask
+        return self._cached('active', build)
+
+    # Visões completas do catálogo, montadas sob demanda (e guardadas nesta
+    # versão) para quem precisa do modelo inteiro, como a exportação de
+    # embeddings. Os caminhos de recomendação usam os blocos diretamente.
+    @property
+    def products_df(self):
+        if not self.delta_blocks:
+            return self.base.products_df
+        return self._cached('products_df', lambda: pd.concat([self.base.products_df] + [block[2] for block in self.delta_blocks]))
+
+    @property
+    def tfidf_matrix(self):
+        if not self.delta_blocks or self.base.tfidf_matrix is None:
+            return self.base.tfidf_matrix
+        return self._cached('tfidf_matrix', lambda: sparse.vstack([self.base.tfidf_matrix] + [block[0] for block in self.delta_blocks], format='csr'))
+
+    @property
+    def product_ids(self):
+        if not self.delta_blocks:
+            return self.base.product_ids
+        return self._cached('product_ids', lambda: np.concatenate([self.base.product_ids] + [block[1] for block in self.delta_blocks]))
+
+    def _row_blocks(self):
+        yield 0, self.base.tfidf_matrix, self.base.product_ids
+        for offset, (matrix, product_ids, _) in zip(self.offsets[1:], self.delta_blocks):
+            yield int(offset), matrix, product_ids
+
+    def product_ids_at(self, rows):
+        rows = np.asarray(rows, dtype=np.int64)
+        product_ids = np.empty(len(rows), dtype=object)
+        block_of_row = np.searchsorted(self.offsets, rows, side='right') - 1
+        for block_number, (offset, _, block_ids) in enumerate(self._row_blocks()):
+            selected = block_of_row == block_number
+            if selected.any():
+                product_ids[selected] = block_ids[rows[selected] - offset]
+        return product_ids.tolist()
+
+    def matrix_rows(self, rows):
+        # Linhas da matriz TF-IDF para rows (em ordem crescente).
+        rows = np.asarray(rows, dtype=np.int64)
+        parts = []
+        for offset, matrix, _ in self._row_blocks():
+            start, stop = np.searchsorted(rows, [offset, offset + matrix.shape[0]])
+            if stop > start:
+                parts.append(matrix[rows[start:stop] - offset])
+        return parts[0] if len(parts) == 1 else sparse.vstack(parts, format='csr')
+
+    def score_rows(self, user_tfidf):
+        # Scores densos (perfis x catálogo inteiro), bloco a bloco.
+        parts = [(user_tfidf @ self.base.transposed()).toarray()]
+        parts.extend((user_tfidf @ matrix.T).toarray() for matrix, _, _ in self.delta_blocks)
+        return parts[0] if len(parts) == 1 else np.hstack(parts)
+
+    def candidate_rows(self, filters=None):
+        # Linhas ativas que satisfazem todos os filtros, via interseção das
+        # listas do índice invertido; sem filtros, todo o catálogo ativo.
+        if not filters:
+            return np.flatnonzero(self.active)
+        rows = self.attribute_index.intersect(filters)
+        # O índice só cresce e é compartilhado com as versões seguintes:
+        # linhas acrescentadas depois desta versão são ignoradas.
+        rows = rows[rows < self.n_rows]
+        inactive = self._inactive_rows()
+        return rows[np.isin(rows, inactive, invert=True)] if len(inactive) else rows
+
+    def default_product_ids(self, num_recommendations):
+        return self.product_ids_at(np.flatnonzero(self.active)[:num_recommendations])
+
+    def with_changes(self, delta_block=None, inactive_rows=None):
+        delta_blocks = _append_block(self.delta_blocks, delta_block) if delta_block is not None else self.delta_blocks
+        inactive_blocks = self.inactive_blocks
+        if inactive_rows is not None and len(inactive_rows):
+            inactive_blocks = _append_inactive(inactive_blocks, np.asarray(inactive_rows, dtype=np.int64))
+        return ContentModel(
+            self.base, self.tfidf_vectorizer, self.fingerprint, self.attribute_index, self.version + 1,
+            delta_blocks, inactive_blocks, self.ann_index
+        )
+
+
+def _append_inactive(blocks, rows):
+    blocks = list(blocks) + [rows]
+    while len(blocks) > 1 and len(blocks[-2]) <= len(blocks[-1]):
+        last = blocks.pop()
+        blocks[-1] = np.concatenate([blocks[-1], last])
+    return tuple(blocks)
+
+
 class ContentBasedRecommender:
-    def __init__(self, db_manager):
+    def __init__(self, db_manager, model_dir=None, use_artifact=True, drift_threshold=None, use_ann=None,
+                 ann_candidates=CONTENT_ANN_CANDIDATES):
         self.db_manager = db_manager
-        self.products_df = None
-        self.tfidf_matrix = None
-        self.tfidf_vectorizer = None
+        self.model_dir = model_dir
+        self.use_artifact = use_artifact
+        self.use_ann = use_ann if use_ann is not None else CONTENT_ANN_ENABLED
+        self.ann_candidates = ann_candidates
+        self.drift_threshold = drift_threshold if drift_threshold is not None else CONTENT_DRIFT_THRESHOLD
+        # O modelo em uso fica num SnapshotHolder: escritas montam uma versão
+        # nova e trocam de uma vez; leitores nunca veem um modelo pela metade.
+        self.snapshots = SnapshotHolder(ContentModel.empty(), on_release=self._on_model_released)
+        self._row_by_product = {}
+        self._fitted_rows = 0
+        self._changed_rows = 0
+        self._new_terms = set()
+        self._lock = threading.RLock()
+        self._rebuild_thread = None
+        self._replay_log = None
         self._prepare_data()
 
+        if hasattr(db_manager, 'subscribe'):
+            db_manager.subscribe('product_added', self._on_product_upserted)
+            db_manager.subscribe('product_updated', self._on_product_upserted)
+            db_manager.subscribe('product_deleted', self._on_product_deleted)
+            db_manager.subscribe('catalog_changed', self._on_catalog_changed)
+
+    @property
+    def model(self):
+        return self.snapshots.current
+
+    @property
+    def products_df(self):
+        return self.model.products_df
+
+    @property
+    def tfidf_matrix(self):
+        return self.model.tfidf_matrix
+
+    @property
+    def tfidf_vectorizer(self):
+        return self.model.tfidf_vectorizer
+
+    @property
+    def fingerprint(self):
+        return self.model.fingerprint
+
+    @property
+    def attribute_index(self):
+        return self.model.attribute_index
+
+    @property
+    def version(self):
+        # Muda a cada troca de modelo; usada como parte da chave de caches.
+        return self.model.version
+
     def _prepare_data(self):
+        self._install_model(self._build_model())
+
+    def _build_model(self):
+        # Monta um modelo completo sem tocar no estado atual, para que a
+        # reconstrução possa rodar em segundo plano enquanto o antigo atende.
+        model = {"products_df": pd.DataFrame(), "tfidf_matrix": None, "tfidf_vectorizer": None, "fingerprint": None}
         try:
+            fingerprint = self._catalog_fingerprint()
+            if fingerprint and self.use_artifact:
+                loaded_model = self._load_artifact(fingerprint)
+                if loaded_model:
+                    logging.info(f"Modelo TF-IDF carregado do artefato (catálogo {fingerprint}).")
+                    return loaded_model
+
             products_from_db = self.db_manager.get_all_products()
             if not products_from_db:
-                self.products_df = pd.DataFrame()
-                self.tfidf_matrix = None
-                return
+                return model
 
-            self.products_df = pd.DataFrame([p.to_dict() for p in products_from_db])
-            self.products_df['content'] = self.products_df['name'].fillna('') + ' ' + \
-                                          self.products_df['category'].fillna('') + ' ' + \
-                                          self.products_df['brand'].fillna('') + ' ' + \
-                                          self.products_df['description'].fillna('')
-
-            def extract_attributes_for_content(row):
-                attrs_text = []
-                if isinstance(row['attributes'], dict):
-                    for value in row['attributes'].values():
-                        if isinstance(value, list):
-                            attrs_text.extend([str(item) for item in value])
-                        else:
-                            attrs_text.append(str(value))
-                return ' '.join(attrs_text)
-
-            self.products_df['attributes_text'] = self.products_df.apply(extract_attributes_for_content, axis=1)
-            self.products_df['content'] = self.products_df['content'] + ' ' + self.products_df['attributes_text'].fillna('')
-            self.products_df['content'] = self.products_df['content'].apply(lambda x: x.lower())
-            self.products_df['category'] = self.products_df['category'].apply(lambda x: x.lower() if x else '')
-            self.products_df['tipo_tenis'] = self.products_df['attributes'].apply(
-                lambda x: x.get('tipo_tenis').lower() if isinstance(x, dict) and x.get('tipo_tenis') else None
-            )
+            products_df = build_products_frame([p.to_dict() for p in products_from_db])
+            tfidf_vectorizer = TfidfVectorizer(stop_words=portuguese_stop_words)
+            tfidf_matrix = tfidf_vectorizer.fit_transform(products_df['content'])
+            model = {
+                "products_df": products_df,
+                "tfidf_matrix": tfidf_matrix,
+                "tfidf_vectorizer": tfidf_vectorizer,
+                "fingerprint": fingerprint
+            }
 
-            self.tfidf_vectorizer = TfidfVectorizer(stop_words=portuguese_stop_words)
-            self.tfidf_matrix = self.tfidf_vectorizer.fit_transform(self.products_df['content'])
+            if fingerprint and self.use_artifact:
+                self._save_artifact(model)
 
         except Exception as e:
             logging.error(f"Erro ao preparar dados para recomendação: {e}")
-            self.products_df = pd.DataFrame()
-            self.tfidf_matrix = None
+        return model
 
-    def get_recommendations_for_user_interests(self, user_id, num_recommendations=5):
-        user = self.db_manager.get_user_by_id(user_id)
-        if not user or not user.interests:
-            return self.db_manager.get_all_products()[:num_recommendations]
+    def _install_model(self, model):
+        products_df = model["products_df"]
+        attribute_index = InvertedIndex()
+        if not products_df.empty:
+            for row, record in zip(products_df.index, products_df[PRODUCT_META_COLUMNS].to_dict('records')):
+                attribute_index.add(row, product_index_fields(record))
+        ann_index = self._load_ann_index(model)
+        with self._lock:
+            self.snapshots.swap(ContentModel(
+                _BaseBlock(products_df, model["tfidf_matrix"]),
+                model["tfidf_vectorizer"],
+                model["fingerprint"],
+                attribute_index,
+                self.version + 1,
+                ann_index=ann_index
+            ))
+            self._row_by_product = dict(zip(products_df['product_id'], products_df.index)) if not products_df.empty else {}
+            self._fitted_rows = len(products_df)
+            self._changed_rows = 0
+            self._new_terms = set()
+
+    def _load_ann_index(self, model):
+        if not self.use_ann or not model["fingerprint"] or model["tfidf_vectorizer"] is None:
+            return None
+        try:
+            ann_index = ContentANNIndex.load(model["fingerprint"], model_dir=model.get("model_dir") or self.model_dir)
+        except Exception as e:
+            logging.warning(f"Índice IVF de conteúdo ilegível, usando busca exata: {e}")
+            return None
+        if ann_index is None:
+            logging.info(f"Sem índice IVF para o catálogo {model['fingerprint']}; usando busca exata.")
+        elif ann_index.n_features != len(model["tfidf_vectorizer"].vocabulary_):
+            logging.warning("Índice IVF de conteúdo gravado com outro vocabulário; usando busca exata.")
+            return None
+        return ann_index
+
+    def _on_model_released(self, model):
+        logging.debug(f"Modelo TF-IDF v{model.version} liberado: nenhum leitor restante.")
+
+    def install_artifact(self, fingerprint, model_dir=None):
+        # Instala um modelo já gravado (ex.: pelo construtor de modelos em
+        # outro processo, em model_dir), aberto com memory-map.
+        model = self._load_artifact(fingerprint, model_dir)
+        if model is None:
+            return False
+        self._install_model(model)
+        return True
+
+    def _catalog_fingerprint(self):
+        catalog_fingerprint = self.db_manager.get_catalog_fingerprint()
+        if not catalog_fingerprint:
+            return None
+        return f"m{CONTENT_MODEL_VERSION}-{catalog_fingerprint}"
+
+    def _save_artifact(self, model):
+        try:
+            products_df = model["products_df"]
+            products_meta = {
+                column: products_df[column].where(products_df[column].notna(), None).tolist()
+                for column in PRODUCT_META_COLUMNS
+            }
+            model_store.save_artifact(
+                CONTENT_MODEL_NAME,
+                model["fingerprint"],
+                arrays={"idf": model["tfidf_vectorizer"].idf_},
+                sparse_matrices={"tfidf": model["tfidf_matrix"]},
+                metadata={
+                    "vocabulary": model["tfidf_vectorizer"].get_feature_names_out().tolist(),
+                    "products": products_meta
+                },
+                model_dir=self.model_dir
+            )
+        except Exception as e:
+            logging.warning(f"Não foi possível salvar o artefato do modelo TF-IDF: {e}")
+
+    def _load_artifact(self, fingerprint, model_dir=None):
+        model_dir = model_dir if model_dir else self.model_dir
+        try:
+            artifact = model_store.load_artifact(CONTENT_MODEL_NAME, fingerprint, model_dir=model_dir)
+        except Exception as e:
+            logging.warning(f"Artefato do modelo TF-IDF ilegível, reconstruindo: {e}")
+            return None
+        if artifact is None:
+            return None
+
+        arrays, sparse_matrices, metadata = artifact
+        vocabulary = {term: index for index, term in enumerate(metadata["vocabulary"])}
+        tfidf_vectorizer = TfidfVectorizer(stop_words=portuguese_stop_words, vocabulary=vocabulary)
+        tfidf_vectorizer.idf_ = np.asarray(arrays["idf"])
+
+        return {
+            "products_df": pd.DataFrame(metadata["products"], columns=PRODUCT_META_COLUMNS),
+            "tfidf_matrix": sparse_matrices["tfidf"],
+            "tfidf_vectorizer": tfidf_vectorizer,
+            "fingerprint": fingerprint,
+            "model_dir": model_dir
+        }
+
+    def upsert_products(self, products_records):
+        # Acrescenta produtos novos ou substitui versões antigas usando o
+        # vocabulário/idf já ajustados: só as linhas alteradas são vetorizadas
+        # e entram num bloco de edições. A versão antiga vira uma linha
+        # inativa, preservando os índices.
+        products_records = list(products_records)
+        if not products_records:
+            return
+        with self._lock:
+            current = self.model
+            if current.tfidf_vectorizer is None or current.base.tfidf_matrix is None:
+                self.rebuild_async()
+                return
+            if self._replay_log is not None:
+                self._replay_log.append(('upsert', products_records))
+
+            new_products_df = build_products_frame(products_records)
+            new_rows = current.tfidf_vectorizer.transform(new_products_df['content'])
+            self._track_new_terms(current.tfidf_vectorizer, new_products_df['content'])
+
+            replaced_rows = [self._row_by_product[product_id] for product_id in new_products_df['product_id']
+                             if product_id in self._row_by_product]
+
+            first_row = current.n_rows
+            new_products_df = new_products_df[PRODUCT_META_COLUMNS]
+            new_products_df.index = pd.RangeIndex(first_row, first_row + len(new_products_df))
+            for row, record in zip(new_products_df.index, new_products_df.to_dict('records')):
+                current.attribute_index.add(row, product_index_fields(record))
+
+            self.snapshots.swap(current.with_changes(
+                (new_rows.tocsr(), new_products_df['product_id'].to_numpy(), new_products_df),
+                replaced_rows
+            ))
+            self._row_by_product.update(zip(new_products_df['product_id'], new_products_df.index))
+            self._changed_rows += len(new_products_df)
+
+        self._check_drift()
+
+    def remove_products(self, product_ids):
+        with self._lock:
+            if self._replay_log is not None:
+                self._replay_log.append(('remove', list(product_ids)))
+            current = self.model
+            rows = [self._row_by_product.pop(product_id, None) for product_id in product_ids]
+            rows = [row for row in rows if row is not None]
+            if rows:
+                self.snapshots.swap(current.with_changes(inactive_rows=rows))
+                self._changed_rows += len(rows)
+
+        self._check_drift()
+
+    def drift(self):
+        with self._lock:
+            tfidf_vectorizer = self.model.tfidf_vectorizer
+            if not self._fitted_rows or tfidf_vectorizer is None:
+                return 0.0
+            vocabulary_size = max(len(tfidf_vectorizer.vocabulary_), 1)
+            return max(self._changed_rows / self._fitted_rows, len(self._new_terms) / vocabulary_size)
 
+    def _track_new_terms(self, tfidf_vectorizer, contents):
+        analyzer = tfidf_vectorizer.build_analyzer()
+        vocabulary = tfidf_vectorizer.vocabulary_
+        for content in contents:
+            self._new_terms.update(term for term in analyzer(content) if term not in vocabulary)
+
+    def _check_drift(self):
+        current_drift = self.drift()
+        if current_drift > self.drift_threshold:
+            logging.info(f"Drift do modelo TF-IDF em {current_drift:.2f}, agendando reconstrução completa.")
+            self.rebuild_async()
+
+    def rebuild_async(self):
+        with self._lock:
+            if self._rebuild_thread is not None and self._rebuild_thread.is_alive():
+                return self._rebuild_thread
+            self._replay_log = []
+            self._rebuild_thread = threading.Thread(target=self._rebuild, name="content-model-rebuild", daemon=True)
+            self._rebuild_thread.start()
+            return self._rebuild_thread
+
+    def _rebuild(self):
+        model = self._build_model()
+        with self._lock:
+            replay_log = self._replay_log or []
+            self._replay_log = None
+            self._install_model(model)
+            # Reaplica o que mudou no catálogo enquanto a reconstrução rodava.
+            for operation, payload in replay_log:
+                if operation == 'upsert':
+                    self.upsert_products(payload)
+                else:
+                    self.remove_products(payload)
+        logging.info("Reconstrução do modelo TF-IDF concluída.")
+
+    def _on_product_upserted(self, product_data):
+        self.upsert_products([product_data])
+
+    def _on_product_deleted(self, product_id):
+        self.remove_products([product_id])
+
+    def _on_catalog_changed(self, _payload=None):
+        self.rebuild_async()
+
+    def candidate_rows(self, filters=None):
+        return self.model.candidate_rows(filters)
+
+    def user_profile(self, user, filters=None):
+        # Texto do perfil (interesses) e filtros de catálogo derivados deles.
+        # Devolve (None, None) para usuários sem interesses.
+        if not user or not user.interests:
+            return None, None
         user_interests = [interest.lower() for interest in user.interests]
         is_tennis_interest = "tênis" in user_interests
         tennis_type_filter = "casual" if "casual" in user_interests else "esportivo" if "esportivo" in user_interests else None
-        user_profile_text = " ".join(user_interests)
-
-        if not user_profile_text.strip() or self.tfidf_vectorizer is None:
-            return []
-
-        user_tfidf = self.tfidf_vectorizer.transform([user_profile_text])
-        filtered_products_df = self.products_df.copy()
+        filters = dict(filters) if filters else {}
 
         if is_tennis_interest:
-            filtered_products_df = filtered_products_df[filtered_products_df['category'] == 'tênis']
+            filters['category'] = 'tênis'
             if tennis_type_filter:
-                filtered_products_df = filtered_products_df[filtered_products_df['tipo_tenis'] == tennis_type_filter]
+                filters['tipo_tenis'] = tennis_type_filter
 
-        if filtered_products_df.empty or self.tfidf_matrix is None:
-            return self.db_manager.get_all_products()[:num_recommendations]
+        return " ".join(user_interests), filters
 
-        original_indices = filtered_products_df.index
-        tfidf_matrix_filtered = self.tfidf_matrix[original_indices]
-        cosine_similarities = linear_kernel(user_tfidf, tfidf_matrix_filtered).flatten()
+    def default_product_ids(self, num_recommendations):
+        return self.model.default_product_ids(num_recommendations)
 
-        num_to_select = min(num_recommendations, len(cosine_similarities))
-        if num_to_select == 0:
+    def recommend_ids_for_user(self, user, num_recommendations=5, filters=None):
+        # Só a parte de CPU (sem acesso ao banco), para quem já tem o usuário
+        # em mãos. Devolve os IDs recomendados, ou None quando o pedido deve
+        # cair nos produtos padrão do catálogo.
+        user_profile_text, filters = self.user_profile(user, filters)
+        if user_profile_text is None:
+            return None
+
+        with self.snapshots.acquire() as model:
+            if not user_profile_text.strip() or model.tfidf_vectorizer is None:
+                return []
+
+            user_tfidf = model.tfidf_vectorizer.transform([user_profile_text])
+
+            candidate_rows = self._ann_candidate_rows(model, user_tfidf, filters, num_recommendations)
+            if candidate_rows is None:
+                candidate_rows = model.candidate_rows(filters)
+            if not len(candidate_rows) or model.base.tfidf_matrix is None:
+                return None
+
+            tfidf_matrix_filtered = model.matrix_rows(candidate_rows)
+            cosine_similarities = linear_kernel(user_tfidf, tfidf_matrix_filtered).flatten()
+
+            num_to_select = min(num_recommendations, len(cosine_similarities))
+            if num_to_select == 0:
+                return []
+
+            top_indices = top_k_indices(cosine_similarities, num_to_select)
+            return model.product_ids_at(candidate_rows[top_indices])
+
+    def _ann_candidate_rows(self, model, user_tfidf, filters, num_recommendations):
+        # Linhas vizinhas do perfil segundo o índice IVF, mapeadas por
+        # product_id para o modelo atual, mais as linhas de edições feitas
+        # depois do último ajuste (que o índice não conhece). None quando não
+        # há índice ou ele não rende candidatos suficientes: vale a busca exata.
+        if model.ann_index is None:
+            return None
+        product_ids = model.ann_index.query(user_tfidf, max(self.ann_candidates, num_recommendations))
+        rows = np.fromiter((self._row_by_product.get(product_id, -1) for product_id in product_ids), dtype=np.int64,
+                           count=len(product_ids))
+        rows = np.union1d(rows[(rows >= 0) & (rows < model.base_rows)], np.arange(model.base_rows, model.n_rows))
+        rows = rows[model.active[rows]]
+        if filters:
+            rows = np.intersect1d(rows, model.candidate_rows(filters), assume_unique=True)
+        return rows if len(rows) >= num_recommendations else None
+
+    def get_recommendations_for_user_interests(self, user_id, num_recommendations=5, filters=None):
+        user = self.db_manager.get_user_by_id(user_id)
+        recommended_ids = self.recommend_ids_for_user(user, num_recommendations, filters)
+        if recommended_ids is None:
+            recommended_ids = self.default_product_ids(num_recommendations)
+        if not recommended_ids:
             return []
+        return self.db_manager.get_products_by_ids(recommended_ids)
+
+    def recommend_batch(self, users, num_recommendations=5, chunk_size=SCORING_CHUNK_SIZE, with_scores=False):
+        # Mesma regra de get_recommendations_for_user_interests para muitos
+        # usuários: um único transform para todos os perfis e um produto de
+        # matrizes esparsas (perfis x catálogo) por bloco de chunk_size
+        # usuários. Os filtros viram máscaras por combinação distinta, então
+        # usuários com os mesmos interesses de categoria compartilham a máscara.
+        # Devolve {user_id: [product_id, ...]}, ou pares (product_id, score)
+        # com with_scores (score None quando o resultado é o padrão do catálogo).
+        with self.snapshots.acquire() as model:
+            return self._recommend_batch(model, users, num_recommendations, chunk_size, with_scores)
+
+    def _recommend_batch(self, model, users, num_recommendations, chunk_size, with_scores):
+        results = {}
+        profiles = []
+        default_results = [(product_id, None) for product_id in model.default_product_ids(num_recommendations)] \
+            if with_scores else model.default_product_ids(num_recommendations)
+        for user in users:
+            user_profile_text, filters = self.user_profile(user)
+            if user_profile_text is None:
+                results[user.user_id] = default_results
+            elif not user_profile_text.strip() or model.tfidf_vectorizer is None:
+                results[user.user_id] = []
+            else:
+                profiles.append((user.user_id, user_profile_text, filters))
+        if not profiles:
+            return results
+
+        mask_by_filters = {}
+        mask_rows = []
+        for _, _, filters in profiles:
+            filters_key = tuple(sorted(filters.items()))
+            if filters_key not in mask_by_filters:
+                mask = np.zeros(model.n_rows, dtype=bool)
+                mask[model.candidate_rows(filters)] = True
+                mask_by_filters[filters_key] = len(mask_by_filters)
+                mask_rows.append(mask)
+        masks = np.vstack(mask_rows)
 
-        top_indices = cosine_similarities.argsort()[-num_to_select:][::-1]
-        recommended_ids = filtered_products_df.iloc[top_indices]['product_id'].tolist()
-        recommended_products = [self.db_manager.get_product_by_id(pid) for pid in recommended_ids]
+        mask_index = np.fromiter(
+            (mask_by_filters[tuple(sorted(filters.items()))] for _, _, filters in profiles),
+            dtype=np.int64, count=len(profiles)
+        )
+        user_tfidf = model.tfidf_vectorizer.transform([user_profile_text for _, user_profile_text, _ in profiles])
+        chunk_size = scoring_rows_per_block(model.n_rows, chunk_size)
 
-        return [p for p in recommended_products if p is not None]
+        for start in range(0, len(profiles), chunk_size):
+            chunk_masks = masks[mask_index[start:start + chunk_size]]
+            scores = model.score_rows(user_tfidf[start:start + chunk_size])
+            scores[~chunk_masks] = -np.inf
+            best = top_k_rows(scores, num_recommendations)
+            best_scores = np.take_along_axis(scores, best, axis=1)
+            for (user_id, _, _), rows, row_scores, row_mask in zip(profiles[start:start + chunk_size], best, best_scores, chunk_masks):
+                if not row_mask.any():
+                    results[user_id] = default_results
+                else:
+                    valid = np.isfinite(row_scores)
+                    recommended_ids = model.product_ids_at(rows[valid])
+                    results[user_id] = (
+                        list(zip(recommended_ids, row_scores[valid].tolist())) if with_scores else recommended_ids
+                    )
+        return results
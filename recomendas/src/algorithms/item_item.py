@@ -0,0 +1,112 @@
+import os
+import logging
+
+import numpy as np
+from sklearn.preprocessing import normalize
+
+from src.algorithms.collaborative import build_interaction_matrix, training_window_start, interaction_weight, SIMILARITY_CHUNK_SIZE
+from src.structures.id_encoder import IdEncoder
+from src.utils.ranking import top_k_indices
+
+ITEM_NEIGHBORS = int(os.getenv("ITEM_NEIGHBORS", "50"))
+
+
+def top_k_item_neighbors(user_item_matrix, n_neighbors=ITEM_NEIGHBORS, chunk_size=SIMILARITY_CHUNK_SIZE):
+    # Vizinhos de cada produto em arrays densos (produtos x K): índices int32
+    # (-1 onde não há vizinho) e similaridades float32.
+    n_items = user_item_matrix.shape[1]
+    item_vectors = normalize(user_item_matrix.T.tocsr(), norm='l2', axis=1).astype(np.float32)
+    item_vectors_t = item_vectors.T.tocsc()
+
+    neighbor_indices = np.full((n_items, n_neighbors), -1, dtype=np.int32)
+    neighbor_scores = np.zeros((n_items, n_neighbors), dtype=np.float32)
+    for start in range(0, n_items, chunk_size):
+        stop = min(start + chunk_size, n_items)
+        similarities = (item_vectors[start:stop] @ item_vectors_t).tocsr()
+        for offset in range(stop - start):
+            item_index = start + offset
+            row_start, row_end = similarities.indptr[offset], similarities.indptr[offset + 1]
+            candidates = similarities.indices[row_start:row_end]
+            scores = similarities.data[row_start:row_end]
+            keep = (candidates != item_index) & (scores > 0)
+            candidates, scores = candidates[keep], scores[keep]
+            best = top_k_indices(scores, n_neighbors)
+            neighbor_indices[item_index, :len(best)] = candidates[best]
+            neighbor_scores[item_index, :len(best)] = scores[best]
+    return neighbor_indices, neighbor_scores
+
+
+class ItemItemRecommender:
+    def __init__(self, db_manager, n_neighbors=ITEM_NEIGHBORS, chunk_size=SIMILARITY_CHUNK_SIZE, interaction_weights=None):
+        self.db_manager = db_manager
+        self.n_neighbors = n_neighbors
+        self.chunk_size = chunk_size
+        self.interaction_weights = interaction_weights
+        self.product_encoder = IdEncoder()
+        self.neighbor_indices = None
+        self.neighbor_scores = None
+
+    def fit(self, feedback_df=None, interactions_df=None):
+        try:
+            since = training_window_start()
+            if feedback_df is None:
+                feedback_df = self.db_manager.read_table_frame('feedback', columns=['user_id', 'product_id', 'rating'], since=since)
+            if interactions_df is None:
+                interactions_df = self.db_manager.read_table_frame('interactions', columns=['user_id', 'product_id', 'type'], since=since)
+            user_item_matrix, _, self.product_encoder = build_interaction_matrix(
+                feedback_df, interactions_df, self.interaction_weights
+            )
+            if user_item_matrix is None:
+                self.neighbor_indices = None
+                self.neighbor_scores = None
+                return self
+            self.neighbor_indices, self.neighbor_scores = top_k_item_neighbors(
+                user_item_matrix, self.n_neighbors, self.chunk_size
+            )
+            logging.info(f"Modelo item-item treinado: {len(self.product_encoder)} produtos, {self.n_neighbors} vizinhos por produto.")
+        except Exception as e:
+            logging.error(f"Erro ao treinar modelo item-item: {e}")
+            self.neighbor_indices = None
+            self.neighbor_scores = None
+        return self
+
+    def user_history(self, user_id):
+        # Histórico lido na hora (notas + interações), para que feedback novo
+        # entre na recomendação sem retreinar as listas de vizinhos.
+        history = {}
+        for feedback in self.db_manager.get_feedback_by_user_id(user_id):
+            history[feedback.product_id] = history.get(feedback.product_id, 0.0) + float(feedback.rating)
+        for interaction in self.db_manager.get_interactions_by_user_id(user_id):
+            weight = interaction_weight(interaction.type, self.interaction_weights)
+            history[interaction.product_id] = history.get(interaction.product_id, 0.0) + weight
+        return history
+
+    def recommend_from_history(self, history, top_n=5):
+        if self.neighbor_indices is None or not history:
+            return []
+
+        item_indices = self.product_encoder.encode_many(history.keys())
+        known = item_indices >= 0
+        if not known.any():
+            return []
+        item_indices = item_indices[known]
+        item_weights = np.fromiter(history.values(), dtype=np.float32, count=len(history))[known]
+
+        candidates = self.neighbor_indices[item_indices].ravel()
+        contributions = (self.neighbor_scores[item_indices] * item_weights[:, None]).ravel()
+        valid = candidates >= 0
+        candidates, contributions = candidates[valid], contributions[valid]
+        if not len(candidates):
+            return []
+
+        # Agrega só sobre os candidatos vindos das listas de vizinhos: o custo
+        # depende do tamanho do histórico, não do catálogo nem da base de usuários.
+        unique_candidates, inverse = np.unique(candidates, return_inverse=True)
+        scores = np.bincount(inverse, weights=contributions)
+        seen = np.isin(unique_candidates, item_indices)
+        best = top_k_indices(scores, top_n, exclude=seen)
+        return self.product_encoder.decode_many(unique_candidates[best])
+
+    def recommend(self, user_id, top_n=5):
+        return self.recommend_from_history(self.user_history(user_id), top_n)
+
@@ -0,0 +1,143 @@
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src.algorithms.collaborative import build_interaction_matrix, training_window_start
+from src.structures.id_encoder import IdEncoder
+from src.utils.ranking import SCORING_CHUNK_SIZE, scoring_rows_per_block, top_k_indices, top_k_rows
+
+ALS_FACTORS = int(os.getenv("ALS_FACTORS", "64"))
+ALS_ITERATIONS = int(os.getenv("ALS_ITERATIONS", "15"))
+ALS_REGULARIZATION = float(os.getenv("ALS_REGULARIZATION", "0.1"))
+ALS_ALPHA = float(os.getenv("ALS_ALPHA", "40.0"))
+ALS_WORKERS = int(os.getenv("ALS_WORKERS", str(os.cpu_count() or 1)))
+ALS_SOLVE_CHUNK_SIZE = 256
+
+
+def _solve_rows(matrix, fixed_factors, gram, regularization, alpha, rows):
+    # Mínimos quadrados com confiança (ALS implícito, Hu/Koren/Volinsky):
+    # para cada linha u, (YᵀY + Yᵤᵀ(Cᵤ - I)Yᵤ + λI) xᵤ = YᵤᵀCᵤpᵤ, com
+    # cᵤᵢ = 1 + α·rᵤᵢ e pᵤᵢ = 1 nos itens observados.
+    n_factors = fixed_factors.shape[1]
+    systems = np.repeat((gram + regularization * np.eye(n_factors, dtype=np.float64))[None, :, :], len(rows), axis=0)
+    targets = np.zeros((len(rows), n_factors), dtype=np.float64)
+    for position, row in enumerate(rows):
+        start, end = matrix.indptr[row], matrix.indptr[row + 1]
+        if start == end:
+            continue
+        item_factors = fixed_factors[matrix.indices[start:end]].astype(np.float64)
+        confidence = alpha * matrix.data[start:end].astype(np.float64)
+        systems[position] += (item_factors.T * confidence) @ item_factors
+        targets[position] = item_factors.T @ (1.0 + confidence)
+    return np.linalg.solve(systems, targets[:, :, None])[:, :, 0]
+
+
+def _als_half_step(matrix, fixed_factors, regularization, alpha, executor, chunk_size=ALS_SOLVE_CHUNK_SIZE):
+    gram = fixed_factors.T.astype(np.float64) @ fixed_factors.astype(np.float64)
+    n_rows = matrix.shape[0]
+    chunks = [np.arange(start, min(start + chunk_size, n_rows)) for start in range(0, n_rows, chunk_size)]
+    # BLAS e np.linalg.solve liberam o GIL, então os blocos rodam em paralelo.
+    results = executor.map(lambda rows: _solve_rows(matrix, fixed_factors, gram, regularization, alpha, rows), chunks)
+    return np.vstack(list(results)).astype(np.float32) if chunks else np.zeros((0, fixed_factors.shape[1]), dtype=np.float32)
+
+
+class ALSRecommender:
+    def __init__(self, db_manager, factors=ALS_FACTORS, iterations=ALS_ITERATIONS,
+                 regularization=ALS_REGULARIZATION, alpha=ALS_ALPHA, workers=ALS_WORKERS, random_state=42):
+        self.db_manager = db_manager
+        self.factors = factors
+        self.iterations = iterations
+        self.regularization = regularization
+        self.alpha = alpha
+        self.workers = workers
+        self.random_state = random_state
+        self.user_encoder = IdEncoder()
+        self.product_encoder = IdEncoder()
+        self.user_factors = None
+        self.item_factors = None
+        self.user_item_matrix = None
+
+    def fit(self, feedback_df=None, interactions_df=None):
+        try:
+            since = training_window_start()
+            if feedback_df is None:
+                feedback_df = self.db_manager.read_table_frame('feedback', columns=['user_id', 'product_id', 'rating'], since=since)
+            if interactions_df is None:
+                interactions_df = self.db_manager.read_table_frame('interactions', columns=['user_id', 'product_id', 'type'], since=since)
+            user_item_matrix, self.user_encoder, self.product_encoder = build_interaction_matrix(feedback_df, interactions_df)
+            if user_item_matrix is None:
+                self.user_factors = None
+                self.item_factors = None
+                self.user_item_matrix = None
+                return self
+            self.fit_matrix(user_item_matrix)
+            logging.info(
+                f"Modelo ALS treinado: {len(self.user_encoder)} usuários, {len(self.product_encoder)} produtos, "
+                f"{self.factors} fatores."
+            )
+        except Exception as e:
+            logging.error(f"Erro ao treinar modelo ALS: {e}")
+            self.user_factors = None
+            self.item_factors = None
+        return self
+
+    def fit_matrix(self, user_item_matrix):
+        user_item_matrix = user_item_matrix.tocsr().astype(np.float32)
+        item_user_matrix = user_item_matrix.T.tocsr()
+        rng = np.random.default_rng(self.random_state)
+        n_users, n_items = user_item_matrix.shape
+        user_factors = (rng.standard_normal((n_users, self.factors)) * 0.01).astype(np.float32)
+        item_factors = (rng.standard_normal((n_items, self.factors)) * 0.01).astype(np.float32)
+
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as executor:
+            for _ in range(self.iterations):
+                user_factors = _als_half_step(user_item_matrix, item_factors, self.regularization, self.alpha, executor)
+                item_factors = _als_half_step(item_user_matrix, user_factors, self.regularization, self.alpha, executor)
+
+        self.user_item_matrix = user_item_matrix
+        self.user_factors = user_factors
+        self.item_factors = item_factors
+        return self
+
+    def recommend(self, user_id, top_n=5):
+        user_index = self.user_encoder.encode(user_id)
+        if user_index is None or self.user_factors is None:
+            return []
+        scores = self.item_factors @ self.user_factors[user_index]
+        seen = self.user_item_matrix[user_index].indices
+        best = top_k_indices(scores, top_n, exclude=seen)
+        return self.product_encoder.decode_many(best)
+
+    def recommend_batch(self, user_ids, top_n=5, chunk_size=SCORING_CHUNK_SIZE, with_scores=False):
+        # Pontua milhares de usuários com uma multiplicação de matrizes por
+        # bloco (usuários x fatores) @ (fatores x itens), limitando a memória
+        # ao tamanho do bloco x catálogo.
+        results = {}
+        if self.user_factors is None:
+            return {user_id: [] for user_id in user_ids}
+
+        user_ids = list(user_ids)
+        user_indices = self.user_encoder.encode_many(user_ids)
+        known_positions = np.flatnonzero(user_indices >= 0)
+        for user_id in user_ids:
+            results[user_id] = []
+
+        item_factors_t = self.item_factors.T
+        chunk_size = scoring_rows_per_block(item_factors_t.shape[1], chunk_size)
+        for start in range(0, len(known_positions), chunk_size):
+            positions = known_positions[start:start + chunk_size]
+            rows = user_indices[positions]
+            scores = self.user_factors[rows] @ item_factors_t
+            seen = self.user_item_matrix[rows]
+            scores[np.repeat(np.arange(len(rows)), np.diff(seen.indptr)), seen.indices] = -np.inf
+            best = top_k_rows(scores, top_n)
+            best_scores = np.take_along_axis(scores, best, axis=1)
+            for position, item_indices, item_scores in zip(positions, best, best_scores):
+                valid = np.isfinite(item_scores)
+                product_ids = self.product_encoder.decode_many(item_indices[valid])
+                results[user_ids[position]] = (
+                    list(zip(product_ids, item_scores[valid].tolist())) if with_scores else product_ids
+                )
+        return results
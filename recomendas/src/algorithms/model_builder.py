@@ -0,0 +1,153 @@
+import os
+import sys
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from src.algorithms import model_store
+from src.algorithms.collaborative import CollaborativeRecommender
+from src.algorithms.content_based import ContentBasedRecommender
+from src.database.db_manager import DBManager
+from src.utils.popularity import popularity_window_start
+
+POPULARITY_MODEL_NAME = "popularity_aggregates"
+MODEL_BUILD_STAGES = ("content_based", "collaborative", "popularity")
+
+# Cada etapa roda num processo próprio, com seu próprio DBManager, e grava o
+# resultado via model_store. O processo principal só recebe de volta metadados
+# pequenos (fingerprint, contagens, tempo) e abre os arrays com memory-map, sem
+# copiar as matrizes entre processos por pickle.
+
+
+def _build_content(build_id, model_dir):
+    started = time.perf_counter()
+    recommender = ContentBasedRecommender(DBManager(), model_dir=model_dir)
+    rows = len(recommender.products_df) if recommender.products_df is not None else 0
+    return {"fingerprint": recommender.fingerprint, "rows": rows, "elapsed": time.perf_counter() - started}
+
+
+def _build_collaborative(build_id, model_dir):
+    started = time.perf_counter()
+    recommender = CollaborativeRecommender(DBManager()).fit()
+    path = recommender.save(build_id, model_dir=model_dir)
+    rows = len(recommender.user_encoder) if path else 0
+    return {"fingerprint": build_id if path else None, "rows": rows, "elapsed": time.perf_counter() - started}
+
+
+def _build_popularity(build_id, model_dir):
+    started = time.perf_counter()
+    aggregates = DBManager().get_feedback_aggregates(since=popularity_window_start())
+    if aggregates is None:
+        return {"fingerprint": None, "rows": 0, "elapsed": time.perf_counter() - started}
+    model_store.save_artifact(
+        POPULARITY_MODEL_NAME,
+        build_id,
+        arrays={
+            "sums": np.array([rating_sum for _, rating_sum, _ in aggregates], dtype=np.int64),
+            "counts": np.array([count for _, _, count in aggregates], dtype=np.int64)
+        },
+        metadata={"product_ids": [product_id for product_id, _, _ in aggregates]},
+        model_dir=model_dir
+    )
+    return {"fingerprint": build_id, "rows": len(aggregates), "elapsed": time.perf_counter() - started}
+
+
+_STAGE_BUILDERS = {
+    "content_based": _build_content,
+    "collaborative": _build_collaborative,
+    "popularity": _build_popularity
+}
+
+
+def build_models(stages=None, model_dir=None, workers=None):
+    # Roda as etapas em paralelo num pool de processos e devolve
+    # {etapa: {"fingerprint", "rows", "elapsed"}} (elapsed = tempo de parede
+    # da etapa dentro do worker), mais "total" com o tempo de parede geral.
+    stages = list(stages) if stages else list(MODEL_BUILD_STAGES)
+    build_id = datetime.now().strftime("%Y%m%d%H%M%S")
+    results = {}
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers if workers else len(stages)) as executor:
+        futures = {stage: executor.submit(_STAGE_BUILDERS[stage], build_id, model_dir) for stage in stages}
+        for stage, future in futures.items():
+            try:
+                results[stage] = future.result()
+            except Exception as e:
+                logging.error(f"Erro na etapa '{stage}' da construção de modelos: {e}")
+                results[stage] = {"fingerprint": None, "rows": 0, "elapsed": None, "error": str(e)}
+    results["total"] = {"elapsed": time.perf_counter() - started}
+    return results
+
+
+def load_popularity_aggregates(fingerprint, model_dir=None):
+    artifact = model_store.load_artifact(POPULARITY_MODEL_NAME, fingerprint, model_dir=model_dir)
+    if artifact is None:
+        return None
+    arrays, _, metadata = artifact
+    return list(zip(metadata["product_ids"], arrays["sums"].tolist(), arrays["counts"].tolist()))
+
+
+def install_models(recommendation_manager, results, model_dir=None):
+    # Abre os artefatos produzidos por build_models no gerenciador do processo
+    # atual. Etapas que falharam (na construção ou ao abrir o artefato)
+    # mantêm o modelo que já estava carregado e o cache dele.
+    started = time.perf_counter()
+    installed = []
+    content = results.get("content_based", {})
+    if content.get("fingerprint"):
+        if recommendation_manager.content_based_recommender.install_artifact(content["fingerprint"], model_dir):
+            installed.append("content_based")
+        else:
+            logging.warning(f"Artefato de conteúdo {content['fingerprint']} não encontrado; mantendo o modelo atual.")
+
+    collaborative = results.get("collaborative", {})
+    if collaborative.get("fingerprint"):
+        recommender = CollaborativeRecommender.load(recommendation_manager.db_manager, collaborative["fingerprint"], model_dir)
+        if recommender is not None:
+            recommendation_manager.collaborative_recommender = recommender
+            installed.append("collaborative")
+
+    popularity = results.get("popularity", {})
+    if popularity.get("fingerprint"):
+        aggregates = load_popularity_aggregates(popularity["fingerprint"], model_dir)
+        if aggregates is not None:
+            recommendation_manager.popularity_tracker.load_aggregates(aggregates)
+            installed.append("popularity")
+
+    changed = [stage for stage in installed if stage in recommendation_manager.algorithms]
+    if changed:
+        recommendation_manager.mark_models_changed(changed)
+    return time.perf_counter() - started
+
+
+def format_report(results):
+    lines = []
+    for stage, stats in results.items():
+        if stage == "total":
+            continue
+        if stats.get("error"):
+            lines.append(f"{stage:15s} falhou: {stats['error']}")
+        else:
+            lines.append(f"{stage:15s} {stats['elapsed']:8.2f}s  {stats['rows']} linhas")
+    lines.append(f"{'total':15s} {results['total']['elapsed']:8.2f}s (tempo de parede)")
+    return "\n".join(lines)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Constrói os modelos de conteúdo, colaborativo e de popularidade em paralelo.")
+    parser.add_argument('--stages', nargs='+', choices=MODEL_BUILD_STAGES, default=None)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--model-dir', default=None)
+    args = parser.parse_args()
+
+    build_results = build_models(args.stages, args.model_dir, args.workers)
+    print(format_report(build_results))
+    if any(stats.get("error") for stats in build_results.values()):
+        sys.exit(1)
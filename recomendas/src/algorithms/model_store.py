@@ -0,0 +1,160 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import logging
+from datetime import datetime
+
+import numpy as np
+from scipy import sparse
+
+MODEL_DIR = os.getenv("RECOMENDAS_MODEL_DIR", os.path.abspath(os.path.join(os.path.dirname(__file__), '../../models')))
+MODEL_FORMAT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+POINTER_SUFFIX = '.current'
+# Diretórios de versão sem ponteiro (publicação interrompida, corrida entre
+# dois gravadores) só são apagados depois desse tempo, para não remover uma
+# versão que outro processo acabou de gravar e ainda vai apontar.
+ORPHAN_GRACE_SECONDS = float(os.getenv("MODEL_ORPHAN_GRACE_SECONDS", "3600"))
+
+# Artefatos de modelo ficam em <MODEL_DIR>/<nome>/v<formato>-<fingerprint>-<ns>/,
+# um diretório por publicação, e o arquivo v<formato>-<fingerprint>.current
+# guarda o nome da versão em uso. Publicar é gravar a versão nova, trocar o
+# ponteiro com os.replace (atômico) e só então apagar a versão anterior:
+# leitores sempre encontram um artefato completo.
+# Matrizes esparsas são gravadas como os três vetores CSR (.npy) para que
+# possam ser abertas com memory-map; um .npz não pode ser mapeado.
+
+def _pointer_path(name, fingerprint, model_dir=None):
+    model_dir = model_dir if model_dir else MODEL_DIR
+    return os.path.join(model_dir, name, f"v{MODEL_FORMAT_VERSION}-{fingerprint}{POINTER_SUFFIX}")
+
+
+def _read_pointer(pointer_path):
+    try:
+        with open(pointer_path, 'r', encoding='utf-8') as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return os.path.join(os.path.dirname(pointer_path), version) if version else None
+
+
+def artifact_path(name, fingerprint, model_dir=None):
+    # Diretório da versão publicada, ou None se não há artefato.
+    return _read_pointer(_pointer_path(name, fingerprint, model_dir))
+
+
+def save_artifact(name, fingerprint, arrays=None, sparse_matrices=None, metadata=None, model_dir=None, keep=2):
+    arrays = arrays or {}
+    sparse_matrices = sparse_matrices or {}
+    pointer_path = _pointer_path(name, fingerprint, model_dir)
+    parent_dir = os.path.dirname(pointer_path)
+    os.makedirs(parent_dir, exist_ok=True)
+    version = f"v{MODEL_FORMAT_VERSION}-{fingerprint}-{time.time_ns()}"
+    final_path = os.path.join(parent_dir, version)
+
+    temp_path = tempfile.mkdtemp(prefix='.tmp-', dir=parent_dir)
+    try:
+        for key, array in arrays.items():
+            np.save(os.path.join(temp_path, f"{key}.npy"), np.ascontiguousarray(array))
+
+        shapes = {}
+        for key, matrix in sparse_matrices.items():
+            matrix = sparse.csr_matrix(matrix)
+            matrix.sort_indices()
+            np.save(os.path.join(temp_path, f"{key}.data.npy"), matrix.data)
+            np.save(os.path.join(temp_path, f"{key}.indices.npy"), matrix.indices)
+            np.save(os.path.join(temp_path, f"{key}.indptr.npy"), matrix.indptr)
+            shapes[key] = list(matrix.shape)
+
+        manifest = {
+            "name": name,
+            "format_version": MODEL_FORMAT_VERSION,
+            "fingerprint": fingerprint,
+            "created_at": datetime.now().isoformat(),
+            "arrays": sorted(arrays),
+            "sparse": shapes,
+            "metadata": metadata or {}
+        }
+        with open(os.path.join(temp_path, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(temp_path, final_path)
+    except Exception:
+        shutil.rmtree(temp_path, ignore_errors=True)
+        raise
+
+    previous_path = _read_pointer(pointer_path)
+    try:
+        temp_pointer = f"{os.path.join(parent_dir, '.tmp-')}{version}{POINTER_SUFFIX}"
+        with open(temp_pointer, 'w', encoding='utf-8') as f:
+            f.write(version)
+        os.replace(temp_pointer, pointer_path)
+    except Exception:
+        shutil.rmtree(final_path, ignore_errors=True)
+        raise
+
+    if previous_path and previous_path != final_path:
+        shutil.rmtree(previous_path, ignore_errors=True)
+    _prune_old_artifacts(parent_dir, keep)
+    logging.info(f"Artefato de modelo '{name}' salvo em '{final_path}'.")
+    return final_path
+
+
+def load_artifact(name, fingerprint, model_dir=None, mmap=True):
+    # Uma publicação pode trocar o ponteiro e apagar a versão anterior entre
+    # a leitura do ponteiro e a abertura dos arquivos; relê o ponteiro uma vez.
+    for attempt in range(2):
+        path = artifact_path(name, fingerprint, model_dir)
+        if path is None:
+            return None
+        try:
+            return _load_version(path, fingerprint, mmap)
+        except FileNotFoundError:
+            if attempt:
+                logging.warning(f"Artefato de modelo '{name}' removido durante a leitura.")
+    return None
+
+
+def _load_version(path, fingerprint, mmap):
+    with open(os.path.join(path, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != MODEL_FORMAT_VERSION or manifest.get("fingerprint") != fingerprint:
+        return None
+
+    mmap_mode = 'r' if mmap else None
+    arrays = {key: np.load(os.path.join(path, f"{key}.npy"), mmap_mode=mmap_mode) for key in manifest["arrays"]}
+    sparse_matrices = {}
+    for key, shape in manifest["sparse"].items():
+        data = np.load(os.path.join(path, f"{key}.data.npy"), mmap_mode=mmap_mode)
+        indices = np.load(os.path.join(path, f"{key}.indices.npy"), mmap_mode=mmap_mode)
+        indptr = np.load(os.path.join(path, f"{key}.indptr.npy"), mmap_mode=mmap_mode)
+        sparse_matrices[key] = sparse.csr_matrix((data, indices, indptr), shape=tuple(shape), copy=False)
+
+    return arrays, sparse_matrices, manifest["metadata"]
+
+
+def _prune_old_artifacts(parent_dir, keep):
+    # Mantém os keep fingerprints publicados mais recentemente; o ponteiro sai
+    # antes do diretório, para que nenhum leitor seja levado a uma versão apagada.
+    pointers = [
+        os.path.join(parent_dir, entry) for entry in os.listdir(parent_dir)
+        if entry.endswith(POINTER_SUFFIX) and not entry.startswith('.')
+    ]
+    pointers.sort(key=os.path.getmtime, reverse=True)
+    for old_pointer in pointers[keep:]:
+        old_path = _read_pointer(old_pointer)
+        try:
+            os.remove(old_pointer)
+        except FileNotFoundError:
+            continue
+        if old_path:
+            shutil.rmtree(old_path, ignore_errors=True)
+
+    in_use = {_read_pointer(pointer) for pointer in pointers[:keep]}
+    cutoff = time.time() - ORPHAN_GRACE_SECONDS
+    for entry in os.listdir(parent_dir):
+        path = os.path.join(parent_dir, entry)
+        if path in in_use or not os.path.isdir(path) or os.path.getmtime(path) > cutoff:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
@@ -7,10 +7,75 @@ from datetime import datetime
 import logging
 
 from src.database.db_manager import DBManager
+from src.data.json_stream import iter_json_records, JSON_LINES_EXTENSIONS
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def load_initial_data(db_manager):
+
+def _log_bulk_stats(file_path, stats):
+    elapsed = stats['elapsed']
+    rate = stats['rows'] / elapsed if elapsed > 0 else float(stats['rows'])
+    logging.info(
+        f"'{os.path.basename(file_path)}' -> tabela '{stats['table']}': {stats['rows']} linhas em {elapsed:.2f}s "
+        f"({rate:.0f} linhas/s), {stats['skipped']} ignoradas."
+    )
+    for error in stats['errors']:
+        logging.warning(f"Linha ignorada em '{os.path.basename(file_path)}': {error}")
+    if stats['skipped'] > len(stats['errors']):
+        logging.warning(f"... e mais {stats['skipped'] - len(stats['errors'])} erros não listados.")
+
+
+def _find_data_file(current_dir, base_name):
+    # Dá preferência a dumps em JSON Lines quando existirem ao lado do .json.
+    for extension in JSON_LINES_EXTENSIONS + ('.json',):
+        candidate = os.path.join(current_dir, base_name + extension)
+        if os.path.exists(candidate):
+            return candidate
+    return os.path.join(current_dir, base_name + '.json')
+
+
+def _flatten_categories(categories_data):
+
+    def process_category_entry(category_dict, level="primary"):
+        yield {
+            "id": category_dict['id'],
+            "name": category_dict['name'],
+            "type": f"{level}_product_category"
+        }
+
+        for sub_cat in category_dict.get('subcategories', []):
+            yield from process_category_entry(sub_cat, level="sub")
+
+        for item in category_dict.get('items', []):
+            yield {
+                "id": item['id'],
+                "name": item['name'],
+                "type": "item_product_category"
+            }
+
+    for top_level_category in categories_data:
+        yield from process_category_entry(top_level_category)
+
+
+def _with_generated_id(entries, id_field):
+    for entry in entries:
+        if id_field not in entry or not entry[id_field]:
+            entry[id_field] = str(uuid.uuid4())
+        yield entry
+
+
+def _with_parsed_timestamp(entries, label):
+    for entry in entries:
+        if isinstance(entry.get('timestamp'), str):
+            try:
+                entry['timestamp'] = datetime.fromisoformat(entry['timestamp'])
+            except ValueError:
+                logging.warning(f"Data inválida em {label} '{entry.get('id')}', usando data atual.")
+                entry['timestamp'] = datetime.now()
+        yield entry
+
+
+def load_initial_data(db_manager, batch_size=None):
     logging.info("Iniciando carga de dados iniciais...")
 
     try:
@@ -27,104 +92,51 @@ def load_initial_data(db_manager):
     if os.path.exists(categories_file):
         with open(categories_file, 'r', encoding='utf-8') as f:
             categories_data = json.load(f)
-
-            def process_category_entry(category_dict, parent_id=None, level="primary"):
-                category_id = category_dict['id']
-                category_name = category_dict['name']
-                category_type = f"{level}_product_category"
-
-                try:
-                    db_manager.add_category({
-                        "id": category_id,
-                        "name": category_name,
-                        "type": category_type
-                    })
-                except Exception as e:
-                    logging.error(f"Erro ao adicionar categoria '{category_name}': {e}")
-
-                if 'subcategories' in category_dict:
-                    for sub_cat in category_dict['subcategories']:
-                        process_category_entry(sub_cat, parent_id=category_id, level="sub")
-
-                if 'items' in category_dict:
-                    for item in category_dict['items']:
-                        try:
-                            db_manager.add_category({
-                                "id": item['id'],
-                                "name": item['name'],
-                                "type": "item_product_category"
-                            })
-                        except Exception as e:
-                            logging.error(f"Erro ao adicionar item/categoria '{item['name']}': {e}")
-
-            for top_level_category in categories_data:
-                process_category_entry(top_level_category)
-
-            logging.info(f"Categorias carregadas de '{categories_file}'.")
+        stats = db_manager.bulk_add_categories(_flatten_categories(categories_data), batch_size)
+        _log_bulk_stats(categories_file, stats)
     else:
         logging.warning(f"Arquivo '{categories_file}' não encontrado.")
 
     # Carregar produtos
-    products_file = os.path.join(current_dir, 'products.json')
+    products_file = _find_data_file(current_dir, 'products')
     if os.path.exists(products_file):
-        with open(products_file, 'r', encoding='utf-8') as f:
-            products_data = json.load(f)
-            for product_entry in products_data:
-                if 'product_id' not in product_entry or not product_entry['product_id']:
-                    product_entry['product_id'] = str(uuid.uuid4())
-                db_manager.add_product(product_entry)
-        logging.info(f"Produtos carregados de '{products_file}'.")
+        products_data = iter_json_records(products_file)
+        stats = db_manager.bulk_add_products(_with_generated_id(products_data, 'product_id'), batch_size)
+        _log_bulk_stats(products_file, stats)
     else:
         logging.error(f"Arquivo '{products_file}' não encontrado.")
         return
 
     # Carregar usuários
-    users_file = os.path.join(current_dir, 'users.json')
+    users_file = _find_data_file(current_dir, 'users')
     if os.path.exists(users_file):
-        with open(users_file, 'r', encoding='utf-8') as f:
-            users_data = json.load(f)
-            for user_entry in users_data:
-                if 'user_id' not in user_entry:
-                    user_entry['user_id'] = str(uuid.uuid4())
-                db_manager.add_user(user_entry)
-        logging.info(f"Usuários carregados de '{users_file}'.")
+        users_data = iter_json_records(users_file)
+        stats = db_manager.bulk_add_users(_with_generated_id(users_data, 'user_id'), batch_size)
+        _log_bulk_stats(users_file, stats)
     else:
         logging.warning(f"Arquivo '{users_file}' não encontrado.")
 
     # Carregar interações
-    interactions_file = os.path.join(current_dir, 'interactions.json')
+    interactions_file = _find_data_file(current_dir, 'interactions')
     if os.path.exists(interactions_file):
-        with open(interactions_file, 'r', encoding='utf-8') as f:
-            interactions_data = json.load(f)
-            for entry in interactions_data:
-                if isinstance(entry.get('timestamp'), str):
-                    try:
-                        entry['timestamp'] = datetime.fromisoformat(entry['timestamp'])
-                    except ValueError:
-                        logging.warning(f"Data inválida em interação '{entry.get('id')}', usando data atual.")
-                        entry['timestamp'] = datetime.now()
-                db_manager.add_interaction(entry)
-        logging.info(f"Interações carregadas de '{interactions_file}'.")
+        interactions_data = iter_json_records(interactions_file)
+        stats = db_manager.bulk_add_interactions(_with_parsed_timestamp(interactions_data, "interação"), batch_size)
+        _log_bulk_stats(interactions_file, stats)
     else:
         logging.warning(f"Arquivo '{interactions_file}' não encontrado.")
 
     # Carregar feedbacks
-    feedbacks_file = os.path.join(current_dir, 'feedback.json')
+    feedbacks_file = _find_data_file(current_dir, 'feedback')
     if os.path.exists(feedbacks_file):
-        with open(feedbacks_file, 'r', encoding='utf-8') as f:
-            feedbacks_data = json.load(f)
-            for entry in feedbacks_data:
-                if isinstance(entry.get('timestamp'), str):
-                    try:
-                        entry['timestamp'] = datetime.fromisoformat(entry['timestamp'])
-                    except ValueError:
-                        logging.warning(f"Data inválida em feedback '{entry.get('id')}', usando data atual.")
-                        entry['timestamp'] = datetime.now()
-                db_manager.add_feedback(entry)
-        logging.info(f"Feedbacks carregados de '{feedbacks_file}'.")
+        feedbacks_data = iter_json_records(feedbacks_file)
+        stats = db_manager.bulk_add_feedback(_with_parsed_timestamp(feedbacks_data, "feedback"), batch_size)
+        _log_bulk_stats(feedbacks_file, stats)
     else:
         logging.warning(f"Arquivo '{feedbacks_file}' não encontrado.")
 
+    # Eventos históricos caem na partição DEFAULT; move-os para partições mensais.
+    db_manager.ensure_partitions()
+
     logging.info("Carga de dados concluída com sucesso.")
 
 if __name__ == '__main__':
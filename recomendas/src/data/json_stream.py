@@ -0,0 +1,107 @@
+import os
+import json
+import logging
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+# Tamanho máximo (em caracteres) de um registro do array; um registro
+# malformado não faz o leitor puxar o resto do arquivo para a memória.
+JSON_MAX_RECORD_SIZE = int(os.getenv("JSON_MAX_RECORD_SIZE", str(16 << 20)))
+JSON_LINES_EXTENSIONS = ('.jsonl', '.ndjson')
+
+_WHITESPACE = ' \t\n\r'
+
+
+def iter_json_records(file_path, chunk_size=DEFAULT_CHUNK_SIZE, max_record_size=JSON_MAX_RECORD_SIZE):
+    # Lê um arquivo de registros sem carregá-lo inteiro na memória:
+    # JSON Lines (um objeto por linha) ou um array JSON de nível superior.
+    if file_path.lower().endswith(JSON_LINES_EXTENSIONS):
+        yield from iter_json_lines(file_path)
+    else:
+        yield from iter_json_array(file_path, chunk_size, max_record_size)
+
+
+def iter_json_lines(file_path):
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                logging.warning(f"Linha {line_number} inválida em '{file_path}', ignorando: {e}")
+
+
+def iter_json_array(file_path, chunk_size=DEFAULT_CHUNK_SIZE, max_record_size=JSON_MAX_RECORD_SIZE):
+    decoder = json.JSONDecoder()
+    with open(file_path, 'r', encoding='utf-8') as f:
+        buffer = ''
+        position = 0
+        eof = False
+
+        def read_more(size=chunk_size):
+            nonlocal buffer, position, eof
+            chunk = f.read(size)
+            if not chunk:
+                eof = True
+                return False
+            # Descarta o que já foi consumido para manter o buffer limitado.
+            buffer = buffer[position:] + chunk
+            position = 0
+            return True
+
+        def skip_whitespace():
+            nonlocal position
+            while True:
+                while position < len(buffer) and buffer[position] in _WHITESPACE:
+                    position += 1
+                if position < len(buffer) or not read_more():
+                    return
+
+        skip_whitespace()
+        if position >= len(buffer):
+            return
+        if buffer[position] != '[':
+            raise ValueError(f"Arquivo '{file_path}' não contém um array JSON de nível superior.")
+        position += 1
+
+        expect_value = True
+        while True:
+            skip_whitespace()
+            if position >= len(buffer):
+                raise ValueError(f"Array JSON incompleto em '{file_path}'.")
+
+            current = buffer[position]
+            if current == ']':
+                return
+            if current == ',' and not expect_value:
+                position += 1
+                expect_value = True
+                continue
+            if not expect_value:
+                raise ValueError(f"Separador inválido '{current}' em '{file_path}'.")
+
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    pending = len(buffer) - position
+                    if pending >= max_record_size:
+                        raise ValueError(
+                            f"Registro JSON inválido ou maior que {max_record_size} caracteres em '{file_path}'."
+                        )
+                    # Lê ao menos o que já está pendente: o buffer dobra a
+                    # cada tentativa, então um registro grande é decodificado
+                    # O(log) vezes, não uma vez por chunk.
+                    if read_more(min(max(chunk_size, pending), max_record_size - pending)):
+                        continue
+                    raise ValueError(f"Registro JSON inválido ou incompleto em '{file_path}'.")
+                # Números e literais podem ter sido cortados no fim do chunk;
+                # só aceita o valor quando há algo depois dele no buffer.
+                if end >= len(buffer) and not eof and read_more():
+                    continue
+                break
+
+            position = end
+            expect_value = False
+            yield value
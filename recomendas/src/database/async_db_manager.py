@@ -0,0 +1,147 @@
+import logging
+
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from src.database.db_manager import (
+    DATABASE_URL, PRODUCT_CACHE_SIZE, TABLE_MODELS, User, Product, Feedback, Interaction,
+    _coerce_frame_dtypes, _feedback_row, _interaction_row
+)
+from src.database.pool import DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING
+from src.structures.lru_cache import LRUCache
+
+ASYNC_DRIVER = "postgresql+asyncpg"
+
+
+def async_database_url(database_url):
+    # postgresql://... (psycopg2) -> postgresql+asyncpg://...
+    url = make_url(database_url)
+    if url.drivername.startswith("postgresql"):
+        url = url.set(drivername=ASYNC_DRIVER)
+    return url.render_as_string(hide_password=False)
+
+
+class AsyncDBManager:
+    # Versão assíncrona (SQLAlchemy asyncio + asyncpg) das operações usadas no
+    # caminho de atendimento. Enquanto uma consulta espera o banco, o event
+    # loop atende outros pedidos; as tabelas continuam sendo criadas pelo
+    # DBManager síncrono. Passando events (um DBManager), as escritas avisam os
+    # mesmos assinantes (modelos, caches) que as escritas síncronas.
+    def __init__(self, database_url=None, events=None, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW):
+        self.database_url = async_database_url(database_url if database_url else DATABASE_URL)
+        self.engine = create_async_engine(
+            self.database_url,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=DB_POOL_PRE_PING
+        )
+        self.Session = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.product_cache = LRUCache(max_size=PRODUCT_CACHE_SIZE)
+        self.events = events
+
+        if events is not None and hasattr(events, 'subscribe'):
+            events.subscribe('product_updated', self._on_product_changed)
+            events.subscribe('product_deleted', self._on_product_changed)
+            events.subscribe('catalog_changed', self._on_catalog_changed)
+
+    def notify(self, event_name, payload=None):
+        if self.events is not None:
+            self.events.notify(event_name, payload)
+
+    async def close(self):
+        await self.engine.dispose()
+
+    async def get_user_by_id(self, user_id):
+        try:
+            async with self.Session() as session:
+                result = await session.execute(select(User).filter_by(user_id=user_id))
+                return result.scalars().first()
+        except Exception as e:
+            logging.error(f"Erro ao buscar usuário por user_id '{user_id}': {e}")
+            return None
+
+    async def get_products_by_ids(self, product_ids):
+        # Mesma semântica de DBManager.get_products_by_ids: cache + um IN,
+        # preservando a ordem dos IDs pedidos.
+        product_ids = list(product_ids)
+        found = {}
+        missing_ids = []
+        for product_id in dict.fromkeys(product_ids):
+            cached_product = self.product_cache.get(product_id)
+            if cached_product is not None:
+                found[product_id] = cached_product
+            else:
+                missing_ids.append(product_id)
+
+        if missing_ids:
+            try:
+                async with self.Session() as session:
+                    result = await session.execute(select(Product).where(Product.product_id.in_(missing_ids)))
+                    for product in result.scalars():
+                        found[product.product_id] = product
+                        self.product_cache.put(product.product_id, product)
+            except Exception as e:
+                logging.error(f"Erro ao buscar produtos por IDs ({len(missing_ids)} IDs): {e}")
+
+        return [found[product_id] for product_id in product_ids if product_id in found]
+
+    async def add_feedback(self, feedback_data):
+        try:
+            feedback_row = _feedback_row(feedback_data)
+            async with self.Session() as session:
+                new_feedback = Feedback(**feedback_row)
+                session.add(new_feedback)
+                await session.commit()
+            logging.debug(f"Feedback adicionado para user '{feedback_data['user_id']}' e product '{feedback_data['product_id']}'.")
+            self.notify('feedback_added', feedback_row)
+            return new_feedback
+        except Exception as e:
+            logging.error(f"Erro ao adicionar feedback: {e}")
+            return None
+
+    async def add_interaction(self, interaction_data):
+        try:
+            interaction_row = _interaction_row(interaction_data)
+            async with self.Session() as session:
+                new_interaction = Interaction(**interaction_row)
+                session.add(new_interaction)
+                await session.commit()
+            logging.debug(f"Interação tipo '{interaction_data['type']}' adicionada para user '{interaction_data['user_id']}' e product '{interaction_data['product_id']}'.")
+            self.notify('interaction_added', interaction_row)
+            return new_interaction
+        except Exception as e:
+            logging.error(f"Erro ao adicionar interação: {e}")
+            return None
+
+    async def load_data_into_df(self, table_name, columns=None, since=None, until=None):
+        # Equivalente assíncrono de DBManager.read_table_frame: o pandas lê
+        # pela conexão síncrona adaptada (run_sync), sem bloquear o loop
+        # enquanto espera o banco.
+        model = TABLE_MODELS.get(table_name)
+        if model is None:
+            logging.warning(f"Tabela '{table_name}' não reconhecida para carregar em DataFrame.")
+            return pd.DataFrame()
+        table = model.__table__
+        statement = select(*([table.c[column] for column in columns] if columns else table.c))
+        if since is not None:
+            statement = statement.where(table.c.timestamp >= since)
+        if until is not None:
+            statement = statement.where(table.c.timestamp < until)
+        try:
+            async with self.engine.connect() as connection:
+                df = await connection.run_sync(lambda sync_connection: pd.read_sql(statement, sync_connection))
+            return _coerce_frame_dtypes(df)
+        except Exception as e:
+            logging.error(f"Erro ao carregar dados da tabela '{table_name}' para DataFrame: {e}")
+            return pd.DataFrame()
+
+    def _on_product_changed(self, payload):
+        product_id = payload.get('product_id') if isinstance(payload, dict) else payload
+        self.product_cache.pop(product_id)
+
+    def _on_catalog_changed(self, _payload=None):
+        self.product_cache.clear()
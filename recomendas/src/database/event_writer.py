@@ -0,0 +1,269 @@
+import os
+import glob
+import json
+import time
+import atexit
+import threading
+import logging
+import uuid
+from datetime import datetime
+
+from src.data.json_stream import iter_json_lines
+from src.database.db_manager import _feedback_row, _interaction_row
+
+EVENT_WRITER_BATCH_SIZE = int(os.getenv("EVENT_WRITER_BATCH_SIZE", "500"))
+EVENT_WRITER_FLUSH_SECONDS = float(os.getenv("EVENT_WRITER_FLUSH_SECONDS", "1.0"))
+# Eventos aceitos e ainda não gravados no banco; acima disso add_* espera.
+EVENT_WRITER_MAX_PENDING = int(os.getenv("EVENT_WRITER_MAX_PENDING", "50000"))
+# Espera máxima (segundos) por espaço na fila antes de recusar um evento.
+EVENT_WRITER_PUT_TIMEOUT = float(os.getenv("EVENT_WRITER_PUT_TIMEOUT", "5"))
+# Arquivo de write-ahead (JSON Lines) para sobreviver a uma queda; vazio desliga.
+EVENT_WRITER_WAL_PATH = os.getenv("EVENT_WRITER_WAL_PATH", "")
+EVENT_WRITER_WAL_FSYNC = os.getenv("EVENT_WRITER_WAL_FSYNC", "0") == "1"
+
+_ROW_BUILDERS = {"feedback": _feedback_row, "interaction": _interaction_row}
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+class BufferedEventWriter:
+    # Grava feedbacks e interações em lote a partir de uma thread de fundo, no
+    # lugar de um INSERT + COMMIT por evento. add_feedback/add_interaction só
+    # validam e enfileiram; o flush acontece quando a fila chega a batch_size
+    # ou a cada flush_interval segundos, via bulk_add_* do DBManager (que
+    # continua avisando os assinantes, um evento por linha).
+    #
+    # Com a fila cheia (max_pending eventos ainda não gravados, contando os de
+    # flushes que falharam) quem chama espera até put_timeout e, se não
+    # houver espaço, o evento é recusado (retorno False). close() - também
+    # registrado no atexit - grava o que restou. Com wal_path cada evento é
+    # anexado a um arquivo JSON Lines antes de entrar na fila; o arquivo é
+    # rotacionado a cada flush e o segmento só é apagado depois que seus
+    # eventos chegaram ao banco. Segmentos que sobraram de uma execução
+    # anterior são regravados no início. Cada evento recebe um id ao entrar
+    # na fila, gravado também no write-ahead, e o banco ignora ids já
+    # gravados: um segmento regravado depois de uma queda (ou um lote
+    # repetido após um commit sem resposta) não duplica eventos.
+    def __init__(self, db_manager, batch_size=EVENT_WRITER_BATCH_SIZE, flush_interval=EVENT_WRITER_FLUSH_SECONDS,
+                 max_pending=EVENT_WRITER_MAX_PENDING, put_timeout=EVENT_WRITER_PUT_TIMEOUT, wal_path=None,
+                 wal_fsync=EVENT_WRITER_WAL_FSYNC):
+        self.db_manager = db_manager
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.put_timeout = put_timeout
+        self.wal_path = wal_path if wal_path is not None else (EVENT_WRITER_WAL_PATH or None)
+        self.wal_fsync = wal_fsync
+        self._buffer = []
+        self._pending = {kind: [] for kind in _ROW_BUILDERS}
+        self._segments = []
+        self._wal_file = None
+        self._wal_events = 0
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        self.accepted = 0
+        self.rejected = 0
+        self.written = 0
+        self.skipped = 0
+        self.failed_flushes = 0
+        self.last_flush_elapsed = None
+
+        if self.wal_path:
+            self._recover_wal()
+        self._thread = threading.Thread(target=self._run, name="buffered-event-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def add_feedback(self, feedback_data):
+        return self._enqueue("feedback", feedback_data)
+
+    def add_interaction(self, interaction_data):
+        return self._enqueue("interaction", interaction_data)
+
+    def _backlog(self):
+        return len(self._buffer) + sum(len(rows) for rows in self._pending.values())
+
+    def _enqueue(self, kind, data):
+        try:
+            row = _ROW_BUILDERS[kind](data)
+        except (KeyError, TypeError, ValueError) as e:
+            logging.error(f"Evento de {kind} inválido, descartado: {e}")
+            return False
+
+        deadline = time.monotonic() + self.put_timeout
+        with self._condition:
+            while not self._closed and self._backlog() >= self.max_pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.rejected += 1
+                    logging.warning(f"Fila de eventos cheia ({self.max_pending} pendentes), evento de {kind} recusado.")
+                    return False
+                self._condition.wait(remaining)
+            if self._closed:
+                self.rejected += 1
+                logging.warning(f"Gravador de eventos já fechado, evento de {kind} recusado.")
+                return False
+            if self.wal_path:
+                self._wal_append(kind, row)
+            self._buffer.append((kind, row))
+            self.accepted += 1
+            if len(self._buffer) >= self.batch_size:
+                self._condition.notify_all()
+        return True
+
+    def _wal_append(self, kind, row):
+        # Uma falha no write-ahead não perde o evento em memória, só a
+        # garantia de sobreviver a uma queda.
+        try:
+            if self._wal_file is None:
+                self._wal_file = open(self.wal_path, 'a', encoding='utf-8')
+            self._wal_file.write(json.dumps({"kind": kind, "row": row}, default=_json_default) + "\n")
+            self._wal_file.flush()
+            if self.wal_fsync:
+                os.fsync(self._wal_file.fileno())
+            self._wal_events += 1
+        except OSError as e:
+            logging.error(f"Erro ao escrever no write-ahead '{self.wal_path}': {e}")
+
+    def _rotate_wal(self):
+        if self._wal_file is not None:
+            self._wal_file.close()
+            self._wal_file = None
+        if not self._wal_events:
+            return None
+        segment = f"{self.wal_path}.{time.time_ns()}"
+        try:
+            os.replace(self.wal_path, segment)
+        except OSError as e:
+            logging.error(f"Erro ao rotacionar o write-ahead '{self.wal_path}': {e}")
+            return None
+        self._wal_events = 0
+        return segment
+
+    def _recover_wal(self):
+        segments = sorted(glob.glob(glob.escape(self.wal_path) + ".*"))
+        if os.path.exists(self.wal_path):
+            segment = f"{self.wal_path}.{time.time_ns()}"
+            os.replace(self.wal_path, segment)
+            segments.append(segment)
+
+        recovered = 0
+        for segment in segments:
+            for entry in iter_json_lines(segment):
+                kind = entry.get("kind")
+                row = entry.get("row")
+                if kind not in self._pending or not isinstance(row, dict):
+                    continue
+                try:
+                    if isinstance(row.get("timestamp"), str):
+                        row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+                    # O id foi gerado aqui ao enfileirar: um valor que não é
+                    # UUID indica um registro corrompido, não um id de origem.
+                    row["id"] = uuid.UUID(row["id"])
+                    row = _ROW_BUILDERS[kind](row)
+                except (KeyError, TypeError, ValueError) as e:
+                    logging.error(f"Evento de {kind} inválido no write-ahead '{segment}', descartado: {e}")
+                    continue
+                self._pending[kind].append(row)
+                recovered += 1
+        self._segments.extend(segments)
+        if recovered:
+            logging.info(f"{recovered} eventos recuperados do write-ahead '{self.wal_path}'.")
+
+    def flush(self):
+        # Grava tudo o que foi aceito até agora. Retorna False se algum lote
+        # falhou; esses eventos ficam pendentes para o próximo flush.
+        with self._flush_lock:
+            with self._condition:
+                events = self._buffer
+                self._buffer = []
+                segment = self._rotate_wal() if self.wal_path else None
+                for kind, row in events:
+                    self._pending[kind].append(row)
+            if segment:
+                self._segments.append(segment)
+            return self._write_pending()
+
+    def _write_pending(self):
+        started = time.perf_counter()
+        writers = {"feedback": self.db_manager.bulk_add_feedback, "interaction": self.db_manager.bulk_add_interactions}
+        success = True
+        for kind, bulk_add in writers.items():
+            rows = self._pending[kind]
+            if not rows:
+                continue
+            try:
+                stats = bulk_add(rows, row_events=True)
+            except Exception as e:
+                success = False
+                logging.error(f"Erro ao gravar {len(rows)} eventos de {kind}, nova tentativa no próximo flush: {e}")
+                continue
+            self.written += stats["rows"]
+            self.skipped += stats["skipped"]
+            if stats["skipped"]:
+                logging.warning(f"{stats['skipped']} eventos de {kind} descartados pelo banco: {stats['errors'][:5]}")
+            with self._condition:
+                self._pending[kind] = []
+                self._condition.notify_all()
+
+        if success:
+            for segment in self._segments:
+                try:
+                    os.remove(segment)
+                except OSError as e:
+                    logging.error(f"Erro ao remover segmento do write-ahead '{segment}': {e}")
+            self._segments = []
+        else:
+            self.failed_flushes += 1
+        self.last_flush_elapsed = time.perf_counter() - started
+        return success
+
+    def _run(self):
+        while True:
+            try:
+                success = self.flush()
+            except Exception as e:
+                success = False
+                logging.error(f"Erro inesperado no flush de eventos: {e}")
+            with self._condition:
+                if self._closed:
+                    break
+                if success:
+                    self._condition.wait_for(lambda: self._closed or len(self._buffer) >= self.batch_size, self.flush_interval)
+                else:
+                    # Banco fora: espera o intervalo inteiro antes de tentar de novo.
+                    self._condition.wait_for(lambda: self._closed, self.flush_interval)
+        self.flush()
+
+    def close(self, timeout=None):
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+        atexit.unregister(self.close)
+
+        stats = self.stats()
+        if stats["pending"] or stats["buffered"]:
+            lost = "mantidos no write-ahead" if self.wal_path else "perdidos"
+            logging.error(f"{stats['pending'] + stats['buffered']} eventos não gravados no fechamento ({lost}).")
+        logging.info(f"Gravador de eventos fechado: {self.written} gravados, {self.skipped} descartados, {self.rejected} recusados.")
+
+    def stats(self):
+        with self._condition:
+            return {
+                "accepted": self.accepted,
+                "rejected": self.rejected,
+                "written": self.written,
+                "skipped": self.skipped,
+                "failed_flushes": self.failed_flushes,
+                "buffered": len(self._buffer),
+                "pending": sum(len(rows) for rows in self._pending.values()),
+                "last_flush_elapsed": self.last_flush_elapsed
+            }
@@ -0,0 +1,31 @@
+import os
+import sys
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from src.database.db_manager import DBManager, PARTITION_MONTHS_AHEAD, PARTITIONED_TABLES
+
+# Migrações de esquema para bancos criados com versões anteriores dos modelos.
+# Uso:
+#   python src/database/migrate.py
+#   python src/database/migrate.py --tables feedback interactions
+#   python src/database/migrate.py --partition
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Aplica ao banco existente os índices e partições declarados nos modelos.")
+    parser.add_argument('--tables', nargs='+', default=None, help="Tabelas a migrar (padrão: todas).")
+    parser.add_argument('--partition', action='store_true',
+                        help="Converte feedback/interactions para tabelas particionadas por mês (bloqueia as tabelas durante a cópia).")
+    parser.add_argument('--months-ahead', type=int, default=PARTITION_MONTHS_AHEAD)
+    args = parser.parse_args()
+
+    db_manager = DBManager()
+    if args.partition:
+        partition_tables = [table for table in PARTITIONED_TABLES if not args.tables or table in args.tables]
+        converted = db_manager.partition_tables(partition_tables, args.months_ahead)
+        print(f"Tabelas convertidas para particionadas: {', '.join(converted) if converted else 'nenhuma'}")
+        db_manager.ensure_partitions(args.months_ahead, partition_tables)
+
+    created = db_manager.ensure_indexes(args.tables)
+    print(f"{len(created)} índices verificados/criados: {', '.join(created)}")
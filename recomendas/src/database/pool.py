@@ -0,0 +1,133 @@
+import os
+import time
+import threading
+import logging
+
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Conexões mais velhas que isto (segundos) são recriadas no checkout; -1 desliga.
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+# Checkouts que esperam mais que isto (segundos) contam como lentos.
+DB_POOL_SLOW_CHECKOUT_SECONDS = float(os.getenv("DB_POOL_SLOW_CHECKOUT_SECONDS", "0.1"))
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+class PoolMetrics:
+    # Tempo de espera por uma conexão livre no checkout do pool. Espera alta
+    # (ou muitos checkouts lentos) indica pool pequeno para a carga.
+    def __init__(self, slow_threshold=DB_POOL_SLOW_CHECKOUT_SECONDS):
+        self.slow_threshold = slow_threshold
+        self.checkouts = 0
+        self.slow_checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, wait):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += wait
+            if wait > self.max_wait:
+                self.max_wait = wait
+            if wait >= self.slow_threshold:
+                self.slow_checkouts += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "slow_checkouts": self.slow_checkouts,
+                "total_wait": self.total_wait,
+                "mean_wait": self.total_wait / self.checkouts if self.checkouts else 0.0,
+                "max_wait": self.max_wait
+            }
+
+
+class TimedQueuePool(QueuePool):
+    # QueuePool que mede quanto cada checkout esperou por uma conexão.
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.metrics.record(time.perf_counter() - started)
+
+    def recreate(self):
+        # dispose() recria o pool; as métricas continuam acumulando.
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def get_engine(database_url, pool_size=None, max_overflow=None, pool_timeout=None, pool_recycle=None, pool_pre_ping=None):
+    # Um único Engine (e pool) por URL e configuração no processo inteiro:
+    # todos os DBManager com a mesma URL compartilham as conexões.
+    options = {
+        "pool_size": DB_POOL_SIZE if pool_size is None else pool_size,
+        "max_overflow": DB_MAX_OVERFLOW if max_overflow is None else max_overflow,
+        "pool_timeout": DB_POOL_TIMEOUT if pool_timeout is None else pool_timeout,
+        "pool_recycle": DB_POOL_RECYCLE if pool_recycle is None else pool_recycle,
+        "pool_pre_ping": DB_POOL_PRE_PING if pool_pre_ping is None else pool_pre_ping
+    }
+    key = (database_url, tuple(sorted(options.items())))
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = create_engine(database_url, poolclass=TimedQueuePool, **options)
+            _engines[key] = engine
+            logging.info(
+                f"Engine criado: pool_size={options['pool_size']}, max_overflow={options['max_overflow']}, "
+                f"pool_recycle={options['pool_recycle']}s, pre_ping={options['pool_pre_ping']}."
+            )
+            return engine, True
+        return engine, False
+
+
+def pool_stats(engine):
+    pool = engine.pool
+    stats = {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow()
+    }
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        stats.update(metrics.stats())
+    return stats
+
+
+def _reset_engines_after_fork():
+    # Um filho criado por fork (ex.: ProcessPoolExecutor do model_builder)
+    # herda os sockets do pool do pai; usá-los nos dois processos corrompe as
+    # conexões. O filho descarta o pool herdado sem fechar os sockets (que
+    # continuam do pai) e passa a abrir conexões próprias nos mesmos Engines.
+    global _engines_lock
+    _engines_lock = threading.Lock()
+    for engine in _engines.values():
+        engine.dispose(close=False)
+        if hasattr(engine.pool, "metrics"):
+            engine.pool.metrics = PoolMetrics()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_engines_after_fork)
+
+
+def dispose_engines():
+    with _engines_lock:
+        engines = list(_engines.values())
+        _engines.clear()
+    for engine in engines:
+        engine.dispose()
@@ -0,0 +1,42 @@
+import os
+import sys
+import argparse
+from datetime import datetime
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from src.database.db_manager import DBManager, PARTITION_MONTHS_AHEAD, PARTITIONED_TABLES, month_start, add_months
+
+# Meses completos de feedback/interações mantidos linha a linha (além do mês atual).
+RETENTION_MONTHS = int(os.getenv("RETENTION_MONTHS", "12"))
+
+# Job de retenção: cria as partições dos próximos meses e remove as partições
+# mais antigas que a janela de retenção, agregando-as antes por dia e produto
+# em feedback_daily / interactions_daily. Pensado para rodar diariamente (cron).
+# Uso:
+#   python src/database/retention.py
+#   python src/database/retention.py --keep-months 6 --no-rollup
+
+
+def run_retention(db_manager, keep_months=RETENTION_MONTHS, rollup=True, months_ahead=PARTITION_MONTHS_AHEAD,
+                  tables=PARTITIONED_TABLES, now=None):
+    cutoff = add_months(month_start(now if now else datetime.now()), -keep_months)
+    created = db_manager.ensure_partitions(months_ahead, tables)
+    dropped = db_manager.drop_partitions_before(cutoff, rollup, tables)
+    return {"cutoff": cutoff, "created": created, "dropped": dropped}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Cria partições futuras e remove (agregando) as partições antigas de feedback e interações.")
+    parser.add_argument('--keep-months', type=int, default=RETENTION_MONTHS)
+    parser.add_argument('--no-rollup', action='store_true', help="Remove as partições antigas sem agregá-las.")
+    parser.add_argument('--months-ahead', type=int, default=PARTITION_MONTHS_AHEAD)
+    parser.add_argument('--tables', nargs='+', choices=PARTITIONED_TABLES, default=list(PARTITIONED_TABLES))
+    args = parser.parse_args()
+
+    result = run_retention(DBManager(), args.keep_months, not args.no_rollup, args.months_ahead, args.tables)
+    print(f"Corte: {result['cutoff']:%Y-%m-%d}. Partições criadas: {', '.join(result['created']) if result['created'] else 'nenhuma'}.")
+    for entry in result['dropped']:
+        print(f"  {entry['partition']}: removida ({entry['rollup_rows']} linhas de rollup)")
+    if not result['dropped']:
+        print("Nenhuma partição antiga para remover.")
@@ -0,0 +1,114 @@
+import os
+import sys
+import time
+import argparse
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.database.db_manager import DBManager
+from src.utils.recommendation_manager import RecommendationManager
+from src.utils.ranking import SCORING_CHUNK_SIZE
+
+PRECOMPUTE_TOP_N = int(os.getenv("PRECOMPUTE_TOP_N", "20"))
+PRECOMPUTE_USERS_PER_TASK = int(os.getenv("PRECOMPUTE_USERS_PER_TASK", "5000"))
+
+# Gerenciador do processo atual. Com fork os workers herdam os modelos já
+# treinados pelo processo pai (copy-on-write); com spawn cada worker monta o
+# seu no initializer.
+_manager = None
+
+
+def _init_worker():
+    global _manager
+    # Com fork o pool herdado do pai já foi descartado em src/database/pool.py.
+    if _manager is None:
+        _manager = RecommendationManager(DBManager())
+
+
+def _precompute_chunk(algorithm_type, user_ids, top_n, chunk_size, generated_at):
+    scored = _manager.score_batch(user_ids, algorithm_type, top_n, chunk_size)
+    rows = (
+        {
+            "user_id": user_id,
+            "algorithm": algorithm_type,
+            "rank": rank,
+            "product_id": product_id,
+            "score": score,
+            "generated_at": generated_at
+        }
+        for user_id, results in scored.items()
+        for rank, (product_id, score) in enumerate(results, start=1)
+    )
+    stats = _manager.db_manager.bulk_add_recommendations(rows)
+    return stats["rows"], stats["skipped"]
+
+
+def precompute(algorithm_types=None, top_n=PRECOMPUTE_TOP_N, workers=None, users_per_task=PRECOMPUTE_USERS_PER_TASK,
+               chunk_size=SCORING_CHUNK_SIZE):
+    global _manager
+    db_manager = DBManager()
+    _manager = RecommendationManager(db_manager, use_precomputed=False)
+    algorithm_types = algorithm_types if algorithm_types else _manager.available_algorithms()
+    user_ids = db_manager.read_table_frame('users', columns=['user_id'])['user_id'].astype(str).tolist()
+    if not user_ids:
+        print("Nenhum usuário encontrado para pré-calcular recomendações.")
+        return {}
+
+    # Treina tudo antes de abrir o pool para que os workers herdem os modelos.
+    for algorithm_type in algorithm_types:
+        _manager.prepare_model(algorithm_type)
+    db_manager.engine.dispose()
+
+    start_methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in start_methods else None)
+    chunks = [user_ids[start:start + users_per_task] for start in range(0, len(user_ids), users_per_task)]
+    summary = {}
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as executor:
+        for algorithm_type in algorithm_types:
+            started = time.perf_counter()
+            generated_at = datetime.now()
+            futures = [
+                executor.submit(_precompute_chunk, algorithm_type, chunk, top_n, chunk_size, generated_at)
+                for chunk in chunks
+            ]
+            written = skipped = failed = 0
+            for future in as_completed(futures):
+                try:
+                    rows, skipped_rows = future.result()
+                    written += rows
+                    skipped += skipped_rows
+                except Exception as e:
+                    failed += 1
+                    logging.error(f"Erro ao pré-calcular um bloco de usuários para '{algorithm_type}': {e}")
+
+            # Só descarta o lote anterior se o novo foi gravado por completo;
+            # caso contrário os leitores continuam vendo o lote antigo.
+            removed = db_manager.delete_recommendations(algorithm_type, generated_at) if not failed else 0
+            elapsed = time.perf_counter() - started
+            summary[algorithm_type] = {
+                "rows": written, "skipped": skipped, "failed_chunks": failed, "removed": removed, "elapsed": elapsed
+            }
+            logging.info(
+                f"Pré-cálculo '{algorithm_type}': {written} linhas para {len(user_ids)} usuários em {elapsed:.1f}s "
+                f"({skipped} ignoradas, {failed} blocos com erro, {removed} linhas antigas removidas)."
+            )
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Pré-calcula o top-N de cada algoritmo para todos os usuários na tabela recommendations.")
+    parser.add_argument('--algorithms', nargs='+', default=None, help="Algoritmos a pré-calcular (padrão: todos os registrados).")
+    parser.add_argument('--top-n', type=int, default=PRECOMPUTE_TOP_N)
+    parser.add_argument('--workers', type=int, default=None, help="Processos no pool (padrão: número de CPUs).")
+    parser.add_argument('--users-per-task', type=int, default=PRECOMPUTE_USERS_PER_TASK)
+    parser.add_argument('--chunk-size', type=int, default=SCORING_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    results = precompute(args.algorithms, args.top_n, args.workers, args.users_per_task, args.chunk_size)
+    if any(stats["failed_chunks"] for stats in results.values()):
+        sys.exit(1)
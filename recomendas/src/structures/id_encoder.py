@@ -0,0 +1,41 @@
+import numpy as np
+
+class IdEncoder:
+    # Mapeia IDs externos (user_id, product_id) para inteiros contíguos,
+    # usados como linhas/colunas das matrizes esparsas e dos arrays de fatores.
+    def __init__(self, ids=None):
+        self.ids = []
+        self._index = {}
+        if ids is not None:
+            self.extend(ids)
+
+    def add(self, external_id):
+        index = self._index.get(external_id)
+        if index is None:
+            index = len(self.ids)
+            self._index[external_id] = index
+            self.ids.append(external_id)
+        return index
+
+    def extend(self, external_ids):
+        for external_id in external_ids:
+            self.add(external_id)
+
+    def encode(self, external_id, default=None):
+        return self._index.get(external_id, default)
+
+    def encode_many(self, external_ids):
+        # IDs desconhecidos viram -1.
+        return np.fromiter((self._index.get(external_id, -1) for external_id in external_ids), dtype=np.int64)
+
+    def decode(self, index):
+        return self.ids[index]
+
+    def decode_many(self, indices):
+        return [self.ids[index] for index in indices]
+
+    def __contains__(self, external_id):
+        return external_id in self._index
+
+    def __len__(self):
+        return len(self.ids)
@@ -0,0 +1,74 @@
+import threading
+
+import numpy as np
+
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+def normalize_value(value):
+    return str(value).strip().lower()
+
+
+class InvertedIndex:
+    # Índice invertido (campo, valor) -> linhas, com listas de postagem em
+    # arrays int ordenados. Linhas novas só são acrescentadas com índices
+    # crescentes, então as listas continuam ordenadas sem reordenar.
+    def __init__(self):
+        self._postings = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def add(self, row, fields):
+        with self._lock:
+            for key in set(self._keys(fields)):
+                self._pending.setdefault(key, []).append(row)
+
+    def _keys(self, fields):
+        for field, value in fields.items():
+            if value is None or isinstance(value, dict):
+                continue
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            for item in values:
+                if item is None or item != item or isinstance(item, (dict, list)):
+                    continue
+                normalized = normalize_value(item)
+                if normalized:
+                    yield (field, normalized)
+
+    def _merge_pending(self):
+        for key, rows in self._pending.items():
+            new_rows = np.fromiter(rows, dtype=np.int64, count=len(rows))
+            existing = self._postings.get(key)
+            self._postings[key] = new_rows if existing is None else np.concatenate([existing, new_rows])
+        self._pending = {}
+
+    def lookup(self, field, value):
+        with self._lock:
+            if self._pending:
+                self._merge_pending()
+            return self._postings.get((field, normalize_value(value)), _EMPTY)
+
+    def intersect(self, filters):
+        # Começa pela menor lista de postagem para manter o custo proporcional
+        # ao conjunto de candidatos, não ao catálogo.
+        postings = sorted((self.lookup(field, value) for field, value in filters.items()), key=len)
+        if not postings:
+            return None
+        result = postings[0]
+        for posting in postings[1:]:
+            if not len(result):
+                break
+            result = np.intersect1d(result, posting, assume_unique=True)
+        return result
+
+    def values(self, field):
+        with self._lock:
+            if self._pending:
+                self._merge_pending()
+            return sorted(value for key_field, value in self._postings if key_field == field)
+
+    def __len__(self):
+        with self._lock:
+            if self._pending:
+                self._merge_pending()
+            return len(self._postings)
@@ -0,0 +1,68 @@
+import threading
+from contextlib import contextmanager
+
+
+class SnapshotHolder:
+    # Guarda a versão atual de um objeto imutável (ex.: um modelo treinado) e
+    # permite trocá-la atomicamente. Leitores pegam a versão atual com
+    # acquire() e a usam até o fim, mesmo que uma troca aconteça no meio; uma
+    # versão substituída é liberada (on_release) quando o último leitor sai.
+    def __init__(self, snapshot=None, on_release=None):
+        self._current = snapshot
+        self._readers = {}
+        self._retired = {}
+        self._on_release = on_release
+        self._lock = threading.Lock()
+        self.swaps = 0
+        self.releases = 0
+
+    @property
+    def current(self):
+        return self._current
+
+    @contextmanager
+    def acquire(self):
+        with self._lock:
+            snapshot = self._current
+            key = id(snapshot)
+            self._readers[key] = self._readers.get(key, 0) + 1
+        try:
+            yield snapshot
+        finally:
+            released = None
+            with self._lock:
+                self._readers[key] -= 1
+                if not self._readers[key]:
+                    del self._readers[key]
+                    released = self._retired.pop(key, None)
+            if released is not None:
+                self._release(released)
+
+    def swap(self, snapshot):
+        released = None
+        with self._lock:
+            previous = self._current
+            self._current = snapshot
+            self.swaps += 1
+            if previous is not None and previous is not snapshot:
+                if self._readers.get(id(previous)):
+                    self._retired[id(previous)] = previous
+                else:
+                    released = previous
+        if released is not None:
+            self._release(released)
+        return previous
+
+    def _release(self, snapshot):
+        self.releases += 1
+        if self._on_release is not None:
+            self._on_release(snapshot)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "swaps": self.swaps,
+                "releases": self.releases,
+                "readers": sum(self._readers.values()),
+                "retired": len(self._retired)
+            }
@@ -474,10 +474,9 @@ class RecomendasGUI:
 
         content_recommender = self.recommendation_manager.content_based_recommender
 
-        if content_recommender.products_df is None or content_recommender.tfidf_matrix is None:
-            content_recommender._prepare_data()
-
-        if content_recommender.products_df.empty:
+        if not content_recommender.model.n_rows:
+            # O modelo é (re)construído em segundo plano; a tela não espera por ele.
+            content_recommender.rebuild_async()
             ttk.Label(self.content_frame, text="Não há produtos suficientes para gerar recomendações.", background=self.secondary_color, foreground=self.text_color, font=self.font_body).pack(pady=20)
             return
 
@@ -0,0 +1,103 @@
+import os
+import time
+import bisect
+import threading
+import logging
+from datetime import datetime, timedelta
+
+POPULARITY_MIN_RATINGS = 2
+POPULARITY_RECONCILE_SECONDS = float(os.getenv("POPULARITY_RECONCILE_SECONDS", "300"))
+# Janela (dias) de feedback usada nos agregados; 0 considera o histórico inteiro.
+POPULARITY_WINDOW_DAYS = int(os.getenv("POPULARITY_WINDOW_DAYS", "90"))
+
+
+def popularity_window_start():
+    return datetime.now() - timedelta(days=POPULARITY_WINDOW_DAYS) if POPULARITY_WINDOW_DAYS > 0 else None
+
+
+class PopularityTracker:
+    # Ranking de popularidade (maior nota média entre produtos com pelo menos
+    # min_ratings avaliações) mantido por agregados soma/contagem por produto.
+    # Cada feedback novo atualiza o ranking em O(log n); a leitura do top-k é
+    # um fatiamento O(k). Periodicamente os agregados são reconciliados com o
+    # banco via GROUP BY, corrigindo qualquer evento perdido.
+    # Janela: só a reconciliação descarta o feedback que saiu de
+    # POPULARITY_WINDOW_DAYS; record() apenas soma. Entre duas reconciliações o
+    # ranking ainda conta o feedback que expirou nesse intervalo (no máximo
+    # reconcile_interval segundos de dados, contra uma janela de dias), e na
+    # reconciliação seguinte essas notas saem de uma vez. Esse desvio é
+    # aceito para manter o feedback novo em O(log n) sem guardar notas por data.
+    def __init__(self, db_manager, min_ratings=POPULARITY_MIN_RATINGS, reconcile_interval=POPULARITY_RECONCILE_SECONDS,
+                 clock=time.monotonic):
+        self.db_manager = db_manager
+        self.min_ratings = min_ratings
+        self.reconcile_interval = reconcile_interval
+        self._clock = clock
+        self._sums = {}
+        self._counts = {}
+        self._ranking = []
+        self._lock = threading.Lock()
+        self._last_reconciled = None
+
+        if hasattr(db_manager, 'subscribe'):
+            db_manager.subscribe('feedback_added', self._on_feedback_added)
+            db_manager.subscribe('feedback_changed', self._on_feedback_changed)
+
+    def _ranking_key(self, product_id):
+        return (-self._sums[product_id] / self._counts[product_id], product_id)
+
+    def load_aggregates(self, aggregates):
+        sums = {product_id: rating_sum for product_id, rating_sum, _ in aggregates}
+        counts = {product_id: count for product_id, _, count in aggregates}
+        ranking = sorted(
+            (-sums[product_id] / counts[product_id], product_id)
+            for product_id in counts if counts[product_id] >= self.min_ratings
+        )
+        with self._lock:
+            self._sums = sums
+            self._counts = counts
+            self._ranking = ranking
+            self._last_reconciled = self._clock()
+
+    def reconcile(self):
+        aggregates = self.db_manager.get_feedback_aggregates(since=popularity_window_start())
+        if aggregates is None:
+            return False
+        self.load_aggregates(aggregates)
+        logging.info(f"Popularidade reconciliada com o banco: {len(self._counts)} produtos avaliados.")
+        return True
+
+    def record(self, product_id, rating):
+        with self._lock:
+            if self._counts.get(product_id, 0) >= self.min_ratings:
+                old_key = self._ranking_key(product_id)
+                position = bisect.bisect_left(self._ranking, old_key)
+                if position < len(self._ranking) and self._ranking[position] == old_key:
+                    del self._ranking[position]
+            self._sums[product_id] = self._sums.get(product_id, 0) + rating
+            self._counts[product_id] = self._counts.get(product_id, 0) + 1
+            if self._counts[product_id] >= self.min_ratings:
+                bisect.insort(self._ranking, self._ranking_key(product_id))
+
+    def _is_stale(self):
+        return self._last_reconciled is None or self._clock() - self._last_reconciled >= self.reconcile_interval
+
+    def top(self, k):
+        if self._is_stale():
+            self.reconcile()
+        with self._lock:
+            return [product_id for _, product_id in self._ranking[:k]]
+
+    def has_feedback(self):
+        if self._is_stale():
+            self.reconcile()
+        with self._lock:
+            return bool(self._counts)
+
+    def _on_feedback_added(self, feedback_row):
+        if self._last_reconciled is not None:
+            self.record(feedback_row['product_id'], feedback_row['rating'])
+
+    def _on_feedback_changed(self, _payload=None):
+        with self._lock:
+            self._last_reconciled = None
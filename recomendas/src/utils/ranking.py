@@ -0,0 +1,64 @@
+import os
+
+import numpy as np
+
+# Linhas (usuários) pontuadas por bloco nas rotinas em lote: limita a matriz
+# densa de scores a SCORING_CHUNK_SIZE x catálogo.
+SCORING_CHUNK_SIZE = int(os.getenv("SCORING_CHUNK_SIZE", "2048"))
+# Memória máxima (bytes) de um bloco de scores densos. Em catálogos grandes o
+# bloco fica com menos linhas que SCORING_CHUNK_SIZE (ver scoring_rows_per_block).
+SCORING_BLOCK_BYTES = int(os.getenv("SCORING_BLOCK_BYTES", str(256 * 1024 * 1024)))
+# Bytes por célula do bloco: scores float64, a cópia negada e os índices do
+# argpartition em top_k_rows (8 cada) e a máscara booleana de candidatos.
+_SCORING_BYTES_PER_CELL = 25
+
+
+def scoring_rows_per_block(n_columns, chunk_size=SCORING_CHUNK_SIZE, block_bytes=SCORING_BLOCK_BYTES):
+    rows = block_bytes // max(1, n_columns * _SCORING_BYTES_PER_CELL)
+    return int(max(1, min(chunk_size, rows)))
+
+
+def top_k_indices(scores, k, exclude=None):
+    # Seleção parcial: argpartition O(n) para achar os k maiores e ordenação
+    # apenas desses k, em vez de um argsort completo sobre todos os itens.
+    # exclude aceita uma máscara booleana ou um array de índices a ignorar.
+    scores = np.asarray(scores).ravel()
+    candidates = None
+    if exclude is not None:
+        allowed = np.ones(len(scores), dtype=bool)
+        exclude = np.asarray(exclude)
+        # Uma lista vazia viraria um array float64, que não serve de índice.
+        allowed[exclude if exclude.dtype == bool else exclude.astype(np.intp)] = False
+        candidates = np.flatnonzero(allowed)
+        scores = scores[candidates]
+
+    k = min(int(k), len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    if k < len(scores):
+        selected = np.argpartition(-scores, k - 1)[:k]
+    else:
+        selected = np.arange(len(scores))
+    selected = selected[np.argsort(-scores[selected], kind='stable')]
+
+    return candidates[selected] if candidates is not None else selected
+
+
+def top_k_rows(score_matrix, k):
+    # Versão em lote de top_k_indices: os k maiores de cada linha de uma
+    # matriz densa (usuários x itens), com argpartition ao longo do eixo 1.
+    # Itens a excluir devem vir com -inf e são descartados por quem chama.
+    score_matrix = np.asarray(score_matrix)
+    n_rows, n_cols = score_matrix.shape
+    k = min(int(k), n_cols)
+    if k <= 0:
+        return np.empty((n_rows, 0), dtype=np.intp)
+
+    if k < n_cols:
+        selected = np.argpartition(-score_matrix, k - 1, axis=1)[:, :k]
+    else:
+        selected = np.tile(np.arange(n_cols), (n_rows, 1))
+    selected_scores = np.take_along_axis(score_matrix, selected, axis=1)
+    order = np.argsort(-selected_scores, axis=1, kind='stable')
+    return np.take_along_axis(selected, order, axis=1)
@@ -1,53 +1,286 @@
 import os
 import sys
+import asyncio
 import logging
+from datetime import timedelta
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 
-from src.database.db_manager import DBManager, Product
+from src.database.db_manager import DBManager
+from src.database.async_db_manager import AsyncDBManager
 from src.algorithms.content_based import ContentBasedRecommender
+from src.algorithms.collaborative import CollaborativeRecommender
+from src.algorithms.item_item import ItemItemRecommender
+from src.algorithms.matrix_factorization import ALSRecommender
+from src.utils.popularity import PopularityTracker
+from src.utils.trending import TrendingTracker
+from src.structures.lru_cache import LRUCache
+from src.utils.ranking import SCORING_CHUNK_SIZE
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+RECOMMENDATION_CACHE_SIZE = int(os.getenv("RECOMMENDATION_CACHE_SIZE", "10000"))
+RECOMMENDATION_CACHE_TTL = float(os.getenv("RECOMMENDATION_CACHE_TTL", "300"))
+USE_PRECOMPUTED_RECOMMENDATIONS = os.getenv("USE_PRECOMPUTED_RECOMMENDATIONS", "0") == "1"
+PRECOMPUTED_MAX_AGE_HOURS = float(os.getenv("PRECOMPUTED_MAX_AGE_HOURS", "24"))
+
 class RecommendationManager:
-    def __init__(self, db_manager):
+    def __init__(self, db_manager, use_precomputed=None, async_db_manager=None):
         self.db_manager = db_manager
+        self.async_db_manager = async_db_manager
+        # Modo read-through: serve da tabela recommendations quando há um lote
+        # recente o bastante, e só pontua online na falta dele.
+        self.use_precomputed = USE_PRECOMPUTED_RECOMMENDATIONS if use_precomputed is None else use_precomputed
+        self.precomputed_max_age = timedelta(hours=PRECOMPUTED_MAX_AGE_HOURS)
         self.content_based_recommender = ContentBasedRecommender(db_manager)
+        self.collaborative_recommender = None
+        self.item_item_recommender = None
+        self.als_recommender = None
+        self.popularity_tracker = PopularityTracker(db_manager)
+        self.trending_tracker = TrendingTracker(db_manager)
+        self.algorithms = {
+            "content_based": self._content_based_recommendations,
+            "collaborative": self._collaborative_recommendations,
+            "item_item": self._item_item_recommendations,
+            "als": self._als_recommendations,
+            "trending": self._trending_recommendations
+        }
+        # Resultados por (user_id, algoritmo, quantidade, versão do modelo).
+        # A versão na chave faz com que um modelo reconstruído nunca sirva
+        # resultados do anterior; o TTL limita o atraso de sinais globais
+        # (popularidade, tendências) que não disparam invalidação. O índice por
+        # user_id deixa a invalidação de um usuário proporcional às suas chaves.
+        self.result_cache = LRUCache(
+            max_size=RECOMMENDATION_CACHE_SIZE, ttl=RECOMMENDATION_CACHE_TTL, group_by=lambda key: key[0]
+        )
+        self._model_versions = {}
+
+        if hasattr(db_manager, 'subscribe'):
+            db_manager.subscribe('user_updated', self._invalidate_user)
+            db_manager.subscribe('feedback_added', self._on_user_activity)
+            db_manager.subscribe('interaction_added', self._on_user_activity)
+            db_manager.subscribe('feedback_changed', self._invalidate_all)
+            db_manager.subscribe('interactions_changed', self._invalidate_all)
+            db_manager.subscribe('product_added', self._invalidate_all)
+            db_manager.subscribe('product_updated', self._invalidate_all)
+            db_manager.subscribe('product_deleted', self._invalidate_all)
+            db_manager.subscribe('catalog_changed', self._invalidate_all)
+
+    def available_algorithms(self):
+        return list(self.algorithms)
 
     def get_user_recommendations(self, user_id, algorithm_type="content_based", num_recommendations=5):
+        recommend = self.algorithms.get(algorithm_type)
+        if recommend is None:
+            print(f"Tipo de algoritmo de recomendação '{algorithm_type}' não suportado.")
+            return self.get_popular_products(num_recommendations) or self.get_trending_products(num_recommendations)
+
+        cache_key = (user_id, algorithm_type, num_recommendations, self._model_version(algorithm_type))
+        cached = self.result_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+        # Um pedido inteiro (perfil, histórico, produtos) usa uma única conexão.
+        recommendations = None
+        if self.use_precomputed:
+            with self.db_manager.session_scope():
+                recommendations = self._precomputed_recommendations(user_id, algorithm_type, num_recommendations)
+        if not recommendations:
+            # O treino sob demanda abre as próprias conexões; fora do escopo,
+            # o pedido não segura duas conexões do pool enquanto ele roda.
+            self.prepare_model(algorithm_type)
+            with self.db_manager.session_scope():
+                recommendations = recommend(user_id, num_recommendations)
+        if recommendations:
+            self.result_cache.put(cache_key, list(recommendations))
+        return recommendations
+
+    async def get_user_recommendations_async(self, user_id, algorithm_type="content_based", num_recommendations=5):
+        # Ponto de entrada para servir muitos pedidos concorrentes num único
+        # processo: no caminho de conteúdo o acesso ao banco é assíncrono
+        # (AsyncDBManager) e a pontuação, que é CPU, roda numa thread para não
+        # travar o event loop. Os demais algoritmos usam o caminho síncrono
+        # inteiro numa thread.
+        if algorithm_type != "content_based" or self.use_precomputed:
+            return await asyncio.to_thread(self.get_user_recommendations, user_id, algorithm_type, num_recommendations)
+
+        cache_key = (user_id, algorithm_type, num_recommendations, self._model_version(algorithm_type))
+        cached = self.result_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+
+        if self.async_db_manager is None:
+            self.async_db_manager = AsyncDBManager(self.db_manager.database_url, events=self.db_manager)
+        user = await self.async_db_manager.get_user_by_id(user_id)
+        recommended_ids = await asyncio.to_thread(
+            self.content_based_recommender.recommend_ids_for_user, user, num_recommendations
+        )
+        if recommended_ids is None:
+            recommended_ids = self.content_based_recommender.default_product_ids(num_recommendations)
+        recommendations = await self.async_db_manager.get_products_by_ids(recommended_ids)
+        if recommendations:
+            self.result_cache.put(cache_key, list(recommendations))
+        return recommendations
+
+    def _precomputed_recommendations(self, user_id, algorithm_type, num_recommendations):
+        rows = self.db_manager.get_precomputed_recommendations(user_id, algorithm_type, self.precomputed_max_age)
+        if len(rows) < num_recommendations:
+            return None
+        return self.db_manager.get_products_by_ids([row.product_id for row in rows[:num_recommendations]])
+
+    def prepare_model(self, algorithm_type):
+        # Treina sob demanda os modelos que não são construídos no __init__.
+        if algorithm_type == "collaborative" and self.collaborative_recommender is None:
+            self.collaborative_recommender = CollaborativeRecommender(self.db_manager).fit()
+        elif algorithm_type == "item_item" and self.item_item_recommender is None:
+            self.item_item_recommender = ItemItemRecommender(self.db_manager).fit()
+        elif algorithm_type == "als" and self.als_recommender is None:
+            self.als_recommender = ALSRecommender(self.db_manager).fit()
+
+    def score_batch(self, user_ids, algorithm_type="content_based", num_recommendations=5,
+                    chunk_size=SCORING_CHUNK_SIZE):
+        # {user_id: [(product_id, score), ...]} para muitos usuários de uma
+        # vez. Conteúdo e ALS pontuam em lote por blocos de chunk_size
+        # usuários; os demais algoritmos caem no caminho por usuário e não
+        # têm score (None).
+        user_ids = list(dict.fromkeys(user_ids))
+        self.prepare_model(algorithm_type)
         if algorithm_type == "content_based":
-            if self.content_based_recommender:
-                print(f"Gerando recomendações baseadas em conteúdo para o usuário: {user_id}")
-                return self.content_based_recommender.get_recommendations_for_user_interests(user_id, num_recommendations)
-            else:
-                print("Erro: ContentBasedRecommender não inicializado.")
-                return []
-        else:
+            users = self.db_manager.get_users_by_ids(user_ids)
+            scored = self.content_based_recommender.recommend_batch(users, num_recommendations, chunk_size, with_scores=True)
+            missing_ids = [user_id for user_id in user_ids if user_id not in scored]
+            if missing_ids:
+                default_ids = self.content_based_recommender.default_product_ids(num_recommendations)
+                default_results = [(product_id, None) for product_id in default_ids]
+                scored.update((user_id, default_results) for user_id in missing_ids)
+            return scored
+        if algorithm_type == "als":
+            return self.als_recommender.recommend_batch(user_ids, num_recommendations, chunk_size, with_scores=True)
+        recommend = self.algorithms.get(algorithm_type)
+        if recommend is None:
             print(f"Tipo de algoritmo de recomendação '{algorithm_type}' não suportado.")
-            return self.get_popular_products(num_recommendations)
+            return {}
+        return {
+            user_id: [(product.product_id, None) for product in recommend(user_id, num_recommendations)]
+            for user_id in user_ids
+        }
+
+    def get_recommendations_batch(self, user_ids, algorithm_type="content_based", num_recommendations=5,
+                                  chunk_size=SCORING_CHUNK_SIZE):
+        # Mesmo que score_batch, mas devolvendo os produtos; os produtos de
+        # todos os usuários são buscados numa única consulta.
+        scored = self.score_batch(user_ids, algorithm_type, num_recommendations, chunk_size)
+        all_product_ids = {product_id for results in scored.values() for product_id, _ in results}
+        products = {product.product_id: product for product in self.db_manager.get_products_by_ids(all_product_ids)}
+        logging.info(f"Recomendações '{algorithm_type}' geradas em lote para {len(scored)} usuários.")
+        return {
+            user_id: [products[product_id] for product_id, _ in results if product_id in products]
+            for user_id, results in scored.items()
+        }
+
+    def _model_version(self, algorithm_type):
+        if algorithm_type == "content_based" and self.content_based_recommender:
+            return self.content_based_recommender.version
+        return self._model_versions.get(algorithm_type, 0)
+
+    def rebuild_models(self, algorithm_types=None):
+        # Descarta os modelos treinados sob demanda (são treinados de novo no
+        # próximo pedido) e reconstrói o de conteúdo em segundo plano.
+        algorithm_types = list(algorithm_types) if algorithm_types else self.available_algorithms()
+        for algorithm_type in algorithm_types:
+            if algorithm_type == "content_based":
+                self.content_based_recommender.rebuild_async()
+            elif algorithm_type == "collaborative":
+                self.collaborative_recommender = None
+            elif algorithm_type == "item_item":
+                self.item_item_recommender = None
+            elif algorithm_type == "als":
+                self.als_recommender = None
+            elif algorithm_type == "trending":
+                self.trending_tracker.load()
+        self.mark_models_changed(algorithm_types)
+
+    def mark_models_changed(self, algorithm_types):
+        # Novo modelo instalado por fora (reconstrução, artefato): os
+        # resultados em cache dos algoritmos afetados deixam de valer.
+        for algorithm_type in algorithm_types:
+            self._model_versions[algorithm_type] = self._model_versions.get(algorithm_type, 0) + 1
+        discarded = self.result_cache.discard_where(lambda key: key[1] in algorithm_types)
+        logging.info(f"Modelos {', '.join(algorithm_types)} atualizados; {discarded} resultados em cache descartados.")
+
+    def cache_stats(self):
+        return self.result_cache.stats()
+
+    def _invalidate_user(self, user_id):
+        self.result_cache.discard_group(user_id)
+
+    def _on_user_activity(self, row):
+        self._invalidate_user(row['user_id'])
+
+    def _invalidate_all(self, _payload=None):
+        self.result_cache.clear()
+
+    def _content_based_recommendations(self, user_id, num_recommendations):
+        if self.content_based_recommender:
+            print(f"Gerando recomendações baseadas em conteúdo para o usuário: {user_id}")
+            return self.content_based_recommender.get_recommendations_for_user_interests(user_id, num_recommendations)
+        else:
+            print("Erro: ContentBasedRecommender não inicializado.")
+            return []
+
+    def _collaborative_recommendations(self, user_id, num_recommendations):
+        self.prepare_model("collaborative")
+        print(f"Gerando recomendações colaborativas para o usuário: {user_id}")
+        recommended_ids = self.collaborative_recommender.recommend(user_id, num_recommendations)
+        return self.db_manager.get_products_by_ids(recommended_ids)
+
+    def _item_item_recommendations(self, user_id, num_recommendations):
+        self.prepare_model("item_item")
+        print(f"Gerando recomendações item-item para o usuário: {user_id}")
+        recommended_ids = self.item_item_recommender.recommend(user_id, num_recommendations)
+        return self.db_manager.get_products_by_ids(recommended_ids)
+
+    def _als_recommendations(self, user_id, num_recommendations):
+        self.prepare_model("als")
+        print(f"Gerando recomendações por fatoração de matrizes (ALS) para o usuário: {user_id}")
+        recommended_ids = self.als_recommender.recommend(user_id, num_recommendations)
+        return self.db_manager.get_products_by_ids(recommended_ids)
+
+    def _trending_recommendations(self, user_id, num_recommendations):
+        # Em alta nas categorias de interesse do usuário; sem interesses que
+        # casem com alguma categoria, em alta no catálogo inteiro.
+        print(f"Gerando recomendações em alta para o usuário: {user_id}")
+        user = self.db_manager.get_user_by_id(user_id)
+        interests = [interest.lower() for interest in user.interests] if user and user.interests else []
+        categories = [category for category in self.trending_tracker.categories() if category in interests]
+        recommended_ids = self.trending_tracker.top(num_recommendations, categories) if categories else []
+        if not recommended_ids:
+            recommended_ids = self.trending_tracker.top(num_recommendations)
+        return self.db_manager.get_products_by_ids(recommended_ids)
+
+    def get_trending_products(self, num_products=5, category=None):
+        try:
+            top_product_ids = self.trending_tracker.top(num_products, [category] if category else None)
+            return [product.to_dict() for product in self.db_manager.get_products_by_ids(top_product_ids)]
+        except Exception as e:
+            print(f"Erro ao obter produtos em alta: {e}")
+            return []
 
     def get_popular_products(self, num_products=5):
-        session = self.db_manager.get_session()
+        # A média vem do feedback dos últimos POPULARITY_WINDOW_DAYS dias (0 usa
+        # o histórico inteiro), não mais da média de todo o histórico; veja a
+        # nota sobre a janela em PopularityTracker.
         try:
-            feedback_df = self.db_manager.load_data_into_df('feedback')
-            if not feedback_df.empty:
-                product_ratings = feedback_df.groupby('product_id')['rating'].mean()
-                product_counts = feedback_df.groupby('product_id')['rating'].count()
-                valid_products = product_counts[product_counts >= 2].index
-                filtered_ratings = product_ratings[product_ratings.index.isin(valid_products)]
-                top_product_ids = filtered_ratings.nlargest(num_products).index.tolist()
+            if self.popularity_tracker.has_feedback():
+                top_product_ids = self.popularity_tracker.top(num_products)
             else:
-                logging.info("Não há feedbacks para determinar produtos populares. Retornando os últimos produtos adicionados.")
-                top_product_ids = [p.product_id for p in session.query(Product).order_by(Product.id.desc()).limit(num_products).all()]
-
-            recommended_products = []
-            for p_id in top_product_ids:
-                product_detail = self.db_manager.get_product_by_id(p_id)
-                if product_detail:
-                    recommended_products.append(product_detail.to_dict()) 
-            return recommended_products
+                top_product_ids = self.trending_tracker.top(num_products)
+                if top_product_ids:
+                    logging.info("Não há feedbacks para determinar produtos populares. Retornando os produtos em alta.")
+                else:
+                    logging.info("Não há feedbacks para determinar produtos populares. Retornando os últimos produtos adicionados.")
+                    top_product_ids = self.db_manager.get_latest_product_ids(num_products)
+
+            return [product.to_dict() for product in self.db_manager.get_products_by_ids(top_product_ids)]
         except Exception as e:
             print(f"Erro ao obter produtos populares: {e}")
             return []
-        finally:
-            session.close()
@@ -0,0 +1,180 @@
+import os
+import math
+import threading
+import logging
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from src.structures.id_encoder import IdEncoder
+from src.utils.ranking import top_k_indices
+
+TRENDING_HALF_LIFE_HOURS = float(os.getenv("TRENDING_HALF_LIFE_HOURS", "24"))
+# Eventos mais antigos que esta quantidade de meias-vidas pesam menos de 0,1%
+# e não são lidos na carga inicial.
+TRENDING_BOOTSTRAP_HALF_LIVES = 10
+TRENDING_EVENT_WEIGHTS = {'view': 1.0, 'click': 2.0, 'add_to_cart': 4.0, 'purchase': 8.0}
+DEFAULT_TRENDING_WEIGHT = 1.0
+# Limite do expoente antes de renormalizar todos os scores (evita overflow).
+_MAX_EXPONENT = 50.0
+_INITIAL_CAPACITY = 1024
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _to_seconds(timestamp):
+    # Segundos desde a época contando o horário "de parede" como está, igual
+    # ao datetime64 que o pandas lê do banco (colunas sem fuso). Usar
+    # datetime.timestamp() aqui interpretaria o valor no fuso local e daria
+    # scores diferentes para o mesmo evento carregado e registrado ao vivo.
+    if timestamp is None:
+        timestamp = datetime.now()
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    if isinstance(timestamp, datetime):
+        if timestamp.tzinfo is not None:
+            return timestamp.timestamp()
+        return (timestamp - _EPOCH).total_seconds()
+    return float(timestamp)
+
+
+class TrendingTracker:
+    # Scores de tendência com decaimento exponencial no tempo, ponderados pelo
+    # tipo de interação. Usa "forward decay": cada evento soma
+    # peso * exp(λ·(t - t_ref)), então todos os scores decaem juntos e a
+    # ordem relativa não muda com o tempo — atualizar é O(1) e não é preciso
+    # revisitar os demais produtos. Os scores ficam num array float64 indexado
+    # pelo código inteiro do produto.
+    def __init__(self, db_manager, half_life_hours=TRENDING_HALF_LIFE_HOURS, event_weights=None):
+        self.db_manager = db_manager
+        self.decay_rate = math.log(2) / (half_life_hours * 3600.0)
+        self.event_weights = event_weights if event_weights else TRENDING_EVENT_WEIGHTS
+        self._products = IdEncoder()
+        self._categories = IdEncoder()
+        self._scores = np.zeros(_INITIAL_CAPACITY, dtype=np.float64)
+        self._category_codes = np.full(_INITIAL_CAPACITY, -1, dtype=np.int32)
+        self._category_members = {}
+        self._reference_time = _to_seconds(datetime.now())
+        self._lock = threading.Lock()
+        self._loaded = False
+
+        if hasattr(db_manager, 'subscribe'):
+            db_manager.subscribe('interaction_added', self._on_interaction_added)
+            db_manager.subscribe('interactions_changed', self._on_interactions_changed)
+
+    def _ensure_capacity(self, size):
+        if size <= len(self._scores):
+            return
+        capacity = max(size, 2 * len(self._scores))
+        scores = np.zeros(capacity, dtype=np.float64)
+        scores[:len(self._scores)] = self._scores
+        category_codes = np.full(capacity, -1, dtype=np.int32)
+        category_codes[:len(self._category_codes)] = self._category_codes
+        self._scores = scores
+        self._category_codes = category_codes
+
+    def _product_index(self, product_id, category=None):
+        index = self._products.encode(product_id)
+        if index is None:
+            index = self._products.add(product_id)
+            self._ensure_capacity(index + 1)
+            self._set_category(index, category)
+        return index
+
+    def _lookup_category(self, product_id):
+        product = self.db_manager.get_product_by_id(product_id) if self.db_manager else None
+        return product.category if product else None
+
+    def _set_category(self, index, category):
+        if not category:
+            return
+        code = self._categories.add(str(category).strip().lower())
+        self._category_codes[index] = code
+        self._category_members.setdefault(code, []).append(index)
+
+    def _rescale(self, event_time):
+        # Renormaliza raramente: traz t_ref para o presente e ajusta os scores.
+        factor = math.exp(-self.decay_rate * (event_time - self._reference_time))
+        self._scores *= factor
+        self._reference_time = event_time
+
+    def record(self, product_id, interaction_type, timestamp=None, category=None):
+        event_time = _to_seconds(timestamp)
+        weight = self.event_weights.get(str(interaction_type).lower(), DEFAULT_TRENDING_WEIGHT)
+        # Produto novo: a categoria vem do banco, fora do lock.
+        if category is None and self._products.encode(product_id) is None:
+            category = self._lookup_category(product_id)
+        with self._lock:
+            if self.decay_rate * (event_time - self._reference_time) > _MAX_EXPONENT:
+                self._rescale(event_time)
+            index = self._product_index(product_id, category)
+            self._scores[index] += weight * math.exp(self.decay_rate * (event_time - self._reference_time))
+
+    def load(self, since=None):
+        # Carga inicial vetorizada a partir da tabela de interações.
+        now = datetime.now()
+        if since is None:
+            since = now - timedelta(seconds=TRENDING_BOOTSTRAP_HALF_LIVES * math.log(2) / self.decay_rate)
+        products_df = self.db_manager.read_table_frame('products', columns=['product_id', 'category'])
+        interactions_df = self.db_manager.read_table_frame(
+            'interactions', columns=['product_id', 'type', 'timestamp'], since=since
+        )
+
+        with self._lock:
+            self._products = IdEncoder()
+            self._categories = IdEncoder()
+            self._category_members = {}
+            self._scores = np.zeros(max(_INITIAL_CAPACITY, len(products_df)), dtype=np.float64)
+            self._category_codes = np.full(len(self._scores), -1, dtype=np.int32)
+            self._reference_time = _to_seconds(now)
+
+            if not products_df.empty:
+                for product_id, category in zip(products_df['product_id'].astype(str), products_df['category'].astype(object)):
+                    index = self._products.add(product_id)
+                    self._set_category(index, category if isinstance(category, str) else None)
+
+            if not interactions_df.empty:
+                product_ids = interactions_df['product_id'].astype(str).to_numpy()
+                indices = np.fromiter((self._product_index(product_id, '') for product_id in product_ids),
+                                      dtype=np.int64, count=len(product_ids))
+                self._ensure_capacity(len(self._products))
+                event_times = interactions_df['timestamp'].to_numpy(dtype='datetime64[ns]').astype(np.int64) / 1e9
+                weights = interactions_df['type'].astype(str).str.lower().map(self.event_weights)
+                weights = weights.fillna(DEFAULT_TRENDING_WEIGHT).to_numpy(dtype=np.float64)
+                np.add.at(self._scores, indices, weights * np.exp(self.decay_rate * (event_times - self._reference_time)))
+
+            self._loaded = True
+        logging.info(f"Tendências carregadas: {len(interactions_df)} interações desde {since:%Y-%m-%d %H:%M}.")
+
+    def top(self, k, categories=None):
+        # Sem categorias: ranking global. Com categorias: só os produtos delas
+        # (cada produto pertence a uma única categoria, então não há repetição).
+        if not self._loaded:
+            self.load()
+        with self._lock:
+            if not categories:
+                candidates = None
+                scores = self._scores[:len(self._products)]
+            else:
+                codes = [self._categories.encode(str(category).strip().lower()) for category in categories]
+                members = [self._category_members[code] for code in codes if code in self._category_members]
+                if not members:
+                    return []
+                candidates = np.concatenate([np.asarray(rows, dtype=np.int64) for rows in members])
+                scores = self._scores[candidates]
+            best = top_k_indices(scores, k)
+            best = best[scores[best] > 0]
+            indices = candidates[best] if candidates is not None else best
+            return self._products.decode_many(indices)
+
+    def categories(self):
+        if not self._loaded:
+            self.load()
+        with self._lock:
+            return list(self._categories.ids)
+
+    def _on_interaction_added(self, interaction_row):
+        if self._loaded:
+            self.record(interaction_row['product_id'], interaction_row['type'], interaction_row.get('timestamp'))
+
+    def _on_interactions_changed(self, _payload=None):
+        self._loaded = False
@@ -0,0 +1,78 @@
+import unittest
+import shutil
+import tempfile
+import numpy as np
+from scipy import sparse
+from src.algorithms.ann_index import IVFIndex, ContentANNIndex, exact_search, recall_at_k
+
+class TestIVFIndex(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        centers = rng.standard_normal((20, 16))
+        labels = rng.integers(0, 20, size=2000)
+        self.vectors = (centers[labels] + 0.1 * rng.standard_normal((2000, 16))).astype(np.float32)
+        self.queries = self.vectors[rng.choice(2000, size=50, replace=False)]
+        self.index = IVFIndex(n_lists=20, n_probe=4).build(self.vectors)
+
+    def test_index_covers_every_vector(self):
+        self.assertEqual(sorted(self.index.row_ids.tolist()), list(range(2000)))
+        self.assertEqual(self.index.list_offsets[-1], 2000)
+
+    def test_probing_all_lists_is_exact(self):
+        self.assertEqual(recall_at_k(self.index, self.vectors, self.queries, k=10, n_probe=20), 1.0)
+
+    def test_recall_at_k_with_few_probes(self):
+        self.assertGreaterEqual(recall_at_k(self.index, self.vectors, self.queries, k=10, n_probe=4), 0.9)
+
+    def test_search_returns_query_itself_first(self):
+        rows, scores = self.index.search(self.vectors[42], k=5)
+        exact_rows, _ = exact_search(self.vectors, self.vectors[42], k=5)
+        self.assertEqual(rows[0], exact_rows[0])
+        self.assertTrue(np.all(np.diff(scores) <= 0))
+
+    def test_save_and_load(self):
+        model_dir = tempfile.mkdtemp()
+        try:
+            self.index.save("test_ivf", "abc123", model_dir=model_dir)
+            loaded = IVFIndex.load("test_ivf", "abc123", model_dir=model_dir)
+            self.assertIsNotNone(loaded)
+            self.assertIsNone(IVFIndex.load("test_ivf", "outro", model_dir=model_dir))
+            rows, _ = loaded.search(self.vectors[7], k=3)
+            expected_rows, _ = self.index.search(self.vectors[7], k=3)
+            self.assertEqual(rows.tolist(), expected_rows.tolist())
+        finally:
+            shutil.rmtree(model_dir)
+
+class TestContentANNIndex(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(2)
+        topics = rng.integers(0, 10, size=300)
+        dense = rng.random((300, 60)) * (rng.random((300, 60)) < 0.05)
+        dense[np.arange(300), topics * 6] += 1.0
+        self.tfidf = sparse.csr_matrix(dense)
+        self.product_ids = [f"p{n}" for n in range(300)]
+        self.index = ContentANNIndex.build(self.tfidf, self.product_ids, n_components=20, n_lists=10)
+
+    def test_query_returns_product_ids_of_neighbors(self):
+        results = self.index.query(self.tfidf[42], k=5, n_probe=10)
+        self.assertEqual(results[0], "p42")
+        self.assertTrue(all(product_id in self.product_ids for product_id in results))
+
+    def test_save_and_load_keep_projection_and_ids(self):
+        model_dir = tempfile.mkdtemp()
+        try:
+            self.index.save("abc123", model_dir=model_dir)
+            loaded = ContentANNIndex.load("abc123", model_dir=model_dir)
+            self.assertIsNone(ContentANNIndex.load("outro", model_dir=model_dir))
+            self.assertEqual(loaded.query(self.tfidf[7], k=5), self.index.query(self.tfidf[7], k=5))
+        finally:
+            shutil.rmtree(model_dir)
+
+    def test_query_with_other_vocabulary_raises(self):
+        with self.assertRaises(ValueError):
+            self.index.query(sparse.csr_matrix((1, 61)), k=5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+from sqlalchemy.exc import SQLAlchemyError
+from src.database.db_manager import DBManager, _feedback_row
+
+class FakeConnection:
+    # Simula INSERT ... ON CONFLICT (id, timestamp) DO NOTHING RETURNING id,
+    # timestamp: ids já gravados não voltam no resultado.
+    def __init__(self, stored_ids, fail_batches=False):
+        self.stored_ids = stored_ids
+        self.fail_batches = fail_batches
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def begin_nested(self):
+        return self
+
+    def execute(self, statement, rows):
+        if self.fail_batches and len(rows) > 1:
+            raise SQLAlchemyError("lote falhou")
+        inserted = [row for row in rows if row["id"] not in self.stored_ids]
+        self.stored_ids.update(row["id"] for row in inserted)
+        return [SimpleNamespace(id=row["id"], timestamp=row["timestamp"]) for row in inserted]
+
+class FakeEngine:
+    def __init__(self, stored_ids, fail_batches=False):
+        self.stored_ids = stored_ids
+        self.fail_batches = fail_batches
+
+    def begin(self):
+        return FakeConnection(self.stored_ids, self.fail_batches)
+
+def fake_db_manager(stored_ids, fail_batches=False):
+    db_manager = DBManager.__new__(DBManager)
+    db_manager.engine = FakeEngine(stored_ids, fail_batches)
+    db_manager.bulk_batch_size = 100
+    db_manager._subscribers = {}
+    db_manager.events = []
+    db_manager.subscribe('interaction_added', lambda row: db_manager.events.append(('row', row["user_id"])))
+    db_manager.subscribe('interactions_changed', lambda stats: db_manager.events.append(('bulk', stats["rows"])))
+    return db_manager
+
+def interaction(n, event_id):
+    return {"id": event_id, "user_id": f"u{n}", "product_id": f"p{n}", "type": "view", "timestamp": datetime(2024, 1, 1, 12, n)}
+
+IDS = ["5b2f8c1e-0c7a-4d8e-9d1a-3f6b2a9c4e1%d" % n for n in range(3)]
+
+class TestBulkEventInsert(unittest.TestCase):
+
+    def test_replayed_rows_are_not_counted_or_notified(self):
+        stored_ids = set()
+        db_manager = fake_db_manager(stored_ids)
+        stats = db_manager.bulk_add_interactions([interaction(0, IDS[0]), interaction(1, IDS[1])], row_events=True)
+        self.assertEqual(stats["rows"], 2)
+
+        db_manager.events = []
+        stats = db_manager.bulk_add_interactions([interaction(n, IDS[n]) for n in range(3)], row_events=True)
+        self.assertEqual(stats["rows"], 1)
+        self.assertNotIn("inserted_rows", stats)
+        self.assertEqual(db_manager.events, [('row', 'u2')])
+
+    def test_row_by_row_fallback_counts_only_inserted(self):
+        stored_ids = set()
+        fake_db_manager(stored_ids).bulk_add_interactions([interaction(0, IDS[0])], row_events=True)
+        db_manager = fake_db_manager(stored_ids, fail_batches=True)
+        stats = db_manager.bulk_add_interactions([interaction(n, IDS[n]) for n in range(3)], row_events=True)
+        self.assertEqual(stats["rows"], 2)
+        self.assertEqual(db_manager.events, [('row', 'u1'), ('row', 'u2')])
+
+    def test_nothing_inserted_sends_no_event(self):
+        stored_ids = set()
+        fake_db_manager(stored_ids).bulk_add_interactions([interaction(0, IDS[0])], row_events=True)
+        db_manager = fake_db_manager(stored_ids)
+        self.assertEqual(db_manager.bulk_add_interactions([interaction(0, IDS[0])], row_events=True)["rows"], 0)
+        self.assertEqual(db_manager.events, [])
+
+class TestEventId(unittest.TestCase):
+
+    def feedback(self, event_id):
+        return _feedback_row({"id": event_id, "user_id": "u1", "product_id": "p1", "rating": 4})["id"]
+
+    def test_uuid_ids_are_kept(self):
+        self.assertEqual(self.feedback(IDS[0]), uuid.UUID(IDS[0]))
+        self.assertEqual(self.feedback(uuid.UUID(IDS[1])), uuid.UUID(IDS[1]))
+
+    def test_source_ids_get_a_stable_uuid(self):
+        self.assertEqual(self.feedback("fb-123"), self.feedback("fb-123"))
+        self.assertNotEqual(self.feedback("fb-123"), self.feedback("fb-124"))
+        self.assertEqual(self.feedback(42), self.feedback("42"))
+
+    def test_missing_id_gets_a_new_uuid(self):
+        self.assertNotEqual(self.feedback(None), self.feedback(None))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from src.algorithms.ann_index import ContentANNIndex
+from src.algorithms.content_based import ContentBasedRecommender
+
+class FakeProduct:
+    def __init__(self, data):
+        self.data = data
+
+    def to_dict(self):
+        return dict(self.data)
+
+class FakeUser:
+    def __init__(self, user_id, interests):
+        self.user_id = user_id
+        self.interests = interests
+
+class FakeDBManager:
+    def __init__(self, products, fingerprint=None):
+        self.products = {product["product_id"]: product for product in products}
+        self.fingerprint = fingerprint
+
+    def get_catalog_fingerprint(self):
+        return self.fingerprint
+
+    def get_all_products(self):
+        return [FakeProduct(product) for product in self.products.values()]
+
+    def get_user_by_id(self, user_id):
+        return next((user for user in USERS if user.user_id == user_id), None)
+
+    def get_products_by_ids(self, product_ids):
+        return [FakeProduct(self.products[product_id]) for product_id in product_ids]
+
+def product(n, category, tipo_tenis=None, words=""):
+    return {
+        "product_id": f"p{n}", "name": f"Produto {n} {words}", "category": category, "brand": f"marca{n % 3}",
+        "description": words, "genre": None, "attributes": {"tipo_tenis": tipo_tenis} if tipo_tenis else {}
+    }
+
+USERS = [
+    FakeUser("u1", ["tênis", "casual"]),
+    FakeUser("u2", ["tênis", "esportivo"]),
+    FakeUser("u3", ["camiseta", "algodão"]),
+    FakeUser("u4", ["tênis"]),
+]
+
+class TestContentModelEdits(unittest.TestCase):
+
+    def setUp(self):
+        products = [product(n, "tênis" if n % 2 else "camiseta", "casual" if n % 4 == 1 else "esportivo", "algodão leve")
+                    for n in range(20)]
+        self.db_manager = FakeDBManager(products)
+        self.recommender = ContentBasedRecommender(self.db_manager, use_artifact=False, drift_threshold=10.0)
+
+    def apply_edits(self):
+        for n in range(20, 40):
+            data = product(n, "tênis", "casual" if n % 3 else "esportivo", "corrida algodão")
+            self.db_manager.products[data["product_id"]] = data
+            self.recommender.upsert_products([data])
+        replaced = product(3, "camiseta", None, "algodão premium")
+        self.db_manager.products["p3"] = replaced
+        self.recommender.upsert_products([replaced])
+        for product_id in ["p5", "p21", "p30"]:
+            del self.db_manager.products[product_id]
+            self.recommender.remove_products([product_id])
+
+    def test_edits_do_not_restack_the_base_matrix(self):
+        base = self.recommender.model.base
+        self.apply_edits()
+        model = self.recommender.model
+        self.assertIs(model.base, base)
+        self.assertEqual(model.n_rows, 41)
+        self.assertLessEqual(len(model.delta_blocks), 5)
+        self.assertNotIn('tfidf_matrix', model._cache)
+
+    def test_edits_match_a_full_rebuild(self):
+        self.apply_edits()
+        rebuilt = ContentBasedRecommender(self.db_manager, use_artifact=False)
+        model = self.recommender.model
+        fresh = rebuilt.model
+
+        for filters in [None, {"category": "tênis"}, {"category": "tênis", "tipo_tenis": "casual"}]:
+            self.assertEqual(sorted(model.product_ids_at(model.candidate_rows(filters))),
+                             sorted(fresh.product_ids_at(fresh.candidate_rows(filters))))
+        self.assertEqual(sorted(model.product_ids_at(np.flatnonzero(model.active))), sorted(self.db_manager.products))
+
+        incremental = self.recommender.recommend_batch(USERS, num_recommendations=50)
+        for user in USERS:
+            self.assertEqual(self.recommender.recommend_ids_for_user(user, 50), incremental[user.user_id])
+            self.assertEqual(set(incremental[user.user_id]), set(rebuilt.recommend_batch([user], 50)[user.user_id]))
+
+    def test_full_views_stay_consistent_with_blocks(self):
+        self.apply_edits()
+        model = self.recommender.model
+        rows = np.flatnonzero(model.active)
+        self.assertEqual(model.product_ids[rows].tolist(), model.product_ids_at(rows))
+        self.assertEqual((model.tfidf_matrix[rows] != model.matrix_rows(rows)).nnz, 0)
+        self.assertEqual(model.products_df['product_id'].tolist(), model.product_ids.tolist())
+
+    def test_sync_fallback_uses_default_products(self):
+        self.apply_edits()
+        expected = self.recommender.default_product_ids(5)
+        self.assertNotIn("p5", expected)
+        products = self.recommender.get_recommendations_for_user_interests("sem-perfil", 5)
+        self.assertEqual([product.to_dict()["product_id"] for product in products], expected)
+        self.assertEqual(self.recommender.recommend_batch([FakeUser("sem-perfil", [])], 5)["sem-perfil"], expected)
+
+class TestContentANNCandidates(unittest.TestCase):
+
+    def setUp(self):
+        self.model_dir = tempfile.mkdtemp()
+        products = [product(n, "tênis" if n % 2 else "camiseta", "casual" if n % 4 == 1 else "esportivo",
+                            ["algodão", "corrida", "couro", "leve", "premium"][n % 5]) for n in range(60)]
+        self.db_manager = FakeDBManager(products, fingerprint="abc")
+        exact = ContentBasedRecommender(self.db_manager, use_artifact=False)
+        ContentANNIndex.build(exact.tfidf_matrix, exact.model.product_ids, n_components=10, n_lists=1) \
+            .save("m2-abc", model_dir=self.model_dir)
+        self.exact = exact
+
+    def tearDown(self):
+        shutil.rmtree(self.model_dir)
+
+    def recommender(self, **kwargs):
+        return ContentBasedRecommender(self.db_manager, model_dir=self.model_dir, use_artifact=False, use_ann=True,
+                                       drift_threshold=10.0, **kwargs)
+
+    def test_ann_candidates_are_scored_exactly(self):
+        recommender = self.recommender(ann_candidates=60)
+        self.assertIsNotNone(recommender.model.ann_index)
+        for user in USERS:
+            self.assertEqual(recommender.recommend_ids_for_user(user, 5), self.exact.recommend_ids_for_user(user, 5))
+
+    def test_candidates_are_limited_and_include_recent_edits(self):
+        recommender = self.recommender(ann_candidates=10)
+        data = product(99, "tênis", "casual", "novo")
+        recommender.upsert_products([data])
+        model = recommender.model
+        user_tfidf = model.tfidf_vectorizer.transform(["tênis casual"])
+        rows = recommender._ann_candidate_rows(model, user_tfidf, {"category": "tênis"}, 5)
+        self.assertLessEqual(len(rows), 11)
+        self.assertIn(recommender._row_by_product["p99"], rows)
+        self.assertTrue(set(rows) <= set(model.candidate_rows({"category": "tênis"})))
+
+    def test_without_index_falls_back_to_exact_search(self):
+        self.db_manager.fingerprint = "outro"
+        recommender = self.recommender()
+        self.assertIsNone(recommender.model.ann_index)
+        self.assertEqual(recommender.recommend_ids_for_user(USERS[0], 5), self.exact.recommend_ids_for_user(USERS[0], 5))
+
+if __name__ == '__main__':
+    unittest.main()
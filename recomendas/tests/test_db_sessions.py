@@ -0,0 +1,189 @@
+import unittest
+from unittest import mock
+import pandas as pd
+from sqlalchemy import bindparam, text
+from types import SimpleNamespace
+from sqlalchemy.dialects import postgresql
+from src.database.db_manager import DBManager, Feedback, _mark_scope_failed
+
+class FakeQuery:
+    def __init__(self, session):
+        self.session = session
+
+    def filter_by(self, **kwargs):
+        return self
+
+    def first(self):
+        if self.session.fail_queries:
+            # Como o evento handle_error da engine faria num erro do banco.
+            _mark_scope_failed(SimpleNamespace(engine=self.session.engine))
+            raise RuntimeError("consulta falhou")
+        return self.session.user
+
+class FakeSavepoint:
+    def __init__(self):
+        self.is_active = True
+        self.state = "aberto"
+
+    def commit(self):
+        self.is_active = False
+        self.state = "liberado"
+
+    def rollback(self):
+        self.is_active = False
+        self.state = "desfeito"
+
+class FakeSession:
+    def __init__(self, user):
+        self.user = user
+        self.fail_queries = False
+        self.closed = 0
+        self.commits = 0
+        self.rollbacks = 0
+        self.flushes = 0
+        self.engine = None
+        self.savepoints = []
+
+    def begin_nested(self):
+        savepoint = FakeSavepoint()
+        self.savepoints.append(savepoint)
+        return savepoint
+
+    def query(self, model):
+        return FakeQuery(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def flush(self):
+        self.flushes += 1
+
+    def close(self):
+        self.closed += 1
+
+class FakeUser:
+    user_id = "u1"
+    name = "Ana"
+
+def fake_db_manager():
+    # DBManager sem engine real: só o caminho get_session/_close_session.
+    db_manager = DBManager.__new__(DBManager)
+    db_manager.engine = object()
+    db_manager._subscribers = {}
+    db_manager.sessions = []
+
+    def session_factory(**kwargs):
+        session = FakeSession(FakeUser())
+        session.engine = db_manager.engine
+        db_manager.sessions.append(session)
+        return session
+
+    db_manager.Session = session_factory
+    return db_manager
+
+class TestDBManagerSessions(unittest.TestCase):
+
+    def test_method_outside_scope_closes_its_session(self):
+        db_manager = fake_db_manager()
+        self.assertEqual(db_manager.get_user_by_id("u1").user_id, "u1")
+        self.assertEqual(db_manager.get_user_by_id("u1").user_id, "u1")
+        self.assertEqual(len(db_manager.sessions), 2)
+        self.assertEqual([session.closed for session in db_manager.sessions], [1, 1])
+
+    def test_methods_inside_scope_share_one_session(self):
+        db_manager = fake_db_manager()
+        with db_manager.session_scope() as session:
+            self.assertEqual(db_manager.get_user_by_id("u1").user_id, "u1")
+            self.assertEqual(db_manager.get_user_by_id("u1").user_id, "u1")
+            self.assertEqual(session.closed, 0)
+        self.assertEqual(len(db_manager.sessions), 1)
+        self.assertEqual(session.commits, 1)
+        self.assertEqual(session.closed, 1)
+
+    def test_nested_scope_reuses_outer_session(self):
+        db_manager = fake_db_manager()
+        with db_manager.session_scope() as outer:
+            with db_manager.session_scope() as inner:
+                self.assertIs(inner, outer)
+                db_manager.get_user_by_id("u1")
+            self.assertEqual(outer.closed, 0)
+        self.assertEqual(outer.closed, 1)
+
+    def test_write_inside_scope_leaves_commit_to_the_scope(self):
+        db_manager = fake_db_manager()
+        with db_manager.session_scope() as session:
+            db_manager.update_user("u1", {"name": "Bia"})
+            self.assertEqual((session.flushes, session.commits), (1, 0))
+        self.assertEqual(session.commits, 1)
+
+    def test_failed_write_inside_scope_does_not_roll_back_earlier_writes(self):
+        db_manager = fake_db_manager()
+        with db_manager.session_scope() as session:
+            db_manager.update_user("u1", {"name": "Bia"})
+            session.fail_queries = True
+            self.assertIsNone(db_manager.update_user("u1", {"name": "Caio"}))
+            self.assertEqual(session.rollbacks, 0)
+
+    def test_each_method_in_scope_gets_a_savepoint(self):
+        db_manager = fake_db_manager()
+        with db_manager.session_scope() as session:
+            db_manager.get_user_by_id("u1")
+            db_manager.update_user("u1", {"name": "Bia"})
+        self.assertEqual([savepoint.state for savepoint in session.savepoints], ["liberado", "liberado"])
+
+    def test_failed_read_inside_scope_only_undoes_its_savepoint(self):
+        db_manager = fake_db_manager()
+        with db_manager.session_scope() as session:
+            db_manager.update_user("u1", {"name": "Bia"})
+            session.fail_queries = True
+            self.assertIsNone(db_manager.get_user_by_id("u1"))
+            session.fail_queries = False
+            self.assertEqual(db_manager.get_user_by_id("u1").user_id, "u1")
+        self.assertEqual([savepoint.state for savepoint in session.savepoints], ["liberado", "desfeito", "liberado"])
+        self.assertEqual((session.commits, session.rollbacks), (1, 0))
+
+    def test_failed_write_outside_scope_rolls_back(self):
+        db_manager = fake_db_manager()
+        session = FakeSession(FakeUser())
+        session.fail_queries = True
+        db_manager.Session = lambda **kwargs: session
+        self.assertIsNone(db_manager.update_user("u1", {"name": "Caio"}))
+        self.assertEqual((session.rollbacks, session.closed), (1, 1))
+
+class FakeConnection:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+class FakeEngine:
+    def connect(self):
+        return FakeConnection()
+
+class TestReadTableFrameWhere(unittest.TestCase):
+
+    def read_statement(self, where):
+        db_manager = fake_db_manager()
+        db_manager.engine = FakeEngine()
+        with mock.patch("src.database.db_manager.pd.read_sql", return_value=pd.DataFrame()) as read_sql:
+            db_manager.read_table_frame('feedback', columns=['user_id'], where=where)
+        return read_sql.call_args[0][0].compile(dialect=postgresql.dialect())
+
+    def test_raw_string_is_rejected(self):
+        db_manager = fake_db_manager()
+        with self.assertRaises(TypeError):
+            db_manager.read_table_frame('feedback', where="user_id = 'u1' OR 1=1")
+
+    def test_expressions_and_bound_text_are_accepted(self):
+        statement = self.read_statement(Feedback.__table__.c.rating >= 4)
+        self.assertIn("feedback.rating >= %(rating_1)s", str(statement))
+        statement = self.read_statement(text("user_id = :user_id").bindparams(bindparam("user_id", "u1' OR 1=1")))
+        self.assertIn("user_id = %(user_id)s", str(statement))
+        self.assertEqual(statement.params, {"user_id": "u1' OR 1=1"})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import os
+import shutil
+import tempfile
+import unittest
+import uuid
+from datetime import datetime
+from src.database.event_writer import BufferedEventWriter
+
+class FakeDBManager:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.feedback = []
+        self.interactions = []
+
+    def _bulk_add(self, target, rows):
+        if self.fail:
+            raise ConnectionError("banco fora do ar")
+        target.extend(rows)
+        return {"rows": len(rows), "skipped": 0, "errors": []}
+
+    def bulk_add_feedback(self, rows, row_events=False):
+        return self._bulk_add(self.feedback, rows)
+
+    def bulk_add_interactions(self, rows, row_events=False):
+        return self._bulk_add(self.interactions, rows)
+
+def interaction(n):
+    return {"user_id": f"u{n}", "product_id": f"p{n}", "type": "view", "timestamp": datetime(2024, 1, 1, 12, n)}
+
+class TestBufferedEventWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.wal_path = os.path.join(self.tmp_dir, "events.jsonl")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_close_flushes_buffered_events(self):
+        db_manager = FakeDBManager()
+        writer = BufferedEventWriter(db_manager, batch_size=100, flush_interval=60)
+        self.assertTrue(writer.add_interaction(interaction(1)))
+        self.assertTrue(writer.add_feedback({"user_id": "u1", "product_id": "p1", "rating": "4"}))
+        writer.close()
+        self.assertEqual([row["user_id"] for row in db_manager.interactions], ["u1"])
+        self.assertEqual(db_manager.feedback[0]["rating"], 4)
+        self.assertEqual(writer.stats()["written"], 2)
+
+    def test_invalid_event_is_rejected_before_queueing(self):
+        writer = BufferedEventWriter(FakeDBManager(), flush_interval=60)
+        self.assertFalse(writer.add_feedback({"user_id": "u1"}))
+        writer.close()
+        self.assertEqual(writer.stats()["accepted"], 0)
+
+    def test_failed_flush_keeps_events_for_retry(self):
+        db_manager = FakeDBManager(fail=True)
+        writer = BufferedEventWriter(db_manager, batch_size=100, flush_interval=60)
+        writer.add_interaction(interaction(1))
+        self.assertFalse(writer.flush())
+        self.assertEqual(writer.stats()["pending"], 1)
+        db_manager.fail = False
+        self.assertTrue(writer.flush())
+        writer.close()
+        self.assertEqual(len(db_manager.interactions), 1)
+
+    def test_backpressure_rejects_when_full(self):
+        writer = BufferedEventWriter(FakeDBManager(fail=True), batch_size=100, flush_interval=60, max_pending=2, put_timeout=0.05)
+        self.assertTrue(writer.add_interaction(interaction(1)))
+        self.assertTrue(writer.add_interaction(interaction(2)))
+        self.assertFalse(writer.add_interaction(interaction(3)))
+        self.assertEqual(writer.stats()["rejected"], 1)
+        writer.close()
+
+    def test_events_keep_their_id_across_retries(self):
+        db_manager = FakeDBManager(fail=True)
+        writer = BufferedEventWriter(db_manager, batch_size=100, flush_interval=60)
+        writer.add_interaction(interaction(1))
+        writer.add_interaction(dict(interaction(2), id="5b2f8c1e-0c7a-4d8e-9d1a-3f6b2a9c4e10"))
+        self.assertFalse(writer.flush())
+        pending_ids = [row["id"] for row in writer._pending["interaction"]]
+        db_manager.fail = False
+        writer.close()
+        self.assertEqual([row["id"] for row in db_manager.interactions], pending_ids)
+        self.assertIsInstance(pending_ids[0], uuid.UUID)
+        self.assertEqual(pending_ids[1], uuid.UUID("5b2f8c1e-0c7a-4d8e-9d1a-3f6b2a9c4e10"))
+
+    def test_wal_replay_reuses_the_original_ids(self):
+        failing = FakeDBManager(fail=True)
+        writer = BufferedEventWriter(failing, batch_size=100, flush_interval=60, wal_path=self.wal_path)
+        writer.add_feedback({"user_id": "u1", "product_id": "p1", "rating": 5})
+        writer.close()
+        original_id = writer._pending["feedback"][0]["id"]
+
+        db_manager = FakeDBManager()
+        BufferedEventWriter(db_manager, batch_size=100, flush_interval=60, wal_path=self.wal_path).close()
+        self.assertEqual(db_manager.feedback[0]["id"], original_id)
+
+    def test_wal_entry_with_invalid_id_is_dropped(self):
+        with open(self.wal_path, 'w', encoding='utf-8') as f:
+            f.write('{"kind": "interaction", "row": {"id": "nao-e-uuid", "user_id": "u1", "product_id": "p1", "type": "view", '
+                    '"timestamp": "2024-01-01T12:01:00"}}\n')
+            f.write('{"kind": "interaction", "row": {"id": "5b2f8c1e-0c7a-4d8e-9d1a-3f6b2a9c4e10", "user_id": "u2", '
+                    '"product_id": "p2", "type": "view", "timestamp": "2024-01-01T12:02:00"}}\n')
+        db_manager = FakeDBManager()
+        BufferedEventWriter(db_manager, batch_size=100, flush_interval=60, wal_path=self.wal_path).close()
+        self.assertEqual([row["user_id"] for row in db_manager.interactions], ["u2"])
+
+    def test_wal_replays_events_after_failure(self):
+        writer = BufferedEventWriter(FakeDBManager(fail=True), batch_size=100, flush_interval=60, wal_path=self.wal_path)
+        writer.add_interaction(interaction(1))
+        writer.add_interaction(interaction(2))
+        writer.close()
+
+        db_manager = FakeDBManager()
+        writer = BufferedEventWriter(db_manager, batch_size=100, flush_interval=60, wal_path=self.wal_path)
+        writer.close()
+        self.assertEqual([row["user_id"] for row in db_manager.interactions], ["u1", "u2"])
+        self.assertEqual(db_manager.interactions[0]["timestamp"], datetime(2024, 1, 1, 12, 1))
+        self.assertEqual(os.listdir(self.tmp_dir), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+from src.structures.inverted_index import InvertedIndex
+
+class TestInvertedIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = InvertedIndex()
+        self.index.add(0, {"category": "Tênis", "tipo_tenis": "casual", "brand": "Nike"})
+        self.index.add(1, {"category": "tênis", "tipo_tenis": "esportivo", "brand": "Adidas"})
+        self.index.add(2, {"category": "livros", "genre": ["ficção", "drama", "ficção"]})
+        self.index.add(3, {"category": "tênis", "tipo_tenis": "casual", "attributes.cor": None})
+
+    def test_lookup_is_case_insensitive(self):
+        self.assertEqual(self.index.lookup("category", "TÊNIS").tolist(), [0, 1, 3])
+        self.assertEqual(self.index.lookup("category", "eletrônicos").tolist(), [])
+
+    def test_list_values(self):
+        self.assertEqual(self.index.lookup("genre", "ficção").tolist(), [2])
+        self.assertEqual(self.index.lookup("genre", "drama").tolist(), [2])
+
+    def test_intersect(self):
+        rows = self.index.intersect({"category": "tênis", "tipo_tenis": "casual"})
+        self.assertEqual(rows.tolist(), [0, 3])
+        rows = self.index.intersect({"category": "livros", "tipo_tenis": "casual"})
+        self.assertEqual(rows.tolist(), [])
+        self.assertIsNone(self.index.intersect({}))
+
+    def test_add_after_lookup_keeps_rows_sorted(self):
+        self.index.lookup("category", "tênis")
+        self.index.add(4, {"category": "tênis"})
+        self.assertEqual(self.index.lookup("category", "tênis").tolist(), [0, 1, 3, 4])
+
+    def test_values(self):
+        self.assertEqual(self.index.values("brand"), ["adidas", "nike"])
+        self.assertEqual(self.index.values("attributes.cor"), [])
+
+if __name__ == '__main__':
+    unittest.main()
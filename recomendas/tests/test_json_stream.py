@@ -0,0 +1,80 @@
+import unittest
+import json
+import os
+import tempfile
+from src.data.json_stream import iter_json_records
+
+class TestJsonStream(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.records = [
+            {"product_id": "p1", "name": "Laptop A", "price": 1999.9, "attributes": {"cor": "preto"}},
+            {"product_id": "p2", "name": "Livro \"B\" [volume 1]", "genre": ["ficção", "drama"]},
+            {"product_id": "p3", "name": "Tênis C", "price": 12345},
+        ]
+
+    def tearDown(self):
+        for file_name in os.listdir(self.temp_dir):
+            os.remove(os.path.join(self.temp_dir, file_name))
+        os.rmdir(self.temp_dir)
+
+    def write_file(self, file_name, content):
+        path = os.path.join(self.temp_dir, file_name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def test_json_array_small_chunks(self):
+        path = self.write_file("products.json", json.dumps(self.records, ensure_ascii=False, indent=2))
+        for chunk_size in (1, 3, 7, 64, 1 << 16):
+            self.assertEqual(list(iter_json_records(path, chunk_size=chunk_size)), self.records)
+
+    def test_json_array_is_lazy(self):
+        path = self.write_file("products.json", json.dumps(self.records))
+        records = iter_json_records(path, chunk_size=8)
+        self.assertEqual(next(records), self.records[0])
+
+    def test_scalar_values_split_across_chunks(self):
+        path = self.write_file("numbers.json", "[12345, 678, true, null]")
+        self.assertEqual(list(iter_json_records(path, chunk_size=2)), [12345, 678, True, None])
+
+    def test_empty_array(self):
+        path = self.write_file("empty.json", "  [ ]  ")
+        self.assertEqual(list(iter_json_records(path)), [])
+
+    def test_json_lines(self):
+        content = "\n".join(json.dumps(r) for r in self.records) + "\n\n"
+        path = self.write_file("products.jsonl", content)
+        self.assertEqual(list(iter_json_records(path)), self.records)
+
+    def test_json_lines_skips_invalid_lines(self):
+        content = json.dumps(self.records[0]) + "\n{invalid\n" + json.dumps(self.records[1]) + "\n"
+        path = self.write_file("feedback.jsonl", content)
+        self.assertEqual(list(iter_json_records(path)), self.records[:2])
+
+    def test_truncated_array_raises(self):
+        path = self.write_file("broken.json", json.dumps(self.records)[:-10])
+        with self.assertRaises(ValueError):
+            list(iter_json_records(path, chunk_size=16))
+
+    def test_malformed_record_stops_at_max_record_size(self):
+        tail = json.dumps([self.records[0]] * 20000)[1:]
+        path = self.write_file("malformed.json", '[{"product_id": "p1", "name": ' + ', ' + tail)
+        with self.assertRaisesRegex(ValueError, "maior que 1000"):
+            list(iter_json_records(path, chunk_size=64, max_record_size=1000))
+
+    def test_record_larger_than_chunk_within_limit(self):
+        record = {"product_id": "p1", "description": "x" * 5000}
+        path = self.write_file("large.json", json.dumps([record, self.records[0]]))
+        self.assertEqual(list(iter_json_records(path, chunk_size=16, max_record_size=10000)), [record, self.records[0]])
+        with self.assertRaises(ValueError):
+            list(iter_json_records(path, chunk_size=16, max_record_size=1000))
+
+    def test_not_an_array_raises(self):
+        path = self.write_file("object.json", json.dumps({"product_id": "p1"}))
+        with self.assertRaises(ValueError):
+            list(iter_json_records(path))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+from src.structures.lru_cache import LRUCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_get_and_put(self):
+        cache = LRUCache(max_size=2)
+        self.assertIsNone(cache.get("p1"))
+        cache.put("p1", "Laptop A")
+        self.assertEqual(cache.get("p1"), "Laptop A")
+        self.assertIn("p1", cache)
+        self.assertEqual(len(cache), 1)
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(max_size=2)
+        cache.put("p1", 1)
+        cache.put("p2", 2)
+        cache.get("p1")
+        cache.put("p3", 3)
+        self.assertNotIn("p2", cache)
+        self.assertIn("p1", cache)
+        self.assertIn("p3", cache)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_ttl_expiration(self):
+        clock = FakeClock()
+        cache = LRUCache(max_size=10, ttl=5, clock=clock)
+        cache.put("u1", ["p1"])
+        clock.now = 4.9
+        self.assertEqual(cache.get("u1"), ["p1"])
+        clock.now = 5.0
+        self.assertIsNone(cache.get("u1"))
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+    def test_stats(self):
+        cache = LRUCache(max_size=10)
+        cache.put("p1", 1)
+        cache.get("p1")
+        cache.get("p2")
+        stats = cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["size"], 1)
+
+    def test_pop_and_discard_where(self):
+        cache = LRUCache(max_size=10)
+        cache.put(("u1", "content_based"), 1)
+        cache.put(("u1", "item_item"), 2)
+        cache.put(("u2", "content_based"), 3)
+        self.assertEqual(cache.pop(("u2", "content_based")), 3)
+        self.assertIsNone(cache.pop(("u2", "content_based")))
+        self.assertEqual(cache.discard_where(lambda key: key[0] == "u1"), 2)
+        self.assertEqual(len(cache), 0)
+
+    def test_discard_group_follows_evictions_and_removals(self):
+        clock = FakeClock()
+        cache = LRUCache(max_size=3, ttl=5, clock=clock, group_by=lambda key: key[0])
+        cache.put(("u1", "content_based"), 1)
+        cache.put(("u1", "item_item"), 2)
+        cache.put(("u2", "content_based"), 3)
+        cache.put(("u3", "content_based"), 4)
+        self.assertNotIn(("u1", "content_based"), cache)
+        cache.pop(("u2", "content_based"))
+        self.assertEqual(cache.discard_group("u2"), 0)
+        self.assertEqual(cache.discard_group("u1"), 1)
+        self.assertEqual(cache.discard_group("u1"), 0)
+        clock.now = 5.0
+        self.assertIsNone(cache.get(("u3", "content_based")))
+        self.assertEqual(cache.discard_group("u3"), 0)
+        self.assertEqual((len(cache), cache._groups), (0, {}))
+
+    def test_discard_group_requires_group_by(self):
+        with self.assertRaises(ValueError):
+            LRUCache(max_size=2).discard_group("u1")
+
+    def test_invalid_size(self):
+        with self.assertRaises(ValueError):
+            LRUCache(max_size=0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import shutil
+import tempfile
+import unittest
+from src.algorithms.content_based import ContentBasedRecommender
+from src.algorithms.model_builder import install_models
+
+class FakeProduct:
+    def __init__(self, data):
+        self.data = data
+
+    def to_dict(self):
+        return dict(self.data)
+
+class FakeDBManager:
+    def __init__(self, n_products, fingerprint=None):
+        self.products = [
+            {"product_id": f"p{n}", "name": f"Tênis {n}", "category": "tênis", "brand": "marca", "description": "leve",
+             "genre": None, "attributes": {"tipo_tenis": "casual"}}
+            for n in range(n_products)
+        ]
+        self.fingerprint = fingerprint
+
+    def get_catalog_fingerprint(self):
+        return self.fingerprint
+
+    def get_all_products(self):
+        return [FakeProduct(product) for product in self.products]
+
+class FakeRecommendationManager:
+    def __init__(self, content_based_recommender):
+        self.content_based_recommender = content_based_recommender
+        self.algorithms = {"content_based": None, "collaborative": None}
+        self.marked = []
+
+    def mark_models_changed(self, algorithm_types):
+        self.marked.append(list(algorithm_types))
+
+class TestInstallModels(unittest.TestCase):
+
+    def setUp(self):
+        self.model_dir = tempfile.mkdtemp()
+        # Grava o artefato num diretório fora do padrão, como o construtor de modelos faria.
+        ContentBasedRecommender(FakeDBManager(5, fingerprint="abc"), model_dir=self.model_dir)
+        self.recommender = ContentBasedRecommender(FakeDBManager(0), use_artifact=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.model_dir)
+
+    def test_content_artifact_is_read_from_model_dir(self):
+        manager = FakeRecommendationManager(self.recommender)
+        install_models(manager, {"content_based": {"fingerprint": "m2-abc"}}, model_dir=self.model_dir)
+        self.assertEqual(self.recommender.model.n_rows, 5)
+        self.assertEqual(manager.marked, [["content_based"]])
+
+    def test_failed_install_is_not_marked_as_changed(self):
+        manager = FakeRecommendationManager(self.recommender)
+        install_models(manager, {"content_based": {"fingerprint": "m2-outro"}}, model_dir=self.model_dir)
+        self.assertEqual(self.recommender.model.n_rows, 0)
+        self.assertEqual(manager.marked, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from src.algorithms import model_store
+
+class TestModelStore(unittest.TestCase):
+
+    def setUp(self):
+        self.model_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.model_dir)
+
+    def save(self, fingerprint, value):
+        return model_store.save_artifact("modelo", fingerprint, arrays={"x": np.full(3, value)}, model_dir=self.model_dir)
+
+    def load(self, fingerprint):
+        artifact = model_store.load_artifact("modelo", fingerprint, model_dir=self.model_dir, mmap=False)
+        return None if artifact is None else artifact[0]["x"].tolist()
+
+    def entries(self):
+        return sorted(os.listdir(os.path.join(self.model_dir, "modelo")))
+
+    def test_republish_swaps_pointer_and_removes_old_version(self):
+        first_path = self.save("abc", 1)
+        second_path = self.save("abc", 2)
+        self.assertNotEqual(first_path, second_path)
+        self.assertEqual(model_store.artifact_path("modelo", "abc", self.model_dir), second_path)
+        self.assertFalse(os.path.exists(first_path))
+        self.assertEqual(self.load("abc"), [2, 2, 2])
+        self.assertEqual(self.entries(), sorted([os.path.basename(second_path), "v1-abc.current"]))
+
+    def test_missing_artifact(self):
+        self.assertIsNone(self.load("abc"))
+        self.save("abc", 1)
+        self.assertIsNone(self.load("outro"))
+
+    def test_keeps_most_recent_fingerprints(self):
+        self.save("a", 1)
+        os.utime(model_store._pointer_path("modelo", "a", self.model_dir), (1, 1))
+        self.save("b", 2)
+        self.save("c", 3)
+        self.assertIsNone(self.load("a"))
+        self.assertEqual((self.load("b"), self.load("c")), ([2, 2, 2], [3, 3, 3]))
+        self.assertEqual(len(self.entries()), 4)
+
+    def test_orphan_versions_removed_after_grace_period(self):
+        self.save("abc", 1)
+        orphan = os.path.join(self.model_dir, "modelo", "v1-abc-1")
+        recent_orphan = os.path.join(self.model_dir, "modelo", "v1-abc-2")
+        os.makedirs(orphan)
+        os.makedirs(recent_orphan)
+        os.utime(orphan, (1, 1))
+        self.save("abc", 2)
+        self.assertFalse(os.path.exists(orphan))
+        self.assertTrue(os.path.exists(recent_orphan))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,31 @@
+import unittest
+from src.database import pool
+
+class TestEnginePool(unittest.TestCase):
+
+    def tearDown(self):
+        pool.dispose_engines()
+
+    def test_same_url_and_options_share_engine(self):
+        engine, created = pool.get_engine("sqlite://", pool_size=2, max_overflow=0)
+        same_engine, created_again = pool.get_engine("sqlite://", pool_size=2, max_overflow=0)
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertIs(same_engine, engine)
+
+    def test_fork_reset_gives_child_a_fresh_pool(self):
+        engine, _ = pool.get_engine("sqlite://", pool_size=2, max_overflow=0)
+        connection = engine.connect()
+        inherited_pool = engine.pool
+        self.assertEqual(pool.pool_stats(engine)["checked_out"], 1)
+
+        pool._reset_engines_after_fork()
+
+        self.assertIsNot(engine.pool, inherited_pool)
+        self.assertEqual(pool.pool_stats(engine)["checked_out"], 0)
+        self.assertEqual(pool.pool_stats(engine)["checkouts"], 0)
+        self.assertIs(pool.get_engine("sqlite://", pool_size=2, max_overflow=0)[0], engine)
+        connection.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+from src.utils import popularity
+from src.utils.popularity import PopularityTracker
+
+class FakeDBManager:
+    def __init__(self, aggregates):
+        self.aggregates = aggregates
+        self.aggregate_calls = 0
+        self.since = []
+        self.subscribers = {}
+
+    def subscribe(self, event_name, callback):
+        self.subscribers.setdefault(event_name, []).append(callback)
+
+    def notify(self, event_name, payload=None):
+        for callback in self.subscribers.get(event_name, []):
+            callback(payload)
+
+    def get_feedback_aggregates(self, since=None):
+        self.aggregate_calls += 1
+        self.since.append(since)
+        return list(self.aggregates)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestPopularityTracker(unittest.TestCase):
+
+    def setUp(self):
+        self.db_manager = FakeDBManager([("p1", 9, 2), ("p2", 10, 2), ("p3", 5, 1), ("p4", 4, 2)])
+        self.clock = FakeClock()
+        self.tracker = PopularityTracker(self.db_manager, reconcile_interval=60, clock=self.clock)
+
+    def test_top_uses_mean_and_min_ratings(self):
+        self.assertEqual(self.tracker.top(5), ["p2", "p1", "p4"])
+        self.assertEqual(self.tracker.top(1), ["p2"])
+
+    def test_feedback_events_update_ranking_without_reconcile(self):
+        self.tracker.top(5)
+        self.db_manager.notify('feedback_added', {"product_id": "p3", "rating": 5})
+        self.db_manager.notify('feedback_added', {"product_id": "p2", "rating": 1})
+        self.assertEqual(self.tracker.top(5), ["p3", "p1", "p2", "p4"])
+        self.assertEqual(self.db_manager.aggregate_calls, 1)
+
+    def test_periodic_reconcile(self):
+        self.tracker.top(5)
+        self.db_manager.aggregates = [("p4", 10, 2)]
+        self.clock.now = 59
+        self.assertEqual(self.tracker.top(5), ["p2", "p1", "p4"])
+        self.clock.now = 60
+        self.assertEqual(self.tracker.top(5), ["p4"])
+
+    def test_reconcile_drops_feedback_outside_the_window(self):
+        with patch.object(popularity, 'POPULARITY_WINDOW_DAYS', 90):
+            self.tracker.top(5)
+            self.db_manager.notify('feedback_added', {"product_id": "p3", "rating": 5})
+            self.assertIn("p3", self.tracker.top(5))
+            self.db_manager.aggregates = [("p1", 9, 2), ("p2", 10, 2), ("p4", 4, 2)]
+            self.clock.now = 60
+            self.assertEqual(self.tracker.top(5), ["p2", "p1", "p4"])
+        since = self.db_manager.since[-1]
+        self.assertAlmostEqual((datetime.now() - since).total_seconds(), 90 * 86400, delta=60)
+
+    def test_bulk_change_forces_reconcile(self):
+        self.tracker.top(5)
+        self.db_manager.aggregates = []
+        self.db_manager.notify('feedback_changed', {"rows": 10})
+        self.assertFalse(self.tracker.has_feedback())
+        self.assertEqual(self.tracker.top(5), [])
+
+if __name__ == '__main__':
+    unittest.main()
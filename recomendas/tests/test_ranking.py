@@ -0,0 +1,68 @@
+import unittest
+import numpy as np
+from src.utils.ranking import top_k_indices, top_k_rows, scoring_rows_per_block
+
+class TestTopKIndices(unittest.TestCase):
+
+    def setUp(self):
+        self.scores = np.array([0.1, 0.9, 0.3, 0.7, 0.5])
+
+    def test_returns_top_k_in_descending_order(self):
+        self.assertEqual(top_k_indices(self.scores, 3).tolist(), [1, 3, 4])
+
+    def test_matches_full_sort(self):
+        rng = np.random.default_rng(42)
+        scores = rng.random(1000)
+        expected = np.argsort(-scores)[:10]
+        self.assertEqual(top_k_indices(scores, 10).tolist(), expected.tolist())
+
+    def test_k_larger_than_scores(self):
+        self.assertEqual(top_k_indices(self.scores, 10).tolist(), [1, 3, 4, 2, 0])
+
+    def test_zero_k_and_empty_scores(self):
+        self.assertEqual(top_k_indices(self.scores, 0).tolist(), [])
+        self.assertEqual(top_k_indices([], 5).tolist(), [])
+
+    def test_exclude_indices(self):
+        self.assertEqual(top_k_indices(self.scores, 2, exclude=[1]).tolist(), [3, 4])
+
+    def test_empty_exclude(self):
+        self.assertEqual(top_k_indices(self.scores, 2, exclude=[]).tolist(), top_k_indices(self.scores, 2).tolist())
+        self.assertEqual(top_k_indices(self.scores, 2, exclude=np.array([], dtype=np.int64)).tolist(), [1, 3])
+
+    def test_exclude_mask(self):
+        mask = np.array([False, True, False, True, False])
+        self.assertEqual(top_k_indices(self.scores, 5, exclude=mask).tolist(), [4, 2, 0])
+
+class TestTopKRows(unittest.TestCase):
+
+    def test_each_row_sorted(self):
+        scores = np.array([[0.1, 0.9, 0.3, 0.7], [0.8, 0.2, 0.6, 0.4]])
+        self.assertEqual(top_k_rows(scores, 2).tolist(), [[1, 3], [0, 2]])
+
+    def test_matches_full_sort(self):
+        rng = np.random.default_rng(0)
+        scores = rng.random((50, 200))
+        expected = np.argsort(-scores, axis=1)[:, :7]
+        self.assertEqual(top_k_rows(scores, 7).tolist(), expected.tolist())
+
+    def test_k_larger_than_columns(self):
+        scores = np.array([[0.1, 0.9], [0.5, 0.2]])
+        self.assertEqual(top_k_rows(scores, 5).tolist(), [[1, 0], [0, 1]])
+        self.assertEqual(top_k_rows(scores, 0).shape, (2, 0))
+
+class TestScoringRowsPerBlock(unittest.TestCase):
+
+    def test_small_catalog_uses_chunk_size(self):
+        self.assertEqual(scoring_rows_per_block(1000, chunk_size=2048, block_bytes=256 * 1024 * 1024), 2048)
+
+    def test_large_catalog_is_bounded_by_memory_budget(self):
+        rows = scoring_rows_per_block(1_000_000, chunk_size=2048, block_bytes=256 * 1024 * 1024)
+        self.assertLess(rows, 2048)
+        self.assertLessEqual(rows * 1_000_000 * 25, 256 * 1024 * 1024)
+
+    def test_at_least_one_row(self):
+        self.assertEqual(scoring_rows_per_block(10_000_000, chunk_size=2048, block_bytes=1024), 1)
+
+if __name__ == '__main__':
+    unittest.main()
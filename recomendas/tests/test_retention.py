@@ -0,0 +1,37 @@
+import unittest
+from datetime import datetime
+from src.database.db_manager import add_months, month_start
+from src.database.retention import run_retention
+
+class FakeDBManager:
+    def __init__(self):
+        self.calls = []
+
+    def ensure_partitions(self, months_ahead, tables):
+        self.calls.append(("ensure_partitions", months_ahead, tuple(tables)))
+        return ["feedback_2024_06"]
+
+    def drop_partitions_before(self, cutoff, rollup, tables):
+        self.calls.append(("drop_partitions_before", cutoff, rollup, tuple(tables)))
+        return []
+
+class TestRetention(unittest.TestCase):
+
+    def test_month_arithmetic_crosses_years(self):
+        self.assertEqual(month_start(datetime(2024, 3, 17, 10, 30)), datetime(2024, 3, 1))
+        self.assertEqual(add_months(datetime(2024, 11, 1), 3), datetime(2025, 2, 1))
+        self.assertEqual(add_months(datetime(2024, 1, 1), -1), datetime(2023, 12, 1))
+        self.assertEqual(add_months(datetime(2024, 1, 1), -13), datetime(2022, 12, 1))
+
+    def test_cutoff_keeps_full_months_before_current(self):
+        db_manager = FakeDBManager()
+        result = run_retention(db_manager, keep_months=6, rollup=False, months_ahead=2, tables=['feedback'],
+                               now=datetime(2024, 3, 17))
+        self.assertEqual(result["cutoff"], datetime(2023, 9, 1))
+        self.assertEqual(db_manager.calls, [
+            ("ensure_partitions", 2, ("feedback",)),
+            ("drop_partitions_before", datetime(2023, 9, 1), False, ("feedback",))
+        ])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+from src.structures.snapshot import SnapshotHolder
+
+class Model:
+    def __init__(self, name):
+        self.name = name
+
+class TestSnapshotHolder(unittest.TestCase):
+
+    def setUp(self):
+        self.released = []
+        self.holder = SnapshotHolder(Model("v1"), on_release=lambda model: self.released.append(model.name))
+
+    def test_swap_without_readers_releases_immediately(self):
+        previous = self.holder.swap(Model("v2"))
+        self.assertEqual(previous.name, "v1")
+        self.assertEqual(self.holder.current.name, "v2")
+        self.assertEqual(self.released, ["v1"])
+
+    def test_reader_keeps_old_snapshot_until_done(self):
+        with self.holder.acquire() as model:
+            self.holder.swap(Model("v2"))
+            self.assertEqual(model.name, "v1")
+            self.assertEqual(self.released, [])
+            with self.holder.acquire() as newer:
+                self.assertEqual(newer.name, "v2")
+        self.assertEqual(self.released, ["v1"])
+        self.assertEqual(self.holder.stats(), {"swaps": 1, "releases": 1, "readers": 0, "retired": 0})
+
+    def test_nested_readers_on_same_snapshot(self):
+        with self.holder.acquire():
+            with self.holder.acquire():
+                self.holder.swap(Model("v2"))
+            self.assertEqual(self.released, [])
+        self.assertEqual(self.released, ["v1"])
+
+    def test_reader_exception_still_releases(self):
+        with self.assertRaises(RuntimeError):
+            with self.holder.acquire():
+                self.holder.swap(Model("v2"))
+                raise RuntimeError("falha")
+        self.assertEqual(self.released, ["v1"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import os
+import time
+import unittest
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from src.utils.trending import TrendingTracker
+
+class FakeDBManager:
+    def __init__(self, products, interactions):
+        self.products = products
+        self.interactions = interactions
+        self.subscribers = {}
+        self.tracker_lock = None
+        self.lookups_under_lock = []
+
+    def subscribe(self, event_name, callback):
+        self.subscribers.setdefault(event_name, []).append(callback)
+
+    def notify(self, event_name, payload=None):
+        for callback in self.subscribers.get(event_name, []):
+            callback(payload)
+
+    def read_table_frame(self, table_name, columns=None, since=None):
+        if table_name == 'products':
+            return pd.DataFrame(self.products, columns=columns)
+        rows = [row for row in self.interactions if since is None or row[2] >= since]
+        return pd.DataFrame(rows, columns=columns)
+
+    def get_product_by_id(self, product_id):
+        self.lookups_under_lock.append(self.tracker_lock.locked() if self.tracker_lock else None)
+        return None
+
+class TestTrendingTracker(unittest.TestCase):
+
+    def setUp(self):
+        now = datetime.now()
+        products = [("p1", "Tênis"), ("p2", "Tênis"), ("p3", "Camisetas")]
+        interactions = [
+            ("p1", "view", now - timedelta(hours=1)),
+            ("p1", "view", now - timedelta(hours=1)),
+            ("p2", "purchase", now - timedelta(hours=48)),
+            ("p3", "click", now - timedelta(hours=2)),
+        ]
+        self.db_manager = FakeDBManager(products, interactions)
+        self.tracker = TrendingTracker(self.db_manager, half_life_hours=24)
+
+    def test_recent_events_outweigh_old_ones(self):
+        # p2: 8 * 0,25 = 2; p1: ~2 * 0,97; p3: ~2 * 0,94
+        self.assertEqual(self.tracker.top(3), ["p2", "p1", "p3"])
+
+    def test_top_per_category(self):
+        self.assertEqual(self.tracker.top(5, ["tênis"]), ["p2", "p1"])
+        self.assertEqual(self.tracker.top(5, ["camisetas"]), ["p3"])
+        self.assertEqual(self.tracker.top(5, ["inexistente"]), [])
+
+    def test_interaction_events_update_scores(self):
+        self.tracker.top(1)
+        self.db_manager.notify('interaction_added', {"product_id": "p3", "type": "purchase", "timestamp": datetime.now()})
+        self.assertEqual(self.tracker.top(1), ["p3"])
+
+    def test_unknown_products_are_added(self):
+        self.tracker.top(1)
+        self.tracker.record("p9", "purchase", category="Bonés")
+        self.tracker.record("p9", "purchase")
+        self.assertEqual(self.tracker.top(1), ["p9"])
+        self.assertEqual(self.tracker.top(5, ["bonés"]), ["p9"])
+
+    def test_rescale_keeps_ranking(self):
+        self.tracker.top(1)
+        far_future = datetime.now() + timedelta(days=120)
+        self.tracker.record("p3", "view", far_future)
+        self.assertEqual(self.tracker.top(3), ["p3", "p2", "p1"])
+
+    def test_categories_load_a_fresh_tracker(self):
+        self.assertEqual(sorted(TrendingTracker(self.db_manager).categories()), ["camisetas", "tênis"])
+
+    def test_category_lookup_happens_outside_the_lock(self):
+        self.tracker.top(1)
+        self.db_manager.tracker_lock = self.tracker._lock
+        self.tracker.record("p9", "view")
+        self.assertEqual(self.db_manager.lookups_under_lock, [False])
+
+class TestTrendingTimezone(unittest.TestCase):
+
+    def setUp(self):
+        self.previous_tz = os.environ.get('TZ')
+        os.environ['TZ'] = 'America/Sao_Paulo'
+        time.tzset()
+
+    def tearDown(self):
+        if self.previous_tz is None:
+            os.environ.pop('TZ', None)
+        else:
+            os.environ['TZ'] = self.previous_tz
+        time.tzset()
+
+    def test_loaded_and_live_events_score_the_same(self):
+        moment = datetime.now() - timedelta(hours=3)
+        db_manager = FakeDBManager([("p1", "Tênis"), ("p2", "Tênis")], [("p1", "view", moment)])
+        tracker = TrendingTracker(db_manager, half_life_hours=24)
+        tracker.load()
+        tracker.record("p2", "view", moment)
+        p1, p2 = tracker._products.encode("p1"), tracker._products.encode("p2")
+        self.assertAlmostEqual(tracker._scores[p1], tracker._scores[p2], places=9)
+
+if __name__ == '__main__':
+    unittest.main()